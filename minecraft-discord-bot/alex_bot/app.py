@@ -1,5 +1,6 @@
 import json
 import os
+import time
 from typing import Callable, Dict
 
 # Import crypto packages for discord Auth
@@ -8,6 +9,35 @@ from nacl.exceptions import BadSignatureError
 
 # Import the AWS SDK boto3
 import boto3
+from botocore.config import Config
+
+# Cheap request validation that runs before any crypto
+import request_checks
+
+# State shared between invocations, and coalescing of repeated operations
+import coalesce
+import server_status
+import state_store
+
+# Circuit breakers the stopper keeps for the Minecraft host
+import breaker
+
+# Signatures accepted by this execution environment, to drop replays
+REPLAY_CACHE = request_checks.ReplayCache()
+
+# How long the result of a StartInstances call is shared with later
+# /startmcserver requests, and how long those wait for one in flight.
+# Discord wants an answer within 3 seconds
+START_COALESCE_TTL = 60
+START_COALESCE_WAIT = 2
+
+# The state store only coalesces and records, so its calls must fail fast
+# rather than use up Discord's 3 seconds. Two attempts of at most a second
+STATE_STORE_CONFIG = Config(connect_timeout=0.5, read_timeout=0.5,
+                            retries={'total_max_attempts': 2, 'mode': 'standard'})
+
+# Created on first use by get_state_store
+_STATE_STORE = None
 
 # Commands for individual discord commands
 def ping_respond(body: dict):
@@ -20,15 +50,47 @@ def start_minecraft_server(body: dict):
     # Discord command body defined in https://discord.com/developers/docs/interactions/receiving-and-responding#interaction-object-interaction-structure
     # http_body = event['body']
 
-    start_response = start_minecraft_server()
-    # Create a string from response from the previous state to the current state
-    response_string = f"Minecraft Server is now {start_response['StartingInstances'][0]['CurrentState']['Name']}"
+    start_response, joined = start_minecraft_server()
+    # Another request's start is still in flight
+    if start_response is None:
+        response_string = "Minecraft Server is already starting"
+    else:
+        # Create a string from response from the previous state to the current state
+        response_string = f"Minecraft Server is now {start_response['StartingInstances'][0]['CurrentState']['Name']}"
+        # A hibernated server comes back with its world already loaded
+        if not joined and load_stop_mode(get_mc_instance_id()) == 'hibernate':
+            response_string += ", resuming from hibernation"
+        # The request that started the server hears back once it is joinable
+        if not joined and request_readiness_wait(body):
+            response_string += ", I'll post here once it's joinable"
     print(response_string)
     # Return a proper response with the string encoded
     return create_message_body(response_string)
 
+def server_status_respond(body: dict):
+    # Answer from the status snapshot, without reaching out to EC2 or the
+    # Minecraft server; a stale snapshot gets refreshed in the background
+    instance_id = get_mc_instance_id()
+    now = time.time()
+
+    # Without the state store there is nothing to answer from, but the
+    # command still gets an answer, and no refresh is asked for
+    snapshot = None
+    try:
+        store = get_state_store()
+        snapshot = state_store.load_status(store, instance_id)
+        # A refresh of a host that isn't answering would only wait on a timeout
+        if (server_status.needs_refresh(snapshot, now) and not host_unreachable(snapshot)
+                and server_status.claim_refresh(store, instance_id, now)):
+            request_status_refresh()
+    except Exception as e:
+        print(f"Could not read the server status: {e}")
+
+    return create_message_body(server_status.describe(snapshot, now))
+
 COMMAND_MAP: Dict[str, Callable[[dict], str]] = {
     'startmcserver': start_minecraft_server,
+    'mcstatus': server_status_respond,
     'ping': ping_respond
 }
 
@@ -125,8 +187,22 @@ def verify_headers(event: dict) -> bool:
     '''Given the AWS event, verifies the headers are correct for a Discord
     interaction. Rreturns true if this verification passes, false otherwise.'''
             
-    signature = event['headers']['x-signature-ed25519']
-    timestamp = event['headers']['x-signature-timestamp']
+    headers = request_checks.normalize_headers(event)
+
+    # Reject malformed, oversized and stale requests without touching
+    # libsodium or SSM
+    rejection = request_checks.precheck(headers, event.get('body'))
+    if rejection is not None:
+        print(f'request rejected before verification: {rejection}')
+        return False
+
+    signature = headers[request_checks.SIGNATURE_HEADER]
+    timestamp = headers[request_checks.TIMESTAMP_HEADER]
+
+    # A signature we have already accepted is a replay
+    if REPLAY_CACHE.seen(timestamp, signature):
+        print('replayed request signature rejected')
+        return False
 
     # Bring down the key for the Discord Bot
     bot_token = get_bot_key()
@@ -144,6 +220,7 @@ def verify_headers(event: dict) -> bool:
         return False
     
     # If we have gotten here, validation has succeeded
+    REPLAY_CACHE.add(timestamp, signature)
     return True
 
 def create_message_body(message):
@@ -161,14 +238,104 @@ def create_message_body(message):
 # Commands for interacting with AWS
 
 def start_minecraft_server():
-    '''Starts the Minecraft server by sending a command to the EC2 instance running the server.'''
+    '''Starts the Minecraft server by sending a command to the EC2 instance running the server.
+    Requests arriving together share a single StartInstances call, so
+    this returns (response, joined) where joined is True if the call was
+    made by another request. The response holds only its StartingInstances,
+    and is None if another request's call did not finish in time.'''
     instance_id = get_mc_instance_id()
-    ec2 = boto3.client('ec2')
-    print(f"Starting EC2 instance with id: {instance_id}")
-    
-    response = ec2.start_instances(InstanceIds=[instance_id])
-    
-    return response
+
+    def start():
+        ec2 = boto3.client('ec2')
+        print(f"Starting EC2 instance with id: {instance_id}")
+
+        response = ec2.start_instances(InstanceIds=[instance_id])
+
+        # Only the instance states are shared with coalesced requests
+        return {'StartingInstances': response['StartingInstances']}
+
+    try:
+        response, joined = coalesce.run_once(
+            get_state_store(), f'start#{instance_id}', start,
+            ttl=START_COALESCE_TTL, wait=START_COALESCE_WAIT)
+    except coalesce.StoreError as e:
+        # Starting an instance twice is harmless, failing to start it isn't
+        print(f"Could not coalesce the start, starting without: {e}")
+        response, joined = start(), False
+    if joined:
+        print(f"Joined the start of EC2 instance with id: {instance_id}")
+    elif response is not None:
+        # Let /mcstatus know the server is on its way up
+        state = response['StartingInstances'][0]['CurrentState']['Name']
+        try:
+            state_store.save_status(get_state_store(), instance_id, state, None, None, time.time())
+        except Exception as e:
+            print(f"Could not save the server status: {e}")
+
+    return response, joined
+
+def load_stop_mode(instance_id):
+    '''Returns how the instance was last stopped, or None.'''
+    try:
+        return state_store.load_stop_mode(get_state_store(), instance_id)
+    except Exception as e:
+        print(f"Could not load the stop mode: {e}")
+        return None
+
+def request_readiness_wait(body: dict) -> bool:
+    '''Asks the readiness function, named by the READINESS_FUNCTION
+    environment variable, to wait for the server to be joinable and post a
+    follow-up to this interaction. Returns True if it was asked.'''
+    function_name = os.environ.get('READINESS_FUNCTION')
+    if not function_name or 'token' not in body:
+        return False
+    print("Requesting a readiness follow-up")
+    try:
+        boto3.client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'application_id': body['application_id'], 'token': body['token']}))
+    except Exception as e:
+        print(f"Could not request a readiness follow-up: {e}")
+        return False
+    return True
+
+def host_unreachable(snapshot) -> bool:
+    '''Returns True if the circuit breaker for the snapshot's host is
+    open.'''
+    if snapshot is None or 'public_ip' not in snapshot:
+        return False
+    return breaker.CircuitBreaker(get_state_store(), snapshot['public_ip']).state() == breaker.OPEN
+
+def request_status_refresh():
+    '''Asks the stopper function, named by the STATUS_REFRESH_FUNCTION
+    environment variable, to sample the server status without waiting for
+    it to finish. Failing to ask is only logged.'''
+    function_name = os.environ.get('STATUS_REFRESH_FUNCTION')
+    if not function_name:
+        return
+    print("Requesting a server status refresh")
+    try:
+        boto3.client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'action': 'refresh_status'}))
+    except Exception as e:
+        # The answer from the stale snapshot still goes out
+        print(f"Could not request a server status refresh: {e}")
+
+def get_state_store():
+    '''Returns the store for state shared between invocations: the DynamoDB
+    table named by the STATE_TABLE environment variable, or a store in this
+    execution environment's memory if it is not set.'''
+    global _STATE_STORE
+    if _STATE_STORE is None:
+        table_name = os.environ.get('STATE_TABLE')
+        if table_name:
+            _STATE_STORE = state_store.DynamoStore(boto3.client('dynamodb', config=STATE_STORE_CONFIG), table_name)
+        else:
+            _STATE_STORE = state_store.MemoryStore()
+    return _STATE_STORE
 
 def get_bot_key():
 
@@ -0,0 +1,75 @@
+'''A circuit breaker for a Minecraft host, kept in the state store.
+
+Every query of the host records a success or a failure. After THRESHOLD
+failures in a row the breaker opens: callers skip the query and answer as
+if it had failed, instead of each waiting out a socket timeout. Once
+RESET_AFTER seconds have passed since the last failure it is half open,
+letting a query through to see whether the host has recovered; success
+closes it, another failure opens it again.
+
+Breakers are per host rather than per instance, so a server that comes
+back on a new IP after a restart starts with a closed one. Records expire
+after RETENTION.
+'''
+
+import time
+from typing import Callable, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Failed queries in a row that open the breaker
+THRESHOLD = 3
+
+# Seconds from the last failure until an open breaker lets a query through
+RESET_AFTER = 30 * 60
+
+# How long a breaker record is kept after its last update
+RETENTION = 24 * 60 * 60
+
+
+class CircuitBreaker:
+    '''The breaker for one host. Each method reads or writes its record in
+    store, so the state is shared by every invocation.'''
+
+    def __init__(self, store, host: str, threshold: int = THRESHOLD, reset_after: float = RESET_AFTER,
+                 clock: Callable[[], float] = time.time):
+        self.store = store
+        self.key = f'breaker#{host}'
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+
+    def _record(self) -> dict:
+        record = self.store.get(self.key)
+        return record if record is not None else {'failures': 0}
+
+    def state(self, record: Optional[dict] = None) -> str:
+        if record is None:
+            record = self._record()
+        if record['failures'] < self.threshold:
+            return CLOSED
+        if self.clock() - record['failed_at'] < self.reset_after:
+            return OPEN
+        return HALF_OPEN
+
+    def failures(self) -> int:
+        '''Returns the number of failed queries in a row.'''
+        return self._record()['failures']
+
+    def allow(self) -> bool:
+        '''Returns True if the host should be queried.'''
+        return self.state() != OPEN
+
+    def record_success(self):
+        now = self.clock()
+        self.store.put(self.key, {'failures': 0, 'expires_at': now + RETENTION})
+
+    def record_failure(self) -> str:
+        '''Counts a failed query and returns the breaker's new state.'''
+        now = self.clock()
+        record = {'failures': self._record()['failures'] + 1, 'failed_at': now,
+                  'expires_at': now + RETENTION}
+        self.store.put(self.key, record)
+        return self.state(record)
@@ -1,6 +1,7 @@
-import sys, types
+import sys, types, itertools
+from collections import OrderedDict
 from .lock import allocate_lock
-from .error import CDefError
+from .error import CDefError, VerificationMissing
 from . import model
 
 try:
@@ -17,6 +18,8 @@ except NameError:
     basestring = str
 
 _unspecified = object()
+# the keys of an empty module __dict__, which ffi._parsed_types starts with
+_module_dict_keys = frozenset(types.ModuleType('_').__dict__)
 
 
 
@@ -68,6 +71,7 @@ class FFI(object):
         self._parser = cparser.Parser()
         self._cached_btypes = {}
         self._parsed_types = types.ModuleType('parsed_types').__dict__
+        self._typeof_cache = None
         self._new_types = types.ModuleType('new_types').__dict__
         self._function_caches = []
         self._libraries = []
@@ -76,6 +80,7 @@ class FFI(object):
         self._windows_unicode = None
         self._init_once_cache = {}
         self._cdef_version = None
+        self._cdef_override_version = None
         self._embedding = None
         self._typecache = model.get_typecache(backend)
         if hasattr(backend, 'set_ffi'):
@@ -123,6 +128,8 @@ class FFI(object):
             csource = csource.encode('ascii')
         with self._lock:
             self._cdef_version = object()
+            if override:
+                self._cdef_override_version = self._cdef_version
             self._parser.parse(csource, override=override, **options)
             self._cdefsources.append(csource)
             if override:
@@ -134,12 +141,17 @@ class FFI(object):
                 for tp in finishlist:
                     tp.finish_backend_type(self, finishlist)
 
-    def dlopen(self, name, flags=0):
+    def dlopen(self, name, flags=0, preload=False):
         """Load and return a dynamic library identified by 'name'.
         The standard C library can be loaded by passing None.
         Note that functions and types declared by 'ffi.cdef()' are not
         linked to a particular library, just like C headers; in the
         library we only look for the actual (untyped) symbols.
+        By default each function, variable and constant is looked up
+        the first time it is accessed.  With 'preload=True', all the
+        ones declared so far are looked up immediately, in one pass;
+        names that cannot be resolved are skipped and will raise when
+        accessed, as usual.
         """
         if not (isinstance(name, basestring) or
                 name is None or
@@ -150,6 +162,8 @@ class FFI(object):
             lib, function_cache = _make_ffi_library(self, name, flags)
             self._function_caches.append(function_cache)
             self._libraries.append(lib)
+        if preload:
+            type(lib).__cffi_preload__(lib)
         return lib
 
     def dlclose(self, lib):
@@ -175,6 +189,8 @@ class FFI(object):
         btype = self._get_cached_btype(type)
         result = btype, really_a_function_type
         self._parsed_types[key] = result
+        if self._typeof_cache is not None:
+            self._typeof_cache.add(key, self._parsed_types)
         return result
 
     def _typeof(self, cdecl, consider_function_as_funcptr=False):
@@ -184,6 +200,11 @@ class FFI(object):
         except KeyError:
             with self._lock:
                 result = self._typeof_locked(cdecl)
+        else:
+            # fast path: no lock, and nothing else unless
+            # set_typeof_cache() was called
+            if self._typeof_cache is not None:
+                self._typeof_cache.hit(cdecl)
         #
         btype, really_a_function_type = result
         if really_a_function_type and not consider_function_as_funcptr:
@@ -191,6 +212,42 @@ class FFI(object):
                             "pointer-to-function type" % (cdecl,))
         return btype
 
+    def set_typeof_cache(self, maxsize=None, stats=True):
+        """Configure the cache of C types given as strings to typeof(),
+        sizeof(), new(), cast() and so on.  By default every string is
+        parsed once and then cached forever.  With a 'maxsize', only that
+        many strings are kept, evicting the least recently used ones; use
+        this if your program builds many different type strings, e.g.
+        'char[%d]' % n.  With 'stats', hits and misses are counted and
+        reported by typeof_cache_info().  Calling it without arguments
+        (or with maxsize=None and stats=False) restores the default.
+        """
+        with self._lock:
+            if maxsize is None and not stats:
+                self._typeof_cache = None
+                return
+            if maxsize is not None and maxsize < 1:
+                raise ValueError("maxsize must be at least 1, not %r" %
+                                 (maxsize,))
+            cache = _TypeofCache(maxsize, stats)
+            for key in list(self._parsed_types):
+                if key not in _module_dict_keys:
+                    cache.track(key, self._parsed_types)
+            self._typeof_cache = cache
+
+    def typeof_cache_info(self):
+        """Return a dict with the 'hits', 'misses', 'currsize' and
+        'maxsize' of the cache of C types given as strings.  Hits and
+        misses are only counted after set_typeof_cache() was called.
+        """
+        cache = self._typeof_cache
+        currsize = len(self._parsed_types) - len(_module_dict_keys)
+        if cache is None:
+            return {'hits': 0, 'misses': 0, 'currsize': currsize,
+                    'maxsize': None}
+        return {'hits': cache.hits, 'misses': cache.misses,
+                'currsize': currsize, 'maxsize': cache.maxsize}
+
     def typeof(self, cdecl):
         """Parse the C type given as a string and return the
         corresponding <ctype> object.
@@ -716,6 +773,11 @@ class FFI(object):
 
         The default is '*' when building a non-embedded C API extension,
         and (module_name + '.*') when building an embedded library.
+
+        If the environment variable CFFI_COMPILE_CACHE_DIR is set, built
+        modules are cached in that directory, keyed on a hash of the
+        generated C source, the compiler flags and the Python ABI, and
+        reused instead of calling the compiler again.
         """
         from .recompiler import recompile
         #
@@ -801,6 +863,48 @@ class FFI(object):
         return (typedefs, structs, unions)
 
 
+class _TypeofCache(object):
+    # Bookkeeping for FFI.set_typeof_cache().  The entries themselves
+    # stay in ffi._parsed_types, so that the fast path of ffi._typeof()
+    # is still a single dict lookup; this only records hits, misses and
+    # (if bounded) the least-recently-used order.  hit() is called
+    # without the lock: the counters are approximate under contention.
+
+    def __init__(self, maxsize, stats):
+        self.maxsize = maxsize
+        self.stats = stats
+        self.hits = 0
+        self.misses = 0
+        if maxsize is not None:
+            self.order = OrderedDict()
+        else:
+            self.order = None
+
+    def hit(self, key):
+        if self.stats:
+            self.hits += 1
+        if self.order is not None:
+            try:
+                self.order.move_to_end(key)
+            except KeyError:
+                pass    # evicted concurrently
+
+    def add(self, key, parsed_types):
+        # call me with the lock!
+        if self.stats:
+            self.misses += 1
+        self.track(key, parsed_types)
+
+    def track(self, key, parsed_types):
+        # call me with the lock!
+        order = self.order
+        if order is not None:
+            order[key] = None
+            while len(order) > self.maxsize:
+                old_key, _ = order.popitem(last=False)
+                parsed_types.pop(old_key, None)
+
+
 def _load_backend_lib(backend, name, flags):
     import os
     if not isinstance(name, basestring):
@@ -871,14 +975,27 @@ def _make_ffi_library(ffi, libname, flags):
         library.__dict__[name] = ffi._parser._int_constants[name]
     #
     accessors = {}
-    accessors_version = [False]
+    # [cdef version, override version, number of declarations and of
+    # int constants already indexed]
+    accessors_version = [False, None, 0, 0]
     addr_variables = {}
     #
     def update_accessors():
         if accessors_version[0] is ffi._cdef_version:
             return
         #
-        for key, (tp, _) in ffi._parser._declarations.items():
+        # Declarations and int constants are only ever added to the end of
+        # their dicts, so only index the ones added by cdef() calls since
+        # the last update.  After a cdef(override=True), start over.
+        declarations = ffi._parser._declarations
+        int_constants = ffi._parser._int_constants
+        if accessors_version[1] is not ffi._cdef_override_version:
+            accessors.clear()
+            accessors_version[1] = ffi._cdef_override_version
+            accessors_version[2] = accessors_version[3] = 0
+        new_declarations = itertools.islice(declarations.items(),
+                                            accessors_version[2], None)
+        for key, (tp, _) in new_declarations:
             if not isinstance(tp, model.EnumType):
                 tag, name = key.split(' ', 1)
                 if tag == 'function':
@@ -893,9 +1010,12 @@ def _make_ffi_library(ffi, libname, flags):
                         tp.check_not_partial()
                         library.__dict__[name] = tp.enumvalues[i]
                     accessors[enumname] = accessor_enum
-        for name in ffi._parser._int_constants:
+        for name in itertools.islice(int_constants, accessors_version[3],
+                                     None):
             accessors.setdefault(name, accessor_int_constant)
         accessors_version[0] = ffi._cdef_version
+        accessors_version[2] = len(declarations)
+        accessors_version[3] = len(int_constants)
     #
     def make_accessor(name):
         with ffi._lock:
@@ -938,6 +1058,20 @@ def _make_ffi_library(ffi, libname, flags):
         def __cffi_close__(self):
             backendlib.close_lib()
             self.__dict__.clear()
+        def __cffi_preload__(self):
+            with ffi._lock:
+                update_accessors()
+                for name, accessor in list(accessors.items()):
+                    if (name in library.__dict__ or
+                            name in FFILibrary.__dict__):
+                        continue
+                    try:
+                        accessor(name)
+                    except (AttributeError, NotImplementedError,
+                            VerificationMissing, CDefError):
+                        # e.g. a missing symbol or a type that can't be
+                        # rendered: fail on access
+                        pass
     #
     if isinstance(libname, basestring):
         try:
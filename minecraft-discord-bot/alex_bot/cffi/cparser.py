@@ -5,7 +5,7 @@ try:
     from . import _pycparser as pycparser
 except ImportError:
     import pycparser
-import weakref, re, sys
+import weakref, re, sys, os, io, hashlib, pickle, stat, collections
 
 try:
     if sys.version_info < (3,):
@@ -53,6 +53,107 @@ def _get_parser():
         _parser_cache = pycparser.CParser()
     return _parser_cache
 
+# Results of Parser.parse(), keyed on a hash of the cffi and pycparser
+# versions, the cdef source, the parse options and the chain of cdefs
+# parsed before it by the same Parser.  The values are pickles of the
+# resulting parser state, so that every FFI gets its own fresh model
+# objects.  The _CDEF_CACHE_SIZE most recently used are kept in memory.
+# If the environment variable CFFI_CDEF_CACHE_DIR names a directory that
+# only the current user can write to, the pickles are also stored there
+# and shared between processes.  Loading a pickle can run arbitrary code,
+# so a directory that others can write to is ignored.
+_cdef_cache = collections.OrderedDict()
+_CDEF_CACHE_SIZE = 128
+_CDEF_CACHE_VERSION = 1
+_PARSER_STATE = ('_declarations', '_included_declarations',
+                 '_anonymous_counter', '_int_constants', '_recomplete',
+                 '_uses_new_feature')
+
+def _cdef_cache_dir(create=False):
+    cache_dir = os.environ.get('CFFI_CDEF_CACHE_DIR')
+    if not cache_dir or not hasattr(os, 'getuid'):
+        return None
+    try:
+        if create and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        st = os.stat(cache_dir)
+    except (IOError, OSError):
+        return None
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or
+            st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+        return None
+    return cache_dir
+
+def _cdef_cache_remember(key, data):
+    if lock is not None:
+        lock.acquire()
+    try:
+        _cdef_cache.pop(key, None)
+        _cdef_cache[key] = data    # most recently used last
+        while len(_cdef_cache) > _CDEF_CACHE_SIZE:
+            _cdef_cache.popitem(last=False)
+    finally:
+        if lock is not None:
+            lock.release()
+
+def _cdef_cache_get(key):
+    data = _cdef_cache.get(key)
+    if data is not None:
+        _cdef_cache_remember(key, data)
+        return data
+    cache_dir = _cdef_cache_dir()
+    if cache_dir is None:
+        return None
+    try:
+        with open(os.path.join(cache_dir, key + '.pickle'), 'rb') as f:
+            if os.fstat(f.fileno()).st_uid != os.getuid():
+                return None
+            data = f.read()
+    except (IOError, OSError):
+        return None
+    _cdef_cache_remember(key, data)
+    return data
+
+def _cdef_cache_put(key, data):
+    _cdef_cache_remember(key, data)
+    cache_dir = _cdef_cache_dir(create=True)
+    if cache_dir is None:
+        return
+    filename = os.path.join(cache_dir, key + '.pickle')
+    tmpname = '%s.%d.tmp' % (filename, os.getpid())
+    try:
+        with open(tmpname, 'wb') as f:
+            f.write(data)
+        os.rename(tmpname, filename)    # atomic on POSIX
+    except (IOError, OSError):
+        # the on-disk cache is only an optimization
+        try:
+            os.unlink(tmpname)
+        except OSError:
+            pass
+
+class _StatePickler(pickle.Pickler):
+    # Objects that already existed in the parser before the parse are
+    # not copied, but referenced by name, so that a cache hit keeps the
+    # identity of the types from previous cdefs.
+    def __init__(self, f, known):
+        pickle.Pickler.__init__(self, f, pickle.HIGHEST_PROTOCOL)
+        self._known = known
+
+    def persistent_id(self, obj):
+        entry = self._known.get(id(obj))
+        if entry is not None and entry[1] is obj:
+            return entry[0]
+        return None
+
+class _StateUnpickler(pickle.Unpickler):
+    def __init__(self, f, declarations):
+        pickle.Unpickler.__init__(self, f)
+        self._declarations = declarations
+
+    def persistent_load(self, pid):
+        return self._declarations[pid][0]
+
 def _workaround_for_old_pycparser(csource):
     # Workaround for a pycparser issue (fixed between pycparser 2.10 and
     # 2.14): "char*const***" gives us a wrong syntax tree, the same as
@@ -303,6 +404,9 @@ class Parser(object):
         self._int_constants = {}
         self._recomplete = []
         self._uses_new_feature = None
+        # hash of all the cdefs parsed so far, or None if the state of
+        # this parser can no longer be reproduced from _cdef_cache
+        self._cdef_cache_key = ''
 
     def _parse(self, csource):
         csource, macros = _preprocess(csource)
@@ -386,10 +490,59 @@ class Parser(object):
             self._options = {'override': override,
                              'packed': pack,
                              'dllexport': dllexport}
-            self._internal_parse(csource)
+            self._cached_parse(csource)
         finally:
             self._options = prev_options
 
+    def _cached_parse(self, csource):
+        if self._cdef_cache_key is None:
+            self._internal_parse(csource)
+            return
+        from . import __version__ as cffi_version
+        h = hashlib.sha256()
+        for part in (str(_CDEF_CACHE_VERSION), cffi_version,
+                     pycparser.__version__,
+                     self._cdef_cache_key, repr(sorted(self._options.items())),
+                     csource):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        key = h.hexdigest()
+        #
+        data = _cdef_cache_get(key)
+        if data is not None:
+            try:
+                self._load_state(data)
+            except Exception:
+                pass    # corrupted or stale cache entry: parse normally
+            else:
+                self._cdef_cache_key = key
+                return
+        #
+        known = {}
+        for name, (tp, quals) in self._declarations.items():
+            known[id(tp)] = (name, tp)
+        self._internal_parse(csource)
+        try:
+            data = self._dump_state(known)
+        except Exception:
+            # some state cannot be pickled; stop caching for this parser
+            self._cdef_cache_key = None
+            return
+        _cdef_cache_put(key, data)
+        self._cdef_cache_key = key
+
+    def _dump_state(self, known):
+        f = io.BytesIO()
+        state = tuple([getattr(self, name) for name in _PARSER_STATE])
+        _StatePickler(f, known).dump(state)
+        return f.getvalue()
+
+    def _load_state(self, data):
+        f = io.BytesIO(data)
+        state = _StateUnpickler(f, self._declarations).load()
+        for name, value in zip(_PARSER_STATE, state):
+            setattr(self, name, value)
+
     def _internal_parse(self, csource):
         ast, macros, csource = self._parse(csource)
         # add the macros
@@ -971,6 +1124,7 @@ class Parser(object):
         return tp
 
     def include(self, other):
+        self._cdef_cache_key = None
         for name, (tp, quals) in other._declarations.items():
             if name.startswith('anonymous $enum_$'):
                 continue   # fix for test_anonymous_enum_include
@@ -1,6 +1,11 @@
-import sys, os
+import sys, os, hashlib, shutil
 from .error import VerificationError
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 
 LIST_OF_FILE_NAMES = ['sources', 'include_dirs', 'library_dirs',
                       'extra_objects', 'depends']
@@ -13,11 +18,21 @@ def get_extension(srcfilename, modname, sources=(), **kwds):
     return Extension(name=modname, sources=allsources, **kwds)
 
 def compile(tmpdir, ext, compiler_verbose=0, debug=None):
-    """Compile a C extension module using distutils."""
+    """Compile a C extension module using distutils.
+
+    If the environment variable CFFI_COMPILE_CACHE_DIR is set, the
+    module is first looked up in that directory, and stored there
+    after compiling (see _cached_build()).
+    """
 
     saved_environ = os.environ.copy()
     try:
-        outputfilename = _build(tmpdir, ext, compiler_verbose, debug)
+        cache_dir = _compile_cache_dir()
+        if cache_dir is None:
+            outputfilename = _build(tmpdir, ext, compiler_verbose, debug)
+        else:
+            outputfilename = _cached_build(cache_dir, tmpdir, ext,
+                                           compiler_verbose, debug)
         outputfilename = os.path.abspath(outputfilename)
     finally:
         # workaround for a distutils bugs where some env vars can
@@ -55,6 +70,140 @@ def _build(tmpdir, ext, compiler_verbose=0, debug=None):
     #
     return soname
 
+# Cache of built extension modules, shared between processes and
+# workspaces through the directory given by CFFI_COMPILE_CACHE_DIR.
+# Entries are keyed on a hash of everything that goes into the build:
+# the content of the generated C source and of the extension's other
+# sources and 'depends', the compiler and linker settings, and the
+# Python ABI.  Headers that are only found through 'include_dirs' are
+# not hashed: list them in 'depends' if they change.
+_COMPILE_CACHE_VERSION = 1
+_COMPILE_CACHE_ENVIRON = ('CC', 'CXX', 'CPP', 'CFLAGS', 'CPPFLAGS',
+                          'LDFLAGS', 'LDSHARED', 'AR', 'ARFLAGS',
+                          'ARCHFLAGS')
+_COMPILE_CACHE_CONFIG = ('EXT_SUFFIX', 'SOABI', 'CC', 'CFLAGS', 'CCSHARED',
+                         'LDSHARED', 'BLDSHARED')
+
+def _compile_cache_dir():
+    return os.environ.get('CFFI_COMPILE_CACHE_DIR') or None
+
+def _compile_cache_key(ext, debug):
+    """Return (filename, key): the path of the module that the build
+    produces, relative to the build directory, and the cache key."""
+    from cffi._shimmed_dist_utils import Distribution, sysconfig
+
+    dist = Distribution({'ext_modules': [ext]})
+    dist.parse_config_files()
+    cmd = dist.get_command_obj('build_ext')
+    filename = cmd.get_ext_filename(cmd.get_ext_fullname(ext.name))
+    #
+    h = hashlib.sha256()
+    def add(value):
+        h.update(repr(value).encode('utf-8'))
+        h.update(b'\0')
+    add(_COMPILE_CACHE_VERSION)
+    add(filename)
+    add(bool(debug))
+    for name in ('name', 'include_dirs', 'define_macros', 'undef_macros',
+                 'library_dirs', 'libraries', 'runtime_library_dirs',
+                 'extra_objects', 'extra_compile_args', 'extra_link_args',
+                 'export_symbols', 'language', 'py_limited_api'):
+        add((name, getattr(ext, name, None)))
+    add(sorted(dist.get_option_dict('build_ext').items()))
+    add((sys.version, sys.platform, sys.maxsize))
+    add([sysconfig.get_config_var(name) for name in _COMPILE_CACHE_CONFIG])
+    add([os.environ.get(name) for name in _COMPILE_CACHE_ENVIRON])
+    for path in list(ext.sources) + list(ext.depends):
+        with open(path, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return filename, h.hexdigest()
+
+def _cached_build(cache_dir, tmpdir, ext, compiler_verbose=0, debug=None):
+    if debug is None:
+        debug = sys.flags.debug
+    try:
+        filename, key = _compile_cache_key(ext, debug)
+    except (IOError, OSError):
+        # e.g. a missing source file: let the compiler report it
+        return _build(tmpdir, ext, compiler_verbose, debug)
+    cached = os.path.join(cache_dir,
+                          '%s-%s' % (key, os.path.basename(filename)))
+    outputfilename = os.path.join(tmpdir, filename)
+    if _install_cached(cached, outputfilename, compiler_verbose):
+        return outputfilename
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+    except OSError:
+        pass
+    #
+    # Only one process builds a given module; others building the same
+    # one wait for it and then use its result.  Different modules have
+    # different locks, so they build in parallel.
+    lock = _lock_compile_cache(cached + '.lock')
+    try:
+        if _install_cached(cached, outputfilename, compiler_verbose):
+            return outputfilename
+        soname = _build(tmpdir, ext, compiler_verbose, debug)
+        _store_cached(soname, cached)
+    finally:
+        if lock is not None:
+            lock.close()     # releases the lock
+    return soname
+
+def _install_cached(cached, outputfilename, compiler_verbose=0):
+    # Hard-link (or if that fails, copy) the cached module to where the
+    # build would have put it.  Returns False if it is not in the cache.
+    if not os.path.isfile(cached):
+        return False
+    dirname = os.path.dirname(outputfilename)
+    tmpname = '%s.%d.tmp' % (outputfilename, os.getpid())
+    try:
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        try:
+            os.link(cached, tmpname)
+        except (OSError, AttributeError):
+            shutil.copy2(cached, tmpname)
+        os.replace(tmpname, outputfilename)
+    except (IOError, OSError):
+        _unlink_quietly(tmpname)
+        return False
+    if compiler_verbose:
+        print('using %s from the compile cache' % (outputfilename,))
+    return True
+
+def _store_cached(soname, cached):
+    tmpname = '%s.%d.tmp' % (cached, os.getpid())
+    try:
+        shutil.copy2(soname, tmpname)
+        os.replace(tmpname, cached)     # atomic: readers never see half
+    except (IOError, OSError):
+        # the cache is only an optimization
+        _unlink_quietly(tmpname)
+
+def _lock_compile_cache(lockname):
+    # Returns an open file holding an exclusive lock, or None if locking
+    # is not possible here.
+    if fcntl is None:
+        return None
+    try:
+        f = open(lockname, 'a')
+    except (IOError, OSError):
+        return None
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    except (IOError, OSError):
+        f.close()
+        return None
+    return f
+
+def _unlink_quietly(filename):
+    try:
+        os.unlink(filename)
+    except OSError:
+        pass
+
 try:
     from os.path import samefile
 except ImportError:
@@ -0,0 +1,71 @@
+'''Coalesces identical operations started by concurrent invocations.
+
+The first invocation to claim an operation's key in the state store runs
+it and saves its result; invocations arriving while it runs, or shortly
+after, wait for and share that result instead of running it again.
+'''
+
+import json
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+class StoreError(Exception):
+    '''The state store could not be reached to claim or read an operation,
+    which was therefore not run.'''
+
+
+def _update(store, key: str, owner: str, fields: dict):
+    '''Updates the claim on key, which is only bookkeeping once the
+    operation has run: if the store fails the claim expires on its own.'''
+    try:
+        store.update_if_owner(key, owner, fields)
+    except Exception as e:
+        print(f"Could not update the claim on {key}: {e}")
+
+
+def run_once(store, key: str, operation: Callable[[], Any], ttl: float, wait: float,
+             poll_interval: float = 0.1, clock: Callable[[], float] = time.time,
+             sleep: Callable[[float], None] = time.sleep) -> Tuple[Optional[Any], bool]:
+    '''Runs operation() unless another invocation ran it for the same key
+    less than ttl seconds ago, or is running it now.
+
+    Returns (result, joined). joined is True when the result came from
+    another invocation's run; result is None if that run did not finish
+    within wait seconds. The result must be JSON serializable. If the
+    operation raises, the key is released so the next request retries.
+    Raises StoreError if the store fails before the operation runs, so the
+    caller can decide to run it without coalescing.'''
+
+    deadline = clock() + wait
+    while True:
+        now = clock()
+        owner = uuid.uuid4().hex
+        claim = {'status': PENDING, 'owner': owner, 'expires_at': now + ttl}
+        try:
+            claimed = store.put_if_absent(key, claim, now)
+        except Exception as e:
+            raise StoreError(f'could not claim {key}: {e}') from e
+        if claimed:
+            try:
+                result = operation()
+            except Exception:
+                _update(store, key, owner, {'expires_at': 0})
+                raise
+            _update(store, key, owner, {'status': DONE, 'result': json.dumps(result)})
+            return result, False
+
+        try:
+            record = store.get(key)
+        except Exception as e:
+            raise StoreError(f'could not read {key}: {e}') from e
+        if record is not None and record['status'] == DONE and record['expires_at'] >= clock():
+            return json.loads(record['result']), True
+
+        if clock() >= deadline:
+            return None, True
+        sleep(poll_interval)
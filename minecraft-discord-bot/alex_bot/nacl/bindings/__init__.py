@@ -35,6 +35,7 @@ from nacl.bindings.crypto_aead import (
     crypto_aead_xchacha20poly1305_ietf_NSECBYTES,
     crypto_aead_xchacha20poly1305_ietf_decrypt,
     crypto_aead_xchacha20poly1305_ietf_encrypt,
+    crypto_aead_xchacha20poly1305_ietf_encrypt_batch,
 )
 from nacl.bindings.crypto_box import (
     crypto_box,
@@ -181,12 +182,14 @@ from nacl.bindings.crypto_secretbox import (
     crypto_secretbox_MESSAGEBYTES_MAX,
     crypto_secretbox_NONCEBYTES,
     crypto_secretbox_ZEROBYTES,
+    crypto_secretbox_batch,
     crypto_secretbox_open,
 )
 from nacl.bindings.crypto_secretstream import (
     crypto_secretstream_xchacha20poly1305_ABYTES,
     crypto_secretstream_xchacha20poly1305_HEADERBYTES,
     crypto_secretstream_xchacha20poly1305_KEYBYTES,
+    crypto_secretstream_xchacha20poly1305_MESSAGEBYTES_MAX,
     crypto_secretstream_xchacha20poly1305_STATEBYTES,
     crypto_secretstream_xchacha20poly1305_TAG_FINAL,
     crypto_secretstream_xchacha20poly1305_TAG_MESSAGE,
@@ -196,7 +199,9 @@ from nacl.bindings.crypto_secretstream import (
     crypto_secretstream_xchacha20poly1305_init_push,
     crypto_secretstream_xchacha20poly1305_keygen,
     crypto_secretstream_xchacha20poly1305_pull,
+    crypto_secretstream_xchacha20poly1305_pull_into,
     crypto_secretstream_xchacha20poly1305_push,
+    crypto_secretstream_xchacha20poly1305_push_into,
     crypto_secretstream_xchacha20poly1305_rekey,
     crypto_secretstream_xchacha20poly1305_state,
 )
@@ -264,6 +269,7 @@ __all__ = [
     "crypto_aead_xchacha20poly1305_ietf_NSECBYTES",
     "crypto_aead_xchacha20poly1305_ietf_decrypt",
     "crypto_aead_xchacha20poly1305_ietf_encrypt",
+    "crypto_aead_xchacha20poly1305_ietf_encrypt_batch",
     "crypto_box_SECRETKEYBYTES",
     "crypto_box_PUBLICKEYBYTES",
     "crypto_box_SEEDBYTES",
@@ -342,10 +348,12 @@ __all__ = [
     "crypto_secretbox_MACBYTES",
     "crypto_secretbox_MESSAGEBYTES_MAX",
     "crypto_secretbox",
+    "crypto_secretbox_batch",
     "crypto_secretbox_open",
     "crypto_secretstream_xchacha20poly1305_ABYTES",
     "crypto_secretstream_xchacha20poly1305_HEADERBYTES",
     "crypto_secretstream_xchacha20poly1305_KEYBYTES",
+    "crypto_secretstream_xchacha20poly1305_MESSAGEBYTES_MAX",
     "crypto_secretstream_xchacha20poly1305_STATEBYTES",
     "crypto_secretstream_xchacha20poly1305_TAG_FINAL",
     "crypto_secretstream_xchacha20poly1305_TAG_MESSAGE",
@@ -355,7 +363,9 @@ __all__ = [
     "crypto_secretstream_xchacha20poly1305_init_push",
     "crypto_secretstream_xchacha20poly1305_keygen",
     "crypto_secretstream_xchacha20poly1305_pull",
+    "crypto_secretstream_xchacha20poly1305_pull_into",
     "crypto_secretstream_xchacha20poly1305_push",
+    "crypto_secretstream_xchacha20poly1305_push_into",
     "crypto_secretstream_xchacha20poly1305_rekey",
     "crypto_secretstream_xchacha20poly1305_state",
     "has_crypto_shorthash_siphashx24",
@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Optional
+from typing import ByteString, Optional, Sequence
 
 from nacl import exceptions as exc
 from nacl._sodium import ffi, lib
@@ -481,6 +481,110 @@ def crypto_aead_xchacha20poly1305_ietf_encrypt(
     return ffi.buffer(ciphertext, clen[0])[:]
 
 
+def crypto_aead_xchacha20poly1305_ietf_encrypt_batch(
+    messages: Sequence[ByteString],
+    aad: Optional[bytes],
+    nonces: ByteString,
+    key: bytes,
+    out: ByteString,
+) -> int:
+    """
+    Encrypt each of ``messages`` using the long-nonces xchacha20poly1305
+    construction and the nonce at the same index in ``nonces``, writing
+    one record per message into a caller supplied buffer: the nonce
+    followed by the authenticated ciphertext.
+
+    The arguments are checked once for the whole batch, which is what makes
+    this faster than a call to
+    :func:`crypto_aead_xchacha20poly1305_ietf_encrypt` per message.
+
+    :param messages: messages, any objects supporting the buffer protocol
+    :param aad: additional data authenticated with every message
+    :type aad: Optional[bytes]
+    :param nonces: the concatenated nonces, one per message
+    :param key:
+    :type key: bytes
+    :param out: a writable buffer of at least the total length of the
+                messages + ``len(messages)`` *
+                (:data:`.crypto_aead_xchacha20poly1305_ietf_NPUBBYTES` +
+                :data:`.crypto_aead_xchacha20poly1305_ietf_ABYTES`) bytes
+    :return: the number of bytes written to ``out``
+    :rtype: int
+    """
+    ensure(
+        isinstance(aad, bytes) or (aad is None),
+        "Additional data must be bytes or None",
+        raising=exc.TypeError,
+    )
+
+    ensure(
+        isinstance(key, bytes)
+        and len(key) == crypto_aead_xchacha20poly1305_ietf_KEYBYTES,
+        "Key must be a {} bytes long bytes sequence".format(
+            crypto_aead_xchacha20poly1305_ietf_KEYBYTES
+        ),
+        raising=exc.TypeError,
+    )
+
+    npub = crypto_aead_xchacha20poly1305_ietf_NPUBBYTES
+    nbuf = ffi.from_buffer("unsigned char[]", nonces)
+    ensure(
+        len(nbuf) == npub * len(messages),
+        "Nonces must be {} bytes long per message".format(npub),
+        raising=exc.TypeError,
+    )
+
+    mbufs = [ffi.from_buffer("unsigned char[]", m) for m in messages]
+    ensure(
+        all(
+            len(m) <= crypto_aead_xchacha20poly1305_ietf_MESSAGEBYTES_MAX
+            for m in mbufs
+        ),
+        "Message must be at most {} bytes long".format(
+            crypto_aead_xchacha20poly1305_ietf_MESSAGEBYTES_MAX
+        ),
+        raising=exc.ValueError,
+    )
+
+    overhead = npub + crypto_aead_xchacha20poly1305_ietf_ABYTES
+    outbuf = ffi.from_buffer("unsigned char[]", out, require_writable=True)
+    ensure(
+        len(outbuf) >= sum(map(len, mbufs)) + overhead * len(mbufs),
+        "Output buffer is too small",
+        raising=exc.ValueError,
+    )
+
+    if aad:
+        _aad = aad
+        aalen = len(aad)
+    else:
+        _aad = ffi.NULL
+        aalen = 0
+
+    clen = ffi.new("unsigned long long *")
+    encrypt = lib.crypto_aead_xchacha20poly1305_ietf_encrypt
+
+    pos = 0
+    for i, message in enumerate(mbufs):
+        nonce = nbuf + i * npub
+        ffi.memmove(outbuf + pos, nonce, npub)
+        pos += npub
+        res = encrypt(
+            outbuf + pos,
+            clen,
+            message,
+            len(message),
+            _aad,
+            aalen,
+            ffi.NULL,
+            nonce,
+            key,
+        )
+        ensure(res == 0, "Encryption failed.", raising=exc.CryptoError)
+        pos += clen[0]
+    return pos
+
+
 def crypto_aead_xchacha20poly1305_ietf_decrypt(
     ciphertext: bytes, aad: Optional[bytes], nonce: bytes, key: bytes
 ) -> bytes:
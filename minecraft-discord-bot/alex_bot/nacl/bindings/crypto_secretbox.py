@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import ByteString, Sequence
 
 from nacl import exceptions as exc
 from nacl._sodium import ffi, lib
@@ -54,6 +55,73 @@ def crypto_secretbox(message: bytes, nonce: bytes, key: bytes) -> bytes:
     return ciphertext[crypto_secretbox_BOXZEROBYTES:]
 
 
+def crypto_secretbox_batch(
+    messages: Sequence[ByteString],
+    nonces: ByteString,
+    key: bytes,
+    out: ByteString,
+) -> int:
+    """
+    Encrypts each of ``messages`` with the secret ``key`` and the nonce at
+    the same index in ``nonces``, writing one record per message into a
+    caller supplied buffer: the nonce followed by the authenticator and
+    the ciphertext.
+
+    The arguments are checked, and the zero padded input buffer of the
+    NaCl API allocated, once for the whole batch.
+
+    :param messages: messages, any objects supporting the buffer protocol
+    :param nonces: the concatenated nonces, one per message
+    :param key: bytes
+    :param out: a writable buffer of at least the total length of the
+                messages + ``len(messages)`` *
+                (:data:`.crypto_secretbox_NONCEBYTES` +
+                :data:`.crypto_secretbox_MACBYTES`) bytes
+    :return: the number of bytes written to ``out``
+    :rtype: int
+    """
+    if len(key) != crypto_secretbox_KEYBYTES:
+        raise exc.ValueError("Invalid key")
+
+    nbuf = ffi.from_buffer("unsigned char[]", nonces)
+    if len(nbuf) != crypto_secretbox_NONCEBYTES * len(messages):
+        raise exc.ValueError("Invalid nonce")
+
+    mbufs = [ffi.from_buffer("unsigned char[]", m) for m in messages]
+    lengths = [len(m) for m in mbufs]
+    overhead = crypto_secretbox_NONCEBYTES + crypto_secretbox_MACBYTES
+    outbuf = ffi.from_buffer("unsigned char[]", out, require_writable=True)
+    ensure(
+        len(outbuf) >= sum(lengths) + overhead * len(messages),
+        "Output buffer is too small",
+        raising=exc.ValueError,
+    )
+
+    padded = ffi.new(
+        "unsigned char[]", crypto_secretbox_ZEROBYTES + max(lengths, default=0)
+    )
+    message_start = padded + crypto_secretbox_ZEROBYTES
+    # The output starts with BOXZEROBYTES zero bytes: let those land on the
+    # end of the record's nonce, which is copied in after encrypting.
+    shift = crypto_secretbox_NONCEBYTES - crypto_secretbox_BOXZEROBYTES
+
+    pos = 0
+    for i, (message, mlen) in enumerate(zip(mbufs, lengths)):
+        ffi.memmove(message_start, message, mlen)
+        nonce = nbuf + i * crypto_secretbox_NONCEBYTES
+        res = lib.crypto_secretbox(
+            outbuf + pos + shift,
+            padded,
+            crypto_secretbox_ZEROBYTES + mlen,
+            nonce,
+            key,
+        )
+        ensure(res == 0, "Encryption failed", raising=exc.CryptoError)
+        ffi.memmove(outbuf + pos, nonce, crypto_secretbox_NONCEBYTES)
+        pos += overhead + mlen
+    return pos
+
+
 def crypto_secretbox_open(
     ciphertext: bytes, nonce: bytes, key: bytes
 ) -> bytes:
@@ -193,6 +193,78 @@ def crypto_secretstream_xchacha20poly1305_push(
     return ffi.buffer(state.rawbuf, clen)[:]
 
 
+def crypto_secretstream_xchacha20poly1305_push_into(
+    state: crypto_secretstream_xchacha20poly1305_state,
+    m: ByteString,
+    out: ByteString,
+    ad: Optional[bytes] = None,
+    tag: int = crypto_secretstream_xchacha20poly1305_TAG_MESSAGE,
+) -> int:
+    """
+    Add an encrypted message to the secret stream, writing the ciphertext
+    into a caller supplied buffer instead of allocating a new one.
+
+    :param state: a secretstream state object
+    :type state: crypto_secretstream_xchacha20poly1305_state
+    :param m: the message to encrypt, any object supporting the buffer
+              protocol (e.g. :class:`bytearray` or :class:`memoryview`)
+    :param out: a writable buffer of at least ``len(m)`` +
+                :data:`.crypto_secretstream_xchacha20poly1305_ABYTES` bytes
+    :param ad: additional data to include in the authentication tag
+    :type ad: bytes or None
+    :param tag: the message tag
+    :type tag: int
+    :return: the number of ciphertext bytes written to ``out``
+    :rtype: int
+
+    """
+    ensure(
+        isinstance(state, crypto_secretstream_xchacha20poly1305_state),
+        "State must be a crypto_secretstream_xchacha20poly1305_state object",
+        raising=exc.TypeError,
+    )
+    mbuf = ffi.from_buffer("unsigned char[]", m)
+    mlen = len(mbuf)
+    ensure(
+        mlen <= crypto_secretstream_xchacha20poly1305_MESSAGEBYTES_MAX,
+        "Message is too long",
+        raising=exc.ValueError,
+    )
+    ensure(
+        ad is None or isinstance(ad, bytes),
+        "Additional data must be bytes or None",
+        raising=exc.TypeError,
+    )
+
+    clen = mlen + crypto_secretstream_xchacha20poly1305_ABYTES
+    outbuf = ffi.from_buffer("unsigned char[]", out, require_writable=True)
+    ensure(
+        len(outbuf) >= clen,
+        "Output buffer is too small",
+        raising=exc.ValueError,
+    )
+
+    if ad is None:
+        ad = ffi.NULL
+        adlen = 0
+    else:
+        adlen = len(ad)
+
+    rc = lib.crypto_secretstream_xchacha20poly1305_push(
+        state.statebuf,
+        outbuf,
+        ffi.NULL,
+        mbuf,
+        mlen,
+        ad,
+        adlen,
+        tag,
+    )
+    ensure(rc == 0, "Unexpected failure", raising=exc.RuntimeError)
+
+    return clen
+
+
 def crypto_secretstream_xchacha20poly1305_init_pull(
     state: crypto_secretstream_xchacha20poly1305_state,
     header: bytes,
@@ -334,6 +406,97 @@ def crypto_secretstream_xchacha20poly1305_pull(
     )
 
 
+def crypto_secretstream_xchacha20poly1305_pull_into(
+    state: crypto_secretstream_xchacha20poly1305_state,
+    c: ByteString,
+    out: ByteString,
+    ad: Optional[bytes] = None,
+) -> Tuple[int, int]:
+    """
+    Read a decrypted message from the secret stream into a caller supplied
+    buffer instead of allocating a new one.
+
+    :param state: a secretstream state object
+    :type state: crypto_secretstream_xchacha20poly1305_state
+    :param c: the ciphertext to decrypt, any object supporting the buffer
+              protocol (e.g. :class:`bytearray` or :class:`memoryview`)
+    :param out: a writable buffer of at least ``len(c)`` -
+                :data:`.crypto_secretstream_xchacha20poly1305_ABYTES` bytes
+    :param ad: additional data to include in the authentication tag
+    :type ad: bytes or None
+    :return: (number of message bytes written to ``out``, tag)
+    :rtype: (int, int)
+
+    """
+    ensure(
+        isinstance(state, crypto_secretstream_xchacha20poly1305_state),
+        "State must be a crypto_secretstream_xchacha20poly1305_state object",
+        raising=exc.TypeError,
+    )
+    ensure(
+        state.tagbuf is not None,
+        (
+            "State must be initialized using "
+            "crypto_secretstream_xchacha20poly1305_init_pull"
+        ),
+        raising=exc.ValueError,
+    )
+    cbuf = ffi.from_buffer("unsigned char[]", c)
+    clen = len(cbuf)
+    ensure(
+        clen >= crypto_secretstream_xchacha20poly1305_ABYTES,
+        "Ciphertext is too short",
+        raising=exc.ValueError,
+    )
+    ensure(
+        clen
+        <= (
+            crypto_secretstream_xchacha20poly1305_MESSAGEBYTES_MAX
+            + crypto_secretstream_xchacha20poly1305_ABYTES
+        ),
+        "Ciphertext is too long",
+        raising=exc.ValueError,
+    )
+    ensure(
+        ad is None or isinstance(ad, bytes),
+        "Additional data must be bytes or None",
+        raising=exc.TypeError,
+    )
+
+    mlen = clen - crypto_secretstream_xchacha20poly1305_ABYTES
+    outbuf = ffi.from_buffer("unsigned char[]", out, require_writable=True)
+    ensure(
+        len(outbuf) >= mlen,
+        "Output buffer is too small",
+        raising=exc.ValueError,
+    )
+
+    if ad is None:
+        ad = ffi.NULL
+        adlen = 0
+    else:
+        adlen = len(ad)
+
+    rc = lib.crypto_secretstream_xchacha20poly1305_pull(
+        state.statebuf,
+        outbuf,
+        ffi.NULL,
+        state.tagbuf,
+        cbuf,
+        clen,
+        ad,
+        adlen,
+    )
+    ensure(
+        rc == 0,
+        "Decryption failed. Ciphertext failed verification",
+        raising=exc.CryptoError,
+    )
+
+    # Cast safety: we `ensure` above that `state.tagbuf is not None`.
+    return mlen, int(cast(bytes, state.tagbuf)[0])
+
+
 def crypto_secretstream_xchacha20poly1305_rekey(
     state: crypto_secretstream_xchacha20poly1305_state,
 ) -> None:
@@ -0,0 +1,445 @@
+# Copyright 2013 Donald Stufft and individual contributors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Coroutine variants of the :py:mod:`nacl.pwhash` functions.
+
+Password hashing is deliberately slow and memory hungry, so calling it
+from an event loop stalls every other task.  The coroutines here run the
+hash in a bounded thread pool instead (libsodium releases the GIL while
+hashing) and charge each call's ``memlimit`` against a byte budget, so
+that the hashes running at once never use more than ``memory_budget``
+bytes, ``memlimit * max_workers`` by default but never less than the
+largest ``memlimit`` the coroutines use by default, so that a call with
+default arguments is never refused.
+
+    >>> hasher = PwhashExecutor(max_workers=2)
+    >>> stored = await hasher.str(b"hunter2")
+    >>> await hasher.verify(stored, b"hunter2")
+    True
+
+The module level coroutines share a lazily created default executor.
+"""
+import asyncio
+import builtins
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+import nacl.encoding
+from nacl import exceptions as exc
+from nacl.exceptions import ensure
+
+from . import argon2i, argon2id, scrypt
+
+_T = TypeVar("_T")
+
+_ITOA64 = b"./0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def _decode64_uint32(src: bytes) -> int:
+    value = 0
+    for shift, char in enumerate(src):
+        value |= _ITOA64.index(char) << (6 * shift)
+    return value
+
+
+def hash_memlimit(password_hash: bytes, default: int) -> int:
+    """
+    Return the number of bytes verifying ``password_hash`` will use, as
+    encoded in its parameters, or ``default`` if the string cannot be
+    parsed
+
+    :param password_hash: password hash serialized in modular crypt() format
+    :type password_hash: bytes
+    :param default: value returned for unrecognized hashes
+    :type default: int
+    :rtype: int
+    """
+    try:
+        if password_hash.startswith((argon2id.STRPREFIX, argon2i.STRPREFIX)):
+            for field in password_hash.split(b"$")[3].split(b","):
+                if field.startswith(b"m="):
+                    return int(field[2:]) * 1024
+        elif password_hash.startswith(scrypt.STRPREFIX):
+            params = password_hash[len(scrypt.STRPREFIX) :]
+            n = 1 << _ITOA64.index(params[0])
+            r = _decode64_uint32(params[1:6])
+            p = _decode64_uint32(params[6:11])
+            return 128 * r * (n + p)
+    except (IndexError, ValueError):
+        pass
+    return default
+
+
+# The largest memlimit passed by default, by kdf and scrypt_kdf; the
+# default memory budget is never smaller, so those calls always fit
+_DEFAULT_BUDGET_MIN = max(
+    argon2id.MEMLIMIT_SENSITIVE, scrypt.MEMLIMIT_SENSITIVE
+)
+
+
+class PwhashExecutor:
+    """
+    Runs password hashing calls in a bounded pool of worker threads,
+    without letting the ``memlimit`` of the calls running at once exceed
+    ``memory_budget`` bytes
+
+    A call whose ``memlimit`` does not fit in the remaining budget waits
+    for running calls to finish; a call whose ``memlimit`` exceeds the
+    whole budget is refused up front.
+
+    :param max_workers: number of worker threads, defaults to the number
+                        of CPUs
+    :type max_workers: int
+    :param memlimit: memory charged for a hash whose cost is unknown, and
+                     the per-worker share of the default budget
+    :type memlimit: int
+    :param memory_budget: maximum number of bytes in use by concurrent
+                          hashes, defaults to ``memlimit * max_workers``
+                          or the largest default ``memlimit`` of the
+                          coroutines, whichever is greater
+    :type memory_budget: int
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        memlimit: int = argon2id.MEMLIMIT_INTERACTIVE,
+        memory_budget: Optional[int] = None,
+    ):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        ensure(
+            max_workers > 0,
+            "max_workers must be positive",
+            raising=exc.ValueError,
+        )
+        if memory_budget is None:
+            memory_budget = max(memlimit * max_workers, _DEFAULT_BUDGET_MIN)
+        ensure(
+            memory_budget >= memlimit,
+            "memory_budget must hold at least one memlimit",
+            raising=exc.ValueError,
+        )
+        self.max_workers = max_workers
+        self.memlimit = memlimit
+        self.memory_budget = memory_budget
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pwhash"
+        )
+
+    @property
+    def memory_in_use(self) -> int:
+        """Bytes charged by the hashes currently running"""
+        return self._in_use
+
+    def _run(self, cost: int, func: Callable[..., _T], *args: object) -> _T:
+        with self._cond:
+            while self._in_use + cost > self.memory_budget:
+                self._cond.wait()
+            self._in_use += cost
+        try:
+            return func(*args)
+        finally:
+            with self._cond:
+                self._in_use -= cost
+                self._cond.notify_all()
+
+    async def run(
+        self, cost: int, func: Callable[..., _T], *args: object
+    ) -> _T:
+        """
+        Run ``func(*args)`` in a worker thread once ``cost`` bytes of the
+        memory budget are available, and return its result
+
+        :param cost: bytes of memory ``func`` will use
+        :type cost: int
+        :param func: blocking callable
+        """
+        ensure(
+            cost <= self.memory_budget,
+            "memlimit {} exceeds the memory budget of {} bytes".format(
+                cost, self.memory_budget
+            ),
+            raising=exc.ValueError,
+        )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, functools.partial(self._run, cost, func, *args)
+        )
+
+    async def str(
+        self,
+        password: bytes,
+        opslimit: int = argon2id.OPSLIMIT_INTERACTIVE,
+        memlimit: int = argon2id.MEMLIMIT_INTERACTIVE,
+    ) -> bytes:
+        """
+        Coroutine variant of :py:func:`nacl.pwhash.argon2id.str`
+
+        :param bytes password:
+        :param int opslimit:
+        :param int memlimit:
+        :rtype: bytes
+        """
+        return await self.run(
+            memlimit, argon2id.str, password, opslimit, memlimit
+        )
+
+    async def kdf(
+        self,
+        size: int,
+        password: bytes,
+        salt: bytes,
+        opslimit: int = argon2id.OPSLIMIT_SENSITIVE,
+        memlimit: int = argon2id.MEMLIMIT_SENSITIVE,
+        encoder: nacl.encoding.Encoder = nacl.encoding.RawEncoder,
+    ) -> bytes:
+        """
+        Coroutine variant of :py:func:`nacl.pwhash.argon2id.kdf`
+
+        :param size: derived key size, must be between
+                     :py:const:`.argon2id.BYTES_MIN` and
+                     :py:const:`.argon2id.BYTES_MAX`
+        :type size: int
+        :param password: password used to seed the key derivation procedure
+        :type password: bytes
+        :param salt: **RANDOM** salt used in the key derivation procedure
+        :type salt: bytes
+        :param opslimit: the time component (operation count)
+        :type opslimit: int
+        :param memlimit: the memory usage of the derivation, in bytes
+        :type memlimit: int
+        :rtype: bytes
+        """
+        return await self.run(
+            memlimit,
+            argon2id.kdf,
+            size,
+            password,
+            salt,
+            opslimit,
+            memlimit,
+            encoder,
+        )
+
+    async def scrypt_str(
+        self,
+        password: bytes,
+        opslimit: int = scrypt.OPSLIMIT_INTERACTIVE,
+        memlimit: int = scrypt.MEMLIMIT_INTERACTIVE,
+    ) -> bytes:
+        """
+        Coroutine variant of :py:func:`nacl.pwhash.scrypt.str`
+
+        :param bytes password:
+        :param int opslimit:
+        :param int memlimit:
+        :rtype: bytes
+        :raises nacl.exceptions.UnavailableError: If called when using a
+            minimal build of libsodium.
+        """
+        return await self.run(
+            memlimit, scrypt.str, password, opslimit, memlimit
+        )
+
+    async def scrypt_kdf(
+        self,
+        size: int,
+        password: bytes,
+        salt: bytes,
+        opslimit: int = scrypt.OPSLIMIT_SENSITIVE,
+        memlimit: int = scrypt.MEMLIMIT_SENSITIVE,
+        encoder: nacl.encoding.Encoder = nacl.encoding.RawEncoder,
+    ) -> bytes:
+        """
+        Coroutine variant of :py:func:`nacl.pwhash.scrypt.kdf`
+
+        :param size: derived key size
+        :type size: int
+        :param password: password used to seed the key derivation procedure
+        :type password: bytes
+        :param salt: **RANDOM** salt used in the key derivation procedure
+        :type salt: bytes
+        :param opslimit: the time component (operation count)
+        :type opslimit: int
+        :param memlimit: the memory usage of the derivation, in bytes
+        :type memlimit: int
+        :rtype: bytes
+        :raises nacl.exceptions.UnavailableError: If called when using a
+            minimal build of libsodium.
+        """
+        return await self.run(
+            memlimit,
+            scrypt.kdf,
+            size,
+            password,
+            salt,
+            opslimit,
+            memlimit,
+            encoder,
+        )
+
+    async def verify(self, password_hash: bytes, password: bytes) -> bool:
+        """
+        Coroutine variant of :py:func:`nacl.pwhash.verify`; the memory
+        charged is read from the parameters stored in ``password_hash``
+
+        :param password_hash: password hash serialized in modular crypt()
+                              format
+        :type password_hash: bytes
+        :param password: user provided password
+        :type password: bytes
+        :rtype: boolean
+        """
+        from nacl.pwhash import verify
+
+        cost = hash_memlimit(password_hash, self.memlimit)
+        return await self.run(cost, verify, password_hash, password)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads once the queued hashes are done"""
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "PwhashExecutor":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.shutdown()
+
+
+_default_executor: Optional[PwhashExecutor] = None
+_default_lock = threading.Lock()
+
+
+def get_default_executor() -> PwhashExecutor:
+    """Return the executor used by the module level coroutines"""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = PwhashExecutor()
+        return _default_executor
+
+
+def set_default_executor(executor: PwhashExecutor) -> None:
+    """
+    Replace the executor used by the module level coroutines, e.g. to size
+    it for the host; the previous executor is not shut down
+    """
+    global _default_executor
+    with _default_lock:
+        _default_executor = executor
+
+
+async def str(
+    password: bytes,
+    opslimit: int = argon2id.OPSLIMIT_INTERACTIVE,
+    memlimit: int = argon2id.MEMLIMIT_INTERACTIVE,
+) -> bytes:
+    """Coroutine variant of :py:func:`nacl.pwhash.str`"""
+    return await get_default_executor().str(password, opslimit, memlimit)
+
+
+async def kdf(
+    size: int,
+    password: bytes,
+    salt: bytes,
+    opslimit: int = argon2id.OPSLIMIT_SENSITIVE,
+    memlimit: int = argon2id.MEMLIMIT_SENSITIVE,
+    encoder: nacl.encoding.Encoder = nacl.encoding.RawEncoder,
+) -> bytes:
+    """Coroutine variant of :py:func:`nacl.pwhash.argon2id.kdf`"""
+    return await get_default_executor().kdf(
+        size, password, salt, opslimit, memlimit, encoder
+    )
+
+
+async def verify(password_hash: bytes, password: bytes) -> bool:
+    """Coroutine variant of :py:func:`nacl.pwhash.verify`"""
+    return await get_default_executor().verify(password_hash, password)
+
+
+def _time_str(
+    func: Callable[[bytes, int, int], bytes], opslimit: int, memlimit: int
+) -> float:
+    t0 = time.perf_counter()
+    func(b"calibration password", opslimit, memlimit)
+    return time.perf_counter() - t0
+
+
+def calibrate(
+    target: float = 0.5,
+    memlimit: int = argon2id.MEMLIMIT_INTERACTIVE,
+    algorithm: builtins.str = "argon2id",
+    rounds: int = 3,
+) -> Tuple[int, int]:
+    """
+    Benchmark this host and return an ``(opslimit, memlimit)`` pair for
+    which one hash takes about ``target`` seconds
+
+    The ``memlimit`` is kept unless even the minimal ``opslimit`` is
+    slower than ``target``, in which case it is halved until the hash
+    fits.  Hashing time grows linearly with ``opslimit``, so the result is
+    found by scaling from a measurement at a low ``opslimit``; each of the
+    ``rounds`` measurements refines that estimate.
+
+    :param target: wanted duration of one hash, in seconds
+    :type target: float
+    :param memlimit: memory to spend on each hash, in bytes
+    :type memlimit: int
+    :param algorithm: ``"argon2id"`` or ``"scrypt"``
+    :type algorithm: str
+    :param rounds: number of measurements after the initial one
+    :type rounds: int
+    :rtype: (int, int)
+    """
+    ensure(target > 0, "target must be positive", raising=exc.ValueError)
+    if algorithm == "argon2id":
+        module = argon2id
+    elif algorithm == "scrypt":
+        ensure(
+            scrypt.AVAILABLE,
+            "Not available in minimal build",
+            raising=exc.UnavailableError,
+        )
+        module = scrypt  # type: ignore[assignment]
+    else:
+        raise exc.ValueError("unsupported algorithm {!r}".format(algorithm))
+
+    memlimit = max(module.MEMLIMIT_MIN, min(memlimit, module.MEMLIMIT_MAX))
+    # scrypt only fills memlimit once opslimit reaches memlimit / 32, below
+    # that its cost is set by opslimit alone
+    opslimit = max(module.OPSLIMIT_MIN, 1)
+    if module is scrypt:
+        opslimit = max(opslimit, memlimit // 32)
+    elapsed = _time_str(module.str, opslimit, memlimit)
+    while elapsed > target and memlimit > module.MEMLIMIT_MIN:
+        memlimit = max(module.MEMLIMIT_MIN, memlimit // 2)
+        if module is scrypt:
+            opslimit = max(module.OPSLIMIT_MIN, memlimit // 32)
+        elapsed = _time_str(module.str, opslimit, memlimit)
+
+    for _ in range(rounds):
+        wanted = int(opslimit * target / max(elapsed, 1e-6))
+        wanted = max(module.OPSLIMIT_MIN, min(wanted, module.OPSLIMIT_MAX))
+        if wanted == opslimit:
+            break
+        opslimit = wanted
+        elapsed = _time_str(module.str, opslimit, memlimit)
+    return opslimit, memlimit
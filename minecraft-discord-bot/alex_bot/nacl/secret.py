@@ -11,15 +11,107 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import ClassVar, Optional
+from typing import (
+    BinaryIO,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
 import nacl.bindings
 from nacl import encoding
 from nacl import exceptions as exc
-from nacl.utils import EncryptedMessage, StringFixer, random
+from nacl.utils import (
+    CounterNonces,
+    EncryptedMessage,
+    PooledRandomNonces,
+    StringFixer,
+    random,
+)
 
+NonceSource = Union[str, CounterNonces, PooledRandomNonces]
 
-class SecretBox(encoding.Encodable, StringFixer):
+_random_nonces: Dict[int, PooledRandomNonces] = {}
+
+
+def _take_nonces(
+    box: "_BatchEncrypt", nonces: NonceSource, count: int
+) -> memoryview:
+    """
+    Returns ``count`` concatenated nonces for ``box`` from the strategy
+    named by ``nonces``, or from the given nonce generator.
+    """
+    if nonces == "random":
+        source = _random_nonces.get(box.NONCE_SIZE)
+        if source is None:
+            source = _random_nonces.setdefault(
+                box.NONCE_SIZE, PooledRandomNonces(box.NONCE_SIZE)
+            )
+    elif nonces == "counter":
+        if box._counter_nonces is None:
+            box._counter_nonces = CounterNonces(box.NONCE_SIZE)
+        source = box._counter_nonces
+    elif isinstance(nonces, str):
+        raise exc.ValueError("Unknown nonce strategy %r" % nonces)
+    else:
+        source = nonces
+
+    if source.size != box.NONCE_SIZE:
+        raise exc.ValueError(
+            "The nonces must be exactly %s bytes long" % box.NONCE_SIZE,
+        )
+    return memoryview(source.take(count))
+
+
+def _nbytes(plaintext: bytes) -> int:
+    # len() of a buffer other than bytes may count items, not bytes
+    if type(plaintext) is bytes:
+        return len(plaintext)
+    return memoryview(plaintext).nbytes
+
+
+def _batch_buffer(
+    plaintexts: Sequence[bytes], overhead: int, out: Optional[bytearray]
+) -> memoryview:
+    size = sum(map(_nbytes, plaintexts)) + overhead * len(plaintexts)
+    if out is None:
+        out = bytearray(size)
+    elif len(out) < size:
+        raise exc.ValueError(
+            "The output buffer must be at least %s bytes long" % size,
+        )
+    return memoryview(out)
+
+
+def _split_records(
+    view: memoryview, plaintexts: Sequence[bytes], overhead: int
+) -> List[memoryview]:
+    records = []
+    pos = 0
+    for plaintext in plaintexts:
+        end = pos + overhead + _nbytes(plaintext)
+        records.append(view[pos:end])
+        pos = end
+    return records
+
+
+class _BatchEncrypt:
+    """
+    State shared by the classes offering ``encrypt_many``.
+    """
+
+    NONCE_SIZE: ClassVar[int]
+
+    _counter_nonces: Optional[CounterNonces] = None
+
+
+class SecretBox(encoding.Encodable, StringFixer, _BatchEncrypt):
     """
     The SecretBox class encrypts and decrypts messages using the given secret
     key.
@@ -116,6 +208,43 @@ class SecretBox(encoding.Encodable, StringFixer):
             encoder.encode(nonce + ciphertext),
         )
 
+    def encrypt_many(
+        self,
+        plaintexts: Sequence[bytes],
+        nonces: NonceSource = "random",
+        out: Optional[bytearray] = None,
+    ) -> List[memoryview]:
+        """
+        Encrypts each of the ``plaintexts`` into one preallocated buffer and
+        returns a view of each nonce + ciphertext, in the same layout as
+        :meth:`encrypt` returns with the raw encoder, so each can be given
+        to :meth:`decrypt`.
+
+        ``nonces`` is ``"random"`` for random nonces cut from a pool filled
+        by bulk requests, ``"counter"`` for a counter following a random
+        prefix that is kept for the lifetime of this box, or a
+        :class:`~nacl.utils.CounterNonces` or
+        :class:`~nacl.utils.PooledRandomNonces` instance.
+
+        :param plaintexts: [:class:`bytes`] The plaintext messages to
+            encrypt
+        :param nonces: The nonce strategy
+        :param out: [:class:`bytearray`] A buffer to write into, of at least
+            ``len(plaintexts)`` * (:attr:`NONCE_SIZE` + :attr:`MACBYTES`)
+            bytes plus the total length of the plaintexts; allocated if
+            omitted
+        :rtype: list of [:class:`memoryview`] into the output buffer
+        """
+        view = _batch_buffer(plaintexts, self.NONCE_SIZE + self.MACBYTES, out)
+        nonce_view = _take_nonces(self, nonces, len(plaintexts))
+
+        nacl.bindings.crypto_secretbox_batch(
+            plaintexts, nonce_view, self._key, view
+        )
+        return _split_records(
+            view, plaintexts, self.NONCE_SIZE + self.MACBYTES
+        )
+
     def decrypt(
         self,
         ciphertext: bytes,
@@ -153,7 +282,7 @@ class SecretBox(encoding.Encodable, StringFixer):
         return plaintext
 
 
-class Aead(encoding.Encodable, StringFixer):
+class Aead(encoding.Encodable, StringFixer, _BatchEncrypt):
     """
     The AEAD class encrypts and decrypts messages using the given secret key.
 
@@ -267,6 +396,46 @@ class Aead(encoding.Encodable, StringFixer):
             encoder.encode(nonce + ciphertext),
         )
 
+    def encrypt_many(
+        self,
+        plaintexts: Sequence[bytes],
+        aad: bytes = b"",
+        nonces: NonceSource = "random",
+        out: Optional[bytearray] = None,
+    ) -> List[memoryview]:
+        """
+        Encrypts each of the ``plaintexts``, authenticated together with
+        ``aad``, into one preallocated buffer and returns a view of each
+        nonce + ciphertext, in the same layout as :meth:`encrypt` returns
+        with the raw encoder, so each can be given to :meth:`decrypt`.
+
+        ``nonces`` is ``"random"`` for random nonces cut from a pool filled
+        by bulk requests, ``"counter"`` for a counter following a random
+        prefix that is kept for the lifetime of this instance, or a
+        :class:`~nacl.utils.CounterNonces` or
+        :class:`~nacl.utils.PooledRandomNonces` instance.
+
+        :param plaintexts: [:class:`bytes`] The plaintext messages to
+            encrypt
+        :param aad: [:class:`bytes`] Additional data authenticated with
+            every message
+        :param nonces: The nonce strategy
+        :param out: [:class:`bytearray`] A buffer to write into, of at least
+            ``len(plaintexts)`` * (:attr:`NONCE_SIZE` + :attr:`MACBYTES`)
+            bytes plus the total length of the plaintexts; allocated if
+            omitted
+        :rtype: list of [:class:`memoryview`] into the output buffer
+        """
+        view = _batch_buffer(plaintexts, self.NONCE_SIZE + self.MACBYTES, out)
+        nonce_view = _take_nonces(self, nonces, len(plaintexts))
+
+        nacl.bindings.crypto_aead_xchacha20poly1305_ietf_encrypt_batch(
+            plaintexts, aad, nonce_view, self._key, view
+        )
+        return _split_records(
+            view, plaintexts, self.NONCE_SIZE + self.MACBYTES
+        )
+
     def decrypt(
         self,
         ciphertext: bytes,
@@ -303,3 +472,285 @@ class Aead(encoding.Encodable, StringFixer):
         )
 
         return plaintext
+
+
+def _readfull(
+    readinto: Callable[[memoryview], Optional[int]], buf: memoryview
+) -> int:
+    """
+    Fill ``buf`` from ``readinto`` until it is full or the source is
+    exhausted, returning the number of bytes read.
+    """
+    total = 0
+    size = len(buf)
+    while total < size:
+        n = readinto(buf[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
+class _IterReader:
+    """
+    Adapts an iterable of byte chunks of arbitrary sizes to the
+    ``readinto`` protocol used by the stream classes.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def readinto(self, buf: memoryview) -> int:
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks)).cast("B")
+            except StopIteration:
+                return 0
+        n = min(len(buf), len(self._pending))
+        buf[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+class _SecretStream(encoding.Encodable, StringFixer):
+    """
+    Shared key handling for :class:`StreamEncryptor` and
+    :class:`StreamDecryptor`.
+    """
+
+    KEY_SIZE: ClassVar[
+        int
+    ] = nacl.bindings.crypto_secretstream_xchacha20poly1305_KEYBYTES
+    HEADER_SIZE: ClassVar[
+        int
+    ] = nacl.bindings.crypto_secretstream_xchacha20poly1305_HEADERBYTES
+    ABYTES: ClassVar[
+        int
+    ] = nacl.bindings.crypto_secretstream_xchacha20poly1305_ABYTES
+    CHUNK_SIZE_MAX: ClassVar[
+        int
+    ] = nacl.bindings.crypto_secretstream_xchacha20poly1305_MESSAGEBYTES_MAX
+    DEFAULT_CHUNK_SIZE: ClassVar[int] = 64 * 1024
+
+    _TAG_MESSAGE: ClassVar[
+        int
+    ] = nacl.bindings.crypto_secretstream_xchacha20poly1305_TAG_MESSAGE
+    _TAG_FINAL: ClassVar[
+        int
+    ] = nacl.bindings.crypto_secretstream_xchacha20poly1305_TAG_FINAL
+
+    def __init__(
+        self,
+        key: bytes,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        encoder: encoding.Encoder = encoding.RawEncoder,
+    ):
+        key = encoder.decode(key)
+        if not isinstance(key, bytes):
+            raise exc.TypeError(
+                "%s must be created from 32 bytes" % type(self).__name__
+            )
+
+        if len(key) != self.KEY_SIZE:
+            raise exc.ValueError(
+                "The key must be exactly %s bytes long" % self.KEY_SIZE,
+            )
+
+        if not 0 < chunk_size <= self.CHUNK_SIZE_MAX:
+            raise exc.ValueError("Invalid chunk size %r" % chunk_size)
+
+        self._key = key
+        self._chunk_size = chunk_size
+
+    def __bytes__(self) -> bytes:
+        return self._key
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+
+class StreamEncryptor(_SecretStream):
+    """
+    The StreamEncryptor class encrypts arbitrarily long byte streams using
+    `XChaCha20-Poly1305 secretstream`_, in fixed size chunks and with
+    bounded memory.
+
+    The output is the stream header followed by one ciphertext chunk of
+    ``chunk_size`` + :attr:`ABYTES` bytes per ``chunk_size`` bytes of
+    plaintext; the last chunk may be shorter and carries the ``FINAL`` tag,
+    so truncation of the stream is detected when decrypting. The same
+    ``chunk_size`` must be used by the :class:`StreamDecryptor`.
+
+    Each call to :meth:`encrypt_file` or :meth:`encrypt_iter` starts a new
+    stream with a fresh random header, so a single instance can be reused
+    for many streams.
+
+    .. _XChaCha20-Poly1305 secretstream: https://doc.libsodium.org/secret-key_cryptography/secretstream
+
+    :param key: The secret key used to encrypt the stream
+    :param chunk_size: The number of plaintext bytes per chunk
+    :param encoder: The encoder class used to decode the given key
+
+    :cvar KEY_SIZE: The size that the key is required to be.
+    :cvar HEADER_SIZE: The size of the header starting each stream.
+    :cvar ABYTES: The per-chunk size overhead in bytes.
+    """
+
+    def _encrypt(
+        self,
+        readinto: Callable[[memoryview], Optional[int]],
+        aad: Optional[bytes],
+    ) -> Iterator[memoryview]:
+        state = nacl.bindings.crypto_secretstream_xchacha20poly1305_state()
+        yield memoryview(
+            nacl.bindings.crypto_secretstream_xchacha20poly1305_init_push(
+                state, self._key
+            )
+        )
+
+        push_into = (
+            nacl.bindings.crypto_secretstream_xchacha20poly1305_push_into
+        )
+        size = self._chunk_size
+        cur = memoryview(bytearray(size))
+        nxt = memoryview(bytearray(size))
+        out = memoryview(bytearray(size + self.ABYTES))
+
+        n = _readfull(readinto, cur)
+        while True:
+            # Read one chunk ahead so the last one can be tagged FINAL
+            # without emitting an extra empty chunk.
+            m = _readfull(readinto, nxt) if n == size else 0
+            tag = self._TAG_MESSAGE if m else self._TAG_FINAL
+            clen = push_into(state, cur[:n], out, aad, tag)
+            yield out[:clen]
+
+            if not m:
+                return
+            cur, nxt, n = nxt, cur, m
+
+    def encrypt_file(
+        self, src: BinaryIO, dst: BinaryIO, aad: Optional[bytes] = None
+    ) -> int:
+        """
+        Encrypts everything readable from the binary file object ``src`` and
+        writes the stream to ``dst``. ``src`` must support ``readinto``;
+        chunks are read into and encrypted from preallocated buffers, so
+        memory use does not depend on the size of the input.
+
+        :param src: the binary file object to read plaintext from
+        :param dst: the binary file object to write the stream to
+        :param aad: additional data authenticated with every chunk
+        :return: the number of bytes written to ``dst``
+        :rtype: int
+        """
+        written = 0
+        for block in self._encrypt(src.readinto, aad):
+            dst.write(block)
+            written += len(block)
+        return written
+
+    def encrypt_iter(
+        self, chunks: Iterable[bytes], aad: Optional[bytes] = None
+    ) -> Iterator[bytes]:
+        """
+        Encrypts an iterable of plaintext byte chunks of any size, yielding
+        the stream header followed by each ciphertext chunk.
+
+        :param chunks: an iterable of bytes-like plaintext pieces
+        :param aad: additional data authenticated with every chunk
+        :rtype: iterator of [:class:`bytes`]
+        """
+        for block in self._encrypt(_IterReader(chunks).readinto, aad):
+            yield bytes(block)
+
+
+class StreamDecryptor(_SecretStream):
+    """
+    The StreamDecryptor class decrypts streams produced by
+    :class:`StreamEncryptor`, in fixed size chunks and with bounded memory.
+
+    Every chunk is authenticated before it is returned. A stream that is
+    truncated, reordered, tampered with or followed by trailing data
+    raises :class:`~nacl.exceptions.CryptoError`; plaintext already
+    returned for earlier chunks was authentic, but callers must treat the
+    output as incomplete.
+
+    :param key: The secret key used to decrypt the stream
+    :param chunk_size: The number of plaintext bytes per chunk, as used by
+                       the encryptor
+    :param encoder: The encoder class used to decode the given key
+    """
+
+    def _decrypt(
+        self,
+        readinto: Callable[[memoryview], Optional[int]],
+        aad: Optional[bytes],
+    ) -> Iterator[memoryview]:
+        header = memoryview(bytearray(self.HEADER_SIZE))
+        if _readfull(readinto, header) != self.HEADER_SIZE:
+            raise exc.CryptoError("Stream header is truncated")
+
+        state = nacl.bindings.crypto_secretstream_xchacha20poly1305_state()
+        nacl.bindings.crypto_secretstream_xchacha20poly1305_init_pull(
+            state, header.tobytes(), self._key
+        )
+
+        pull_into = (
+            nacl.bindings.crypto_secretstream_xchacha20poly1305_pull_into
+        )
+        block = self._chunk_size + self.ABYTES
+        cur = memoryview(bytearray(block))
+        out = memoryview(bytearray(self._chunk_size))
+
+        while True:
+            n = _readfull(readinto, cur)
+            if n < self.ABYTES:
+                raise exc.CryptoError("Stream is truncated")
+
+            mlen, tag = pull_into(state, cur[:n], out, aad)
+            if tag == self._TAG_FINAL:
+                if _readfull(readinto, memoryview(bytearray(1))):
+                    raise exc.CryptoError("Unexpected data after final chunk")
+                yield out[:mlen]
+                return
+
+            if n < block:
+                raise exc.CryptoError("Stream is truncated")
+            yield out[:mlen]
+
+    def decrypt_file(
+        self, src: BinaryIO, dst: BinaryIO, aad: Optional[bytes] = None
+    ) -> int:
+        """
+        Decrypts the stream readable from the binary file object ``src``
+        and writes the plaintext to ``dst``. ``src`` must support
+        ``readinto``.
+
+        :param src: the binary file object to read the stream from
+        :param dst: the binary file object to write plaintext to
+        :param aad: additional data authenticated with every chunk
+        :return: the number of bytes written to ``dst``
+        :rtype: int
+        """
+        written = 0
+        for block in self._decrypt(src.readinto, aad):
+            dst.write(block)
+            written += len(block)
+        return written
+
+    def decrypt_iter(
+        self, chunks: Iterable[bytes], aad: Optional[bytes] = None
+    ) -> Iterator[bytes]:
+        """
+        Decrypts an iterable of stream byte pieces of any size, yielding
+        the plaintext of each authenticated chunk.
+
+        :param chunks: an iterable of bytes-like stream pieces
+        :param aad: additional data authenticated with every chunk
+        :rtype: iterator of [:class:`bytes`]
+        """
+        for block in self._decrypt(_IterReader(chunks).readinto, aad):
+            yield bytes(block)
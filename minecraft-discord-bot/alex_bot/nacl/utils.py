@@ -14,10 +14,15 @@
 
 
 import os
-from typing import SupportsBytes, Type, TypeVar
+import sys
+import threading
+import weakref
+from array import array
+from typing import Optional, SupportsBytes, Type, TypeVar, Union
 
 import nacl.bindings
 from nacl import encoding
+from nacl import exceptions as exc
 
 _EncryptedMessage = TypeVar("_EncryptedMessage", bound="EncryptedMessage")
 
@@ -71,6 +76,149 @@ def random(size: int = 32) -> bytes:
     return os.urandom(size)
 
 
+# Nonce generators whose state a forked child inherits. Handing out the
+# same nonces in the parent and the child would reuse them under the same
+# key, so the child resets them.
+_nonce_generators: "weakref.WeakSet[Union[CounterNonces, PooledRandomNonces]]" = (
+    weakref.WeakSet()
+)
+
+
+def _reset_nonces_after_fork() -> None:
+    for generator in list(_nonce_generators):
+        generator._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_nonces_after_fork)
+
+
+class CounterNonces:
+    """
+    Generates unique nonces made of a random prefix followed by a 64 bit
+    little endian counter, without a call into the random number generator
+    per nonce.
+
+    The prefix is drawn once, so two instances never share a nonce unless
+    they were given the same ``prefix``. The counter must **never** be
+    rolled back; an instance refuses to produce more than 2⁶⁴ nonces.
+
+    In a child process created by :func:`os.fork` a random prefix is drawn
+    again, so the child's nonces differ from its parent's. An instance
+    given its ``prefix`` can't do that, and raises
+    :class:`~nacl.exceptions.RuntimeError` in the child instead.
+
+    :param size: The size of each nonce, at least 8 bytes
+    :param prefix: The ``size`` - 8 bytes preceding the counter, random by
+                   default
+    :param start: The first counter value
+    """
+
+    COUNTER_SIZE = 8
+
+    def __init__(
+        self, size: int, prefix: Optional[bytes] = None, start: int = 0
+    ):
+        if size < self.COUNTER_SIZE:
+            raise exc.ValueError(
+                "Nonces must be at least %s bytes long" % self.COUNTER_SIZE
+            )
+        random_prefix = prefix is None
+        if prefix is None:
+            prefix = random(size - self.COUNTER_SIZE)
+        if len(prefix) != size - self.COUNTER_SIZE:
+            raise exc.ValueError(
+                "The prefix must be exactly %s bytes long"
+                % (size - self.COUNTER_SIZE)
+            )
+        self.size = size
+        self._prefix = prefix
+        self._counter = start
+        self._start = start
+        self._random_prefix = random_prefix
+        self._forked = False
+        self._lock = threading.Lock()
+        _nonce_generators.add(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        if self._random_prefix:
+            self._prefix = random(self.size - self.COUNTER_SIZE)
+            self._counter = self._start
+        else:
+            self._forked = True
+
+    def take(self, count: int) -> bytes:
+        """
+        Returns ``count`` consecutive nonces, concatenated.
+        """
+        with self._lock:
+            if self._forked:
+                raise exc.RuntimeError(
+                    "CounterNonces with a fixed prefix can't be used after "
+                    "a fork, the nonces would repeat the parent's"
+                )
+            first = self._counter
+            if first + count > 2**64:
+                raise exc.ValueError("Nonce counter exhausted")
+            self._counter = first + count
+
+        counters = array("Q", range(first, first + count))
+        if sys.byteorder == "big":
+            counters.byteswap()
+        raw = counters.tobytes()
+
+        # Fill one byte column of the output at a time, so the work done
+        # per nonce happens in C.
+        size, offset = self.size, self.size - self.COUNTER_SIZE
+        nonces = bytearray(size * count)
+        for i in range(offset):
+            nonces[i::size] = self._prefix[i : i + 1] * count
+        for i in range(self.COUNTER_SIZE):
+            nonces[offset + i :: size] = raw[i :: self.COUNTER_SIZE]
+        return bytes(nonces)
+
+
+class PooledRandomNonces:
+    """
+    Hands out random nonces cut from a pool filled by one bulk request to
+    the operating system's random number generator.
+
+    The nonces are as random as those drawn one at a time; the pool only
+    amortizes the cost of the system call. A child process created by
+    :func:`os.fork` discards the pool it inherited.
+
+    :param size: The size of each nonce
+    :param pool_size: The number of nonces fetched per refill
+    """
+
+    def __init__(self, size: int, pool_size: int = 4096):
+        self.size = size
+        self._pool_bytes = size * pool_size
+        self._pool = b""
+        self._pos = 0
+        self._lock = threading.Lock()
+        _nonce_generators.add(self)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._pool = b""
+        self._pos = 0
+
+    def take(self, count: int) -> bytes:
+        """
+        Returns ``count`` random nonces, concatenated.
+        """
+        need = self.size * count
+        with self._lock:
+            if len(self._pool) - self._pos < need:
+                self._pool = random(max(need, self._pool_bytes))
+                self._pos = 0
+            pos = self._pos
+            self._pos = pos + need
+            return self._pool[pos : pos + need]
+
+
 def randombytes_deterministic(
     size: int, seed: bytes, encoder: encoding.Encoder = encoding.RawEncoder
 ) -> bytes:
@@ -11,8 +11,10 @@ __all__ = ['c_lexer', 'c_parser', 'c_ast']
 __version__ = '2.22'
 
 import io
+import os
 from subprocess import check_output
 from .c_parser import CParser
+from . import ast_serialize
 
 
 def preprocess_file(filename, cpp_path='cpp', cpp_args=''):
@@ -91,3 +93,67 @@ def parse_file(filename, use_cpp=False, cpp_path='cpp', cpp_args='',
     if parser is None:
         parser = CParser()
     return parser.parse(text, filename)
+
+
+def parse_files(filenames, use_cpp=False, cpp_path='cpp', cpp_args='',
+                encoding=None, workers=None):
+    """ Parse many C files in parallel using a pool of processes.
+
+        filenames:
+            The files you want to parse.
+
+        use_cpp, cpp_path, cpp_args, encoding:
+            Refer to the documentation of parse_file for the meaning of
+            these arguments. They apply to every file.
+
+        workers:
+            Number of worker processes. Defaults to the number of CPUs.
+            With workers=1 the files are parsed one after the other in
+            the current process, with a single CParser.
+
+        Each worker keeps one CParser for all the files it handles, and
+        sends the ASTs back encoded with ast_serialize.dumps. Returns a
+        list of ASTs in the order of filenames. If a file fails to
+        preprocess or parse, the error of the first such file is raised.
+    """
+    filenames = list(filenames)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(filenames))
+    args = (use_cpp, cpp_path, cpp_args, encoding)
+
+    if workers <= 1:
+        parser = CParser()
+        return [parse_file(filename, use_cpp, cpp_path, cpp_args,
+                           parser=parser, encoding=encoding)
+                for filename in filenames]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Hand out files in small batches to amortize the IPC round trips,
+    # but keep enough batches per worker to balance uneven file sizes
+    chunksize = max(1, len(filenames) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_parse_files_init,
+                             initargs=args) as pool:
+        return [ast_serialize.loads(data) for data in
+                pool.map(_parse_files_worker, filenames,
+                         chunksize=chunksize)]
+
+
+# State of a parse_files() worker process: its CParser and options
+_worker_parser = None
+_worker_args = None
+
+
+def _parse_files_init(*args):
+    global _worker_parser, _worker_args
+    _worker_parser = CParser()
+    _worker_args = args
+
+
+def _parse_files_worker(filename):
+    use_cpp, cpp_path, cpp_args, encoding = _worker_args
+    ast = parse_file(filename, use_cpp, cpp_path, cpp_args,
+                     parser=_worker_parser, encoding=encoding)
+    return ast_serialize.dumps(ast)
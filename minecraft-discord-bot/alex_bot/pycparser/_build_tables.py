@@ -31,6 +31,13 @@ c_parser.CParser(
     yacc_debug=False,
     yacc_optimize=True)
 
+# Write the marshalled tables that CParser loads by default
+#
+from pycparser.ply import yacc
+lr = yacc.LRTable()
+signature = lr.read_table('yacctab')
+lr.marshal_table('yacctab.marshal', signature)
+
 # Load to compile into .pyc
 #
 importlib.invalidate_caches()
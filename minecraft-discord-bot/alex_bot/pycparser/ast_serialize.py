@@ -0,0 +1,235 @@
+#-----------------------------------------------------------------
+# pycparser: ast_serialize.py
+#
+# Compact binary serialization of c_ast trees.
+#
+# A tree is flattened in preorder into one array of unsigned ints.
+# Each node is written as its index in the node-type table (the
+# order of the nodes in _c_ast.cfg), optionally followed by a
+# reference to its coordinates, and then one tagged value per entry
+# of its configuration. Strings and other scalars are interned into
+# a table and referenced by index, so the repeated type names,
+# qualifiers and file names of a typical header are stored once.
+# Coord objects are stored once each in a second array, so nodes
+# that shared a Coord still share it after loading.
+#
+# License: BSD
+#-----------------------------------------------------------------
+import marshal
+import os
+import sys
+import zlib
+from array import array
+from itertools import repeat
+
+from . import c_ast
+from ._ast_gen import ASTCodeGenerator
+from .plyparser import Coord
+
+__all__ = ['dumps', 'loads']
+
+# Bump when the layout of the encoding changes
+FORMAT_VERSION = 1
+
+# Value tags
+_NONE = 0
+_NODE = 1
+_LIST = 2
+_SCALAR = 3
+
+_SCALAR_TYPES = (str, int, float, bool, bytes)
+
+
+def _load_node_types():
+    """ Build the node-type table from _c_ast.cfg.
+
+        Returns (types, index, signature). types is a list of
+        (class, entries) in configuration order, index maps each
+        class to its position, and signature is a checksum of the
+        configuration that is stored in the header so that data
+        written against a different table is rejected.
+    """
+    cfg = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       '_c_ast.cfg')
+    gen = ASTCodeGenerator(cfg)
+    types = []
+    index = {}
+    sig = 0
+    for node_cfg in gen.node_cfg:
+        cls = getattr(c_ast, node_cfg.name)
+        entries = tuple(node_cfg.all_entries)
+        index[cls] = len(types)
+        types.append((cls, entries))
+        sig = zlib.crc32(
+            ('%s:%s;' % (node_cfg.name, ','.join(entries))).encode('ascii'),
+            sig)
+    return types, index, sig
+
+
+_node_types = None
+
+
+def _get_node_types():
+    global _node_types
+    if _node_types is None:
+        _node_types = _load_node_types()
+    return _node_types
+
+
+def dumps(node, coords=True):
+    """ Serialize the c_ast tree rooted at node to bytes.
+
+        node:
+            Any c_ast.Node, usually the FileAST returned by
+            CParser.parse.
+
+        coords:
+            Pass False to drop the coordinates of all nodes, which
+            makes the output about a third smaller. loads() then
+            returns nodes with coord=None.
+    """
+    types, index, sig = _get_node_types()
+    out = []
+    emit = out.append
+    strings = []
+    interned = {}
+    coord_ints = []
+    coord_index = {}
+
+    def intern(value):
+        # Key on the type too: True == 1 and 1.0 == 1 must not merge
+        key = (value.__class__, value)
+        i = interned.get(key)
+        if i is None:
+            i = interned[key] = len(strings)
+            strings.append(value)
+        return i
+
+    def write_node(n):
+        try:
+            t = index[n.__class__]
+        except KeyError:
+            raise TypeError('cannot serialize %r' % (n,))
+        emit(t)
+        if coords:
+            c = n.coord
+            if c is None:
+                emit(0)
+            else:
+                i = coord_index.get(id(c))
+                if i is None:
+                    i = coord_index[id(c)] = len(coord_index) + 1
+                    coord_ints.append(intern(c.file))
+                    coord_ints.append(c.line)
+                    coord_ints.append(
+                        0 if c.column is None else c.column + 1)
+                emit(i)
+        for name in types[t][1]:
+            write_value(getattr(n, name))
+
+    def write_value(value):
+        if value is None:
+            emit(_NONE)
+        elif isinstance(value, c_ast.Node):
+            emit(_NODE)
+            write_node(value)
+        elif isinstance(value, list):
+            emit(_LIST)
+            emit(len(value))
+            for item in value:
+                write_value(item)
+        elif isinstance(value, _SCALAR_TYPES):
+            emit(_SCALAR)
+            emit(intern(value))
+        else:
+            raise TypeError('cannot serialize %r' % (value,))
+
+    write_node(node)
+    return marshal.dumps((FORMAT_VERSION, sig, bool(coords), sys.byteorder,
+                          tuple(strings), _pack(out), _pack(coord_ints)))
+
+
+def _pack(ints):
+    """ Pack a list of unsigned ints into (typecode, bytes), using the
+        smallest item size that fits the largest value.
+    """
+    top = max(ints) if ints else 0
+    if top < 0x100:
+        typecode = 'B'
+    elif top < 0x10000:
+        typecode = 'H'
+    elif top < 0x100000000:
+        typecode = 'I'
+    else:
+        typecode = 'Q'
+    return typecode, array(typecode, ints).tobytes()
+
+
+def _unpack(packed, byteorder):
+    typecode, payload = packed
+    ints = array(typecode)
+    ints.frombytes(payload)
+    if byteorder != sys.byteorder:
+        ints.byteswap()
+    return ints
+
+
+def loads(data):
+    """ Rebuild a c_ast tree from bytes produced by dumps().
+
+        Raises ValueError if the data was written by an incompatible
+        version of this module or against a different _c_ast.cfg.
+    """
+    types, _, sig = _get_node_types()
+    try:
+        (version, data_sig, coords, byteorder,
+            strings, packed, packed_coords) = marshal.loads(data)
+    except (EOFError, TypeError, ValueError):
+        raise ValueError('not a serialized c_ast tree')
+    if version != FORMAT_VERSION or data_sig != sig:
+        raise ValueError('serialized c_ast tree is from an incompatible '
+                         'version of pycparser')
+
+    ints = _unpack(packed_coords, byteorder)
+    coord_table = [None]
+    for i in range(0, len(ints), 3):
+        column = ints[i + 2]
+        coord_table.append(Coord(strings[ints[i]], ints[i + 1],
+                                 column - 1 if column else None))
+
+    nxt = iter(_unpack(packed, byteorder)).__next__
+    # (class, number of entries) in node-type table order
+    node_types = [(cls, len(entries)) for cls, entries in types]
+
+    def read_node():
+        cls, n = node_types[nxt()]
+        coord = coord_table[nxt()] if coords else None
+        args = []
+        for _ in repeat(None, n):
+            tag = nxt()
+            if tag == _NODE:
+                args.append(read_node())
+            elif tag == _SCALAR:
+                args.append(strings[nxt()])
+            elif tag == _LIST:
+                args.append(read_list())
+            else:
+                args.append(None)
+        args.append(coord)
+        return cls(*args)
+
+    def read_list():
+        items = []
+        for _ in repeat(None, nxt()):
+            tag = nxt()
+            if tag == _NODE:
+                items.append(read_node())
+            elif tag == _SCALAR:
+                items.append(strings[nxt()])
+            elif tag == _LIST:
+                items.append(read_list())
+            else:
+                items.append(None)
+        return items
+
+    return read_node()
@@ -13,6 +13,13 @@ class CGenerator(object):
     """ Uses the same visitor pattern as c_ast.NodeVisitor, but modified to
         return a value from each visit method, using string accumulation in
         generic_visit.
+
+        Statement-level nodes (FileAST, FuncDef, Compound and the control
+        flow statements) are generated by _write_* methods that pass their
+        output fragments to a callable instead of concatenating strings.
+        write() uses them to stream code into a file or a list without
+        building the whole translation unit in memory; their visit_*
+        counterparts join the fragments into a string.
     """
     def __init__(self, reduce_parentheses=False):
         """ Constructs C-code generator
@@ -24,6 +31,7 @@ class CGenerator(object):
         # the _make_indent method.
         self.indent_level = 0
         self.reduce_parentheses = reduce_parentheses
+        self._writer_cache = {}
 
     def _make_indent(self):
         return ' ' * self.indent_level
@@ -32,6 +40,44 @@ class CGenerator(object):
         method = 'visit_' + node.__class__.__name__
         return getattr(self, method, self.generic_visit)(node)
 
+    def write(self, node, out):
+        """ Generates code for node into out, which is either a text file
+            object or a list that the code fragments are appended to.
+            ''.join() of the fragments (or the file contents) equals
+            visit(node).
+        """
+        write = out.append if isinstance(out, list) else out.write
+        self._write(node, write)
+
+    def _write(self, n, write):
+        try:
+            writer = self._writer_cache[n.__class__]
+        except KeyError:
+            writer = self._writer_cache[n.__class__] = \
+                self._get_writer(n.__class__.__name__)
+        writer(n, write)
+
+    def _get_writer(self, name):
+        """ Returns the _write_* method for nodes of the class called name,
+            or a fallback that writes the result of visit(). The fallback is
+            also used when a subclass overrides the visit_* method, so that
+            write() and visit() always produce the same code.
+        """
+        writer = getattr(self, '_write_' + name, None)
+        method = 'visit_' + name
+        if (writer is None or
+                getattr(type(self), method, None) is not
+                getattr(CGenerator, method, None)):
+            return lambda n, write: write(self.visit(n))
+        return writer
+
+    def _join(self, writer, n):
+        """ Runs a _write_* method and returns its output as a string.
+        """
+        buf = []
+        writer(n, buf.append)
+        return ''.join(buf)
+
     def generic_visit(self, node):
         if node is None:
             return ''
@@ -102,11 +148,41 @@ class CGenerator(object):
         # If the left operator is weaker binding than the current, then
         # parentheses are necessary:
         # e.g., `(a+b) * c` is NOT equivalent to `a+b * c`.
-        lval_str = self._parenthesize_if(
+        #
+        # Long chains such as `a + b + c + ...` nest to the left, so the
+        # left operands are walked iteratively instead of recursing once per
+        # operator. A subclass that overrides visit_BinaryOp still has it
+        # called for every nested operator.
+        if type(self).visit_BinaryOp is not CGenerator.visit_BinaryOp:
+            return '%s %s %s' % (self._visit_binary_left(n), n.op,
+                                 self._visit_binary_right(n))
+        spine = []
+        while isinstance(n, c_ast.BinaryOp):
+            spine.append(n)
+            n = n.left
+        # The innermost left operand is not a BinaryOp, so it only needs
+        # parentheses if it is not simple.
+        parts = [self._parenthesize_unless_simple(n)]
+        left = None
+        for n in reversed(spine):
+            if left is not None and not (
+                    self.reduce_parentheses and
+                    self.precedence_map[left.op] >=
+                    self.precedence_map[n.op]):
+                parts.insert(0, '(')
+                parts.append(')')
+            parts.append(' %s %s' % (n.op, self._visit_binary_right(n)))
+            left = n
+        return ''.join(parts)
+
+    def _visit_binary_left(self, n):
+        return self._parenthesize_if(
             n.left,
             lambda d: not (self._is_simple_node(d) or
                       self.reduce_parentheses and isinstance(d, c_ast.BinaryOp) and
                       self.precedence_map[d.op] >= self.precedence_map[n.op]))
+
+    def _visit_binary_right(self, n):
         # If `n.right.op` has a stronger -but not equal- binding precedence,
         # parenthesis can be omitted on the right:
         # e.g., `a + (b*c)` is equivalent to `a + b*c`.
@@ -114,12 +190,11 @@ class CGenerator(object):
         # are necessary:
         # e.g., `a * (b+c)` is NOT equivalent to `a * b+c` and
         #       `a - (b+c)` is NOT equivalent to `a - b+c` (same precedence).
-        rval_str = self._parenthesize_if(
+        return self._parenthesize_if(
             n.right,
             lambda d: not (self._is_simple_node(d) or
                       self.reduce_parentheses and isinstance(d, c_ast.BinaryOp) and
                       self.precedence_map[d.op] > self.precedence_map[n.op]))
-        return '%s %s %s' % (lval_str, n.op, rval_str)
 
     def visit_Assignment(self, n):
         rval_str = self._parenthesize_if(
@@ -197,34 +272,49 @@ class CGenerator(object):
             )
 
     def visit_FuncDef(self, n):
-        decl = self.visit(n.decl)
+        return self._join(self._write_FuncDef, n)
+
+    def _write_FuncDef(self, n, write):
+        write(self.visit(n.decl))
         self.indent_level = 0
-        body = self.visit(n.body)
+        write('\n')
         if n.param_decls:
-            knrdecls = ';\n'.join(self.visit(p) for p in n.param_decls)
-            return decl + '\n' + knrdecls + ';\n' + body + '\n'
-        else:
-            return decl + '\n' + body + '\n'
+            write(';\n'.join(self.visit(p) for p in n.param_decls))
+            write(';\n')
+        self._write(n.body, write)
+        write('\n')
 
     def visit_FileAST(self, n):
+        # Join the fragments one external declaration at a time, so that
+        # they never take more memory than the code of a single function.
         s = ''
         for ext in n.ext:
-            if isinstance(ext, c_ast.FuncDef):
-                s += self.visit(ext)
-            elif isinstance(ext, c_ast.Pragma):
-                s += self.visit(ext) + '\n'
-            else:
-                s += self.visit(ext) + ';\n'
+            s += self._join(self._write_ext, ext)
         return s
 
+    def _write_FileAST(self, n, write):
+        for ext in n.ext:
+            self._write_ext(ext, write)
+
+    def _write_ext(self, ext, write):
+        if isinstance(ext, c_ast.FuncDef):
+            self._write(ext, write)
+        elif isinstance(ext, c_ast.Pragma):
+            write(self.visit(ext) + '\n')
+        else:
+            write(self.visit(ext) + ';\n')
+
     def visit_Compound(self, n):
-        s = self._make_indent() + '{\n'
+        return self._join(self._write_Compound, n)
+
+    def _write_Compound(self, n, write):
+        write(self._make_indent() + '{\n')
         self.indent_level += 2
         if n.block_items:
-            s += ''.join(self._generate_stmt(stmt) for stmt in n.block_items)
+            for stmt in n.block_items:
+                self._write_stmt(stmt, write)
         self.indent_level -= 2
-        s += self._make_indent() + '}\n'
-        return s
+        write(self._make_indent() + '}\n')
 
     def visit_CompoundLiteral(self, n):
         return '(' + self.visit(n.type) + '){' + self.visit(n.init) + '}'
@@ -254,40 +344,58 @@ class CGenerator(object):
         return s
 
     def visit_If(self, n):
-        s = 'if ('
-        if n.cond: s += self.visit(n.cond)
-        s += ')\n'
-        s += self._generate_stmt(n.iftrue, add_indent=True)
-        if n.iffalse:
-            s += self._make_indent() + 'else\n'
-            s += self._generate_stmt(n.iffalse, add_indent=True)
-        return s
+        return self._join(self._write_If, n)
+
+    def _write_If(self, n, write):
+        while True:
+            write('if (')
+            if n.cond: write(self.visit(n.cond))
+            write(')\n')
+            self._write_stmt(n.iftrue, write, add_indent=True)
+            if not n.iffalse:
+                return
+            write(self._make_indent() + 'else\n')
+            if (not isinstance(n.iffalse, c_ast.If) or
+                    type(self).visit_If is not CGenerator.visit_If):
+                self._write_stmt(n.iffalse, write, add_indent=True)
+                return
+            # `else if` chains are generated by this loop instead of
+            # recursing once per branch. This is what _write_stmt would do
+            # for the nested If.
+            write(' ' * (self.indent_level + 2))
+            n = n.iffalse
 
     def visit_For(self, n):
-        s = 'for ('
-        if n.init: s += self.visit(n.init)
-        s += ';'
-        if n.cond: s += ' ' + self.visit(n.cond)
-        s += ';'
-        if n.next: s += ' ' + self.visit(n.next)
-        s += ')\n'
-        s += self._generate_stmt(n.stmt, add_indent=True)
-        return s
+        return self._join(self._write_For, n)
+
+    def _write_For(self, n, write):
+        write('for (')
+        if n.init: write(self.visit(n.init))
+        write(';')
+        if n.cond: write(' ' + self.visit(n.cond))
+        write(';')
+        if n.next: write(' ' + self.visit(n.next))
+        write(')\n')
+        self._write_stmt(n.stmt, write, add_indent=True)
 
     def visit_While(self, n):
-        s = 'while ('
-        if n.cond: s += self.visit(n.cond)
-        s += ')\n'
-        s += self._generate_stmt(n.stmt, add_indent=True)
-        return s
+        return self._join(self._write_While, n)
+
+    def _write_While(self, n, write):
+        write('while (')
+        if n.cond: write(self.visit(n.cond))
+        write(')\n')
+        self._write_stmt(n.stmt, write, add_indent=True)
 
     def visit_DoWhile(self, n):
-        s = 'do\n'
-        s += self._generate_stmt(n.stmt, add_indent=True)
-        s += self._make_indent() + 'while ('
-        if n.cond: s += self.visit(n.cond)
-        s += ');'
-        return s
+        return self._join(self._write_DoWhile, n)
+
+    def _write_DoWhile(self, n, write):
+        write('do\n')
+        self._write_stmt(n.stmt, write, add_indent=True)
+        write(self._make_indent() + 'while (')
+        if n.cond: write(self.visit(n.cond))
+        write(');')
 
     def visit_StaticAssert(self, n):
         s = '_Static_assert('
@@ -299,24 +407,34 @@ class CGenerator(object):
         return s
 
     def visit_Switch(self, n):
-        s = 'switch (' + self.visit(n.cond) + ')\n'
-        s += self._generate_stmt(n.stmt, add_indent=True)
-        return s
+        return self._join(self._write_Switch, n)
+
+    def _write_Switch(self, n, write):
+        write('switch (' + self.visit(n.cond) + ')\n')
+        self._write_stmt(n.stmt, write, add_indent=True)
 
     def visit_Case(self, n):
-        s = 'case ' + self.visit(n.expr) + ':\n'
+        return self._join(self._write_Case, n)
+
+    def _write_Case(self, n, write):
+        write('case ' + self.visit(n.expr) + ':\n')
         for stmt in n.stmts:
-            s += self._generate_stmt(stmt, add_indent=True)
-        return s
+            self._write_stmt(stmt, write, add_indent=True)
 
     def visit_Default(self, n):
-        s = 'default:\n'
+        return self._join(self._write_Default, n)
+
+    def _write_Default(self, n, write):
+        write('default:\n')
         for stmt in n.stmts:
-            s += self._generate_stmt(stmt, add_indent=True)
-        return s
+            self._write_stmt(stmt, write, add_indent=True)
 
     def visit_Label(self, n):
-        return n.name + ':\n' + self._generate_stmt(n.stmt)
+        return self._join(self._write_Label, n)
+
+    def _write_Label(self, n, write):
+        write(n.name + ':\n')
+        self._write_stmt(n.stmt, write)
 
     def visit_Goto(self, n):
         return 'goto ' + n.name + ';'
@@ -391,6 +509,13 @@ class CGenerator(object):
             for individual visit_* methods to handle different treatment of
             some statements in this context.
         """
+        buf = []
+        self._write_stmt(n, buf.append, add_indent)
+        return ''.join(buf)
+
+    def _write_stmt(self, n, write, add_indent=False):
+        """ Streaming version of _generate_stmt.
+        """
         typ = type(n)
         if add_indent: self.indent_level += 2
         indent = self._make_indent()
@@ -404,17 +529,20 @@ class CGenerator(object):
             # These can also appear in an expression context so no semicolon
             # is added to them automatically
             #
-            return indent + self.visit(n) + ';\n'
+            write(indent + self.visit(n) + ';\n')
         elif typ in (c_ast.Compound,):
             # No extra indentation required before the opening brace of a
             # compound - because it consists of multiple lines it has to
             # compute its own indentation.
             #
-            return self.visit(n)
+            self._write(n, write)
         elif typ in (c_ast.If,):
-            return indent + self.visit(n)
+            write(indent)
+            self._write(n, write)
         else:
-            return indent + self.visit(n) + '\n'
+            write(indent)
+            self._write(n, write)
+            write('\n')
 
     def _generate_decl(self, n):
         """ Generation from a Decl node.
@@ -6,6 +6,11 @@
 # Eli Bendersky [https://eli.thegreenplace.net/]
 # License: BSD
 #------------------------------------------------------------------------------
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
 from .ply import yacc
 
 from . import c_ast
@@ -24,7 +29,10 @@ class CParser(PLYParser):
             yacc_optimize=True,
             yacctab='pycparser.yacctab',
             yacc_debug=False,
-            taboutputdir=''):
+            taboutputdir='',
+            yacc_marshal=True,
+            incremental=False,
+            incremental_cache_size=10000):
         """ Create a new CParser.
 
             Some arguments for controlling the debug/optimization
@@ -73,6 +81,31 @@ class CParser(PLYParser):
             taboutputdir:
                 Set this parameter to control the location of generated
                 lextab and yacctab files.
+
+            yacc_marshal:
+                Load the default yacc table from yacctab.marshal,
+                a marshal dump of the tables written by _build_tables.py,
+                instead of importing yacctab.py. This is much faster
+                because no Python code has to run to rebuild the tables.
+                Falls back to yacctab.py if the file is missing or out
+                of date. Ignored when a custom yacctab is given.
+
+            incremental:
+                Cache the result of every top-level declaration, keyed
+                on a hash of its source and of all the source before
+                it, so that parsing a text which shares a prefix with
+                an earlier one (e.g. the same headers followed by
+                different code) only parses the part that differs.
+                The typedef names declared by the cached prefix are
+                restored before resuming. ASTs returned in this mode
+                share nodes with earlier results and must be treated
+                as read-only.
+
+            incremental_cache_size:
+                The most declarations kept by incremental mode. Once
+                it is reached, the least recently used ones are
+                forgotten, so a long-lived parser doesn't grow without
+                bound. None keeps every declaration.
         """
         self.clex = lexer(
             error_func=self._lex_error_func,
@@ -106,13 +139,19 @@ class CParser(PLYParser):
         for rule in rules_with_opt:
             self._create_opt_rule(rule)
 
+        marshalfile = None
+        if yacc_marshal and yacctab == 'pycparser.yacctab':
+            marshalfile = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), 'yacctab.marshal')
+
         self.cparser = yacc.yacc(
             module=self,
             start='translation_unit_or_empty',
             debug=yacc_debug,
             optimize=yacc_optimize,
             tabmodule=yacctab,
-            outputdir=taboutputdir)
+            outputdir=taboutputdir,
+            marshalfile=marshalfile)
 
         # Stack of scopes for keeping track of symbols. _scope_stack[-1] is
         # the current (topmost) scope. Each scope is a dictionary that
@@ -127,6 +166,12 @@ class CParser(PLYParser):
         # Keeps track of the last token given to yacc (the lookahead token)
         self._last_yielded_token = None
 
+        # Results of top-level declarations for incremental mode, keyed
+        # on the hash of the source up to and including the declaration
+        self._incremental = incremental
+        self._decl_cache = OrderedDict()
+        self._decl_cache_size = incremental_cache_size
+
     def parse(self, text, filename='', debug=False):
         """ Parses C code and returns an AST.
 
@@ -140,6 +185,15 @@ class CParser(PLYParser):
             debug:
                 Debug flag to YACC
         """
+        if self._incremental:
+            try:
+                return self._parse_incremental(text, filename, debug)
+            except ParseError:
+                # The source could not be split into independently
+                # parseable declarations (or is invalid); a full parse
+                # either succeeds or reports the error properly.
+                pass
+
         self.clex.filename = filename
         self.clex.reset_lineno()
         self._scope_stack = [dict()]
@@ -149,8 +203,62 @@ class CParser(PLYParser):
                 lexer=self.clex,
                 debug=debug)
 
+    def clear_cache(self):
+        """ Forget the declarations cached in incremental mode.
+        """
+        self._decl_cache.clear()
+
     ######################--   PRIVATE   --######################
 
+    def _parse_incremental(self, text, filename, debug):
+        file_scope = {}
+        ext = []
+        lineno = 1
+        key = hashlib.sha1(filename.encode('utf-8'))
+
+        start = 0
+        for end in _split_external_declarations(text):
+            chunk = text[start:end]
+            key.update(chunk.encode('utf-8'))
+            digest = key.digest()
+
+            entry = self._decl_cache.get(digest)
+            if entry is None:
+                # Pad the first line so that columns match the full text
+                column = start - (text.rfind('\n', 0, start) + 1)
+                entry = self._parse_external_declarations(
+                    ' ' * column + chunk, file_scope, lineno, filename, debug)
+                self._decl_cache[digest] = entry
+                if self._decl_cache_size is not None:
+                    while len(self._decl_cache) > self._decl_cache_size:
+                        self._decl_cache.popitem(last=False)
+            else:
+                self._decl_cache.move_to_end(digest)
+
+            decls, names, lineno, filename = entry
+            ext.extend(decls)
+            file_scope.update(names)
+            start = end
+
+        self._scope_stack = [file_scope]
+        return c_ast.FileAST(ext)
+
+    def _parse_external_declarations(self, text, file_scope, lineno,
+                                     filename, debug):
+        """ Parse a piece of a translation unit on top of the file scope
+            left by the pieces before it. Returns the declarations, the
+            names it added to the file scope and the lexer position
+            after it.
+        """
+        scope = _FileScopeOverlay(file_scope)
+        self.clex.filename = filename
+        self.clex.lexer.lineno = lineno
+        self._scope_stack = [scope]
+        self._last_yielded_token = None
+        ast = self.cparser.parse(input=text, lexer=self.clex, debug=debug)
+        return (tuple(ast.ext), tuple(scope.items()),
+                self.clex.lexer.lineno, self.clex.filename)
+
     def _push_scope(self):
         self._scope_stack.append(dict())
 
@@ -1948,3 +2056,76 @@ class CParser(PLYParser):
                             column=self.clex.find_tok_column(p)))
         else:
             self._parse_error('At end of input', self.clex.filename)
+
+
+class _FileScopeOverlay(dict):
+    """ The file scope used while parsing one piece of a translation unit
+        in incremental mode: new names are stored in this dict, lookups
+        fall back to the names declared by the previous pieces.
+    """
+    def __init__(self, base):
+        dict.__init__(self)
+        self.base = base
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return self.base.get(name, default)
+
+
+# Tokens that matter for finding the end of external declarations:
+# comments, string and char literals (which may contain any of the
+# others), preprocessor lines, and brackets, semicolons and '='.
+_r_split_tokens = re.compile(r"""
+    /\*.*?\*/ | //[^\n]*
+    | "(?:\\.|[^"\\\n])*" | '(?:\\.|[^'\\\n])*'
+    | ^[ \t]*\#[^\n]*
+    | [!<>=]= | [{}();=]
+    """, re.VERBOSE | re.MULTILINE | re.DOTALL)
+
+
+def _split_external_declarations(text):
+    """ Return the offsets where the external declarations in text end.
+        This is a heuristic: a declaration ends at a ';' outside of any
+        brackets, at the '}' closing a function body, or at the end of a
+        preprocessor line that starts a declaration. A wrong split only
+        makes the pieces fail to parse, which falls back to a full parse.
+    """
+    ends = []
+    start = 0
+    braces = parens = 0
+    function_body = initializer = False
+    for match in _r_split_tokens.finditer(text):
+        tok = match.group()
+        c = tok[0]
+        if c == ';':
+            if braces == 0 and parens == 0:
+                ends.append(match.end())
+                start = match.end()
+                function_body = initializer = False
+        elif c == '{':
+            if braces == 0:
+                before = text[start:match.start()].rstrip()
+                function_body = before.endswith(')') and not initializer
+            braces += 1
+        elif c == '}':
+            braces -= 1
+            if braces == 0 and function_body:
+                ends.append(match.end())
+                start = match.end()
+                function_body = initializer = False
+        elif c == '(':
+            parens += 1
+        elif c == ')':
+            parens -= 1
+        elif tok == '=':
+            if braces == 0 and parens == 0:
+                initializer = True
+        elif tok.lstrip().startswith('#'):
+            at_start = not text[start:match.start()].strip()
+            if braces == 0 and parens == 0 and at_start:
+                ends.append(match.end())
+                start = match.end()
+    if start < len(text):
+        ends.append(len(text))
+    return ends
@@ -131,6 +131,8 @@ def trigraph(input):
 #    .arglist   - List of argument names
 #    .variadic  - Boolean indicating whether or not variadic macro
 #    .vararg    - Name of the variadic parameter
+#    .expansion - Memoized expansion of an object-like macro (see
+#                 expand_object_macro())
 #
 # When a macro is created, the macro replacement token sequence is
 # pre-scanned and used to create patch lists that are later used
@@ -146,6 +148,15 @@ class Macro(object):
         if variadic:
             self.vararg = arglist[-1]
         self.source = None
+        self.expansion = None
+
+# Copy a token.  Tokens are plain objects, so this is much cheaper
+# than copy.copy()
+
+def copytoken(tok):
+    t = object.__new__(tok.__class__)
+    t.__dict__.update(tok.__dict__)
+    return t
 
 # ------------------------------------------------------------------
 # Preprocessor object
@@ -163,6 +174,15 @@ class Preprocessor(object):
         self.path = []
         self.temp_path = []
 
+        # Token lines of included files, keyed on path.  Set to None to
+        # re-read and re-tokenize a file every time it is included
+        self.include_cache = { }
+
+        # Memoize the expansions of object-like macros
+        self.memoize_macros = True
+        self.memo_deps = None
+        self.memo_ok = True
+
         # Probe the lexer for selected tokens
         self.lexprobe()
 
@@ -486,10 +506,16 @@ class Preprocessor(object):
     def expand_macros(self,tokens,expanded=None):
         if expanded is None:
             expanded = {}
+        deps = self.memo_deps
         i = 0
         while i < len(tokens):
             t = tokens[i]
             if t.type == self.t_ID:
+                if deps is not None:
+                    # Record what this name means now, for expand_object_macro()
+                    m = deps[t.value] = self.macros.get(t.value)
+                    if m is not None and m.arglist:
+                        self.memo_ok = False
                 if t.value in self.macros and t.value not in expanded:
                     # Yes, we found a macro match
                     expanded[t.value] = True
@@ -497,7 +523,7 @@ class Preprocessor(object):
                     m = self.macros[t.value]
                     if not m.arglist:
                         # A simple macro
-                        ex = self.expand_macros([copy.copy(_x) for _x in m.value],expanded)
+                        ex = self.expand_object_macro(m,expanded)
                         for e in ex:
                             e.lineno = t.lineno
                         tokens[i:i+1] = ex
@@ -542,6 +568,54 @@ class Preprocessor(object):
             i += 1
         return tokens
 
+    # ----------------------------------------------------------------------
+    # expand_object_macro()
+    #
+    # Returns the expansion of the body of object-like macro m.  The
+    # result only depends on the macros that were looked up while
+    # expanding the body, so it is memoized on the macro along with those
+    # macros (the deps) and reused for as long as every name in the deps
+    # still refers to the same macro (or to no macro).  Expansions that
+    # invoke function-like macros are not memoized, and neither are those
+    # that were cut short because a dependency was being expanded already.
+    # ----------------------------------------------------------------------
+
+    def expand_object_macro(self,m,expanded):
+        if not self.memoize_macros:
+            return self.expand_macros([copy.copy(_x) for _x in m.value],expanded)
+
+        if m.expansion is not None:
+            deps, rep = m.expansion
+            if self.memo_valid(m,deps,expanded):
+                if self.memo_deps is not None:
+                    self.memo_deps.update(deps)
+                return [copytoken(_x) for _x in rep]
+
+        outer_deps, outer_ok = self.memo_deps, self.memo_ok
+        self.memo_deps, self.memo_ok = {}, True
+        try:
+            ex = self.expand_macros([copy.copy(_x) for _x in m.value],expanded)
+            deps, ok = self.memo_deps, self.memo_ok
+        finally:
+            self.memo_deps, self.memo_ok = outer_deps, outer_ok
+
+        if ok and self.memo_valid(m,deps,expanded):
+            m.expansion = (deps, [copytoken(_x) for _x in ex])
+        if outer_deps is not None:
+            outer_deps.update(deps)
+            if not ok:
+                self.memo_ok = False
+        return ex
+
+    def memo_valid(self,m,deps,expanded):
+        macros = self.macros
+        for name, dep in deps.items():
+            if macros.get(name) is not dep:
+                return False
+            if name in expanded and name != m.name:
+                return False
+        return True
+
     # ----------------------------------------------------------------------
     # evalexpr()
     #
@@ -610,9 +684,13 @@ class Preprocessor(object):
     # ----------------------------------------------------------------------
     def parsegen(self,input,source=None):
 
-        # Replace trigraph sequences
-        t = trigraph(input)
-        lines = self.group_lines(t)
+        if isinstance(input,STRING_TYPES):
+            # Replace trigraph sequences
+            t = trigraph(input)
+            lines = self.group_lines(t)
+        else:
+            # Already grouped into lines of tokens (see include_lines())
+            lines = input
 
         if not source:
             source = ""
@@ -768,11 +846,11 @@ class Preprocessor(object):
         for p in path:
             iname = os.path.join(p,filename)
             try:
-                data = open(iname,"r").read()
+                lines = self.include_lines(iname)
                 dname = os.path.dirname(iname)
                 if dname:
                     self.temp_path.insert(0,dname)
-                for tok in self.parsegen(data,filename):
+                for tok in self.parsegen(lines,filename):
                     yield tok
                 if dname:
                     del self.temp_path[0]
@@ -782,6 +860,31 @@ class Preprocessor(object):
         else:
             print("Couldn't find '%s'" % filename)
 
+    # ----------------------------------------------------------------------
+    # include_lines()
+    #
+    # Read an included file and group it into lines of tokens.  The lines
+    # are cached on the path, and reused while the file's modification time
+    # and size stay the same.  Returns an iterator over copies of the cached
+    # tokens, since preprocessing modifies tokens in place.  Raises IOError
+    # if the file can't be read.
+    # ----------------------------------------------------------------------
+
+    def include_lines(self,iname):
+        if self.include_cache is None:
+            with open(iname,"r") as f:
+                return f.read()
+
+        st = os.stat(iname)
+        key = (st.st_mtime, st.st_size)
+        entry = self.include_cache.get(iname)
+        if entry is None or entry[0] != key:
+            with open(iname,"r") as f:
+                data = f.read()
+            entry = (key, list(self.group_lines(trigraph(data))))
+            self.include_cache[iname] = entry
+        return ([copytoken(_x) for _x in line] for line in entry[1])
+
     # ----------------------------------------------------------------------
     # define()
     #
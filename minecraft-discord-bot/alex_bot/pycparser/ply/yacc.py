@@ -2022,6 +2022,55 @@ class LRTable(object):
         in_f.close()
         return signature
 
+    def read_marshal(self, filename):
+        import marshal
+
+        if not os.path.exists(filename):
+          raise ImportError
+
+        with open(filename, 'rb') as in_f:
+            data = marshal.loads(in_f.read())
+
+        if not isinstance(data, tuple) or len(data) != 6:
+            raise ValueError('malformed yacc table file')
+        tabversion, method, signature, action, goto, productions = data
+        if tabversion != __tabversion__:
+            raise VersionError('yacc table file version is out of date')
+        self.lr_method = method
+        self.lr_action = action
+        self.lr_goto   = goto
+
+        self.lr_productions = []
+        for p in productions:
+            self.lr_productions.append(MiniProduction(*p))
+
+        return signature
+
+    # -----------------------------------------------------------------------------
+    # marshal_table()
+    #
+    # This function writes the LR parsing tables to a file in marshal format.
+    # Unlike the module written by write_table(), loading it does not execute
+    # any Python code to rebuild the tables, so it is much faster to read.
+    # It is defined here rather than on LRGeneratedTable so that tables read
+    # back from an existing table module can be converted.
+    # -----------------------------------------------------------------------------
+
+    def marshal_table(self, filename, signature=''):
+        import marshal
+
+        outp = []
+        for p in self.lr_productions:
+            if p.func:
+                outp.append((p.str, p.name, p.len, p.func, os.path.basename(p.file), p.line))
+            else:
+                outp.append((str(p), p.name, p.len, None, None, None))
+
+        data = (__tabversion__, self.lr_method, signature,
+                self.lr_action, self.lr_goto, tuple(outp))
+        with open(filename, 'wb') as outf:
+            outf.write(marshal.dumps(data))
+
     # Bind all production function names to callable objects in pdict
     def bind_callables(self, pdict):
         for p in self.lr_productions:
@@ -3213,7 +3262,8 @@ class ParserReflect(object):
 
 def yacc(method='LALR', debug=yaccdebug, module=None, tabmodule=tab_module, start=None,
          check_recursion=True, optimize=False, write_tables=True, debugfile=debug_file,
-         outputdir=None, debuglog=None, errorlog=None, picklefile=None):
+         outputdir=None, debuglog=None, errorlog=None, picklefile=None,
+         marshalfile=None):
 
     if tabmodule is None:
         tabmodule = tab_module
@@ -3284,7 +3334,20 @@ def yacc(method='LALR', debug=yaccdebug, module=None, tabmodule=tab_module, star
         if picklefile:
             read_signature = lr.read_pickle(picklefile)
         else:
-            read_signature = lr.read_table(tabmodule)
+            read_signature = None
+            if marshalfile:
+                # Fall back to the table module if the marshal file is
+                # missing or unreadable
+                try:
+                    read_signature = lr.read_marshal(marshalfile)
+                except (ImportError, VersionError, ValueError, EOFError, TypeError):
+                    read_signature = None
+                # The marshal file is only a faster copy of the table module,
+                # so a stale one is skipped even when optimize is set
+                if read_signature is not None and read_signature != signature:
+                    read_signature = None
+            if read_signature is None:
+                read_signature = lr.read_table(tabmodule)
         if optimize or (read_signature == signature):
             try:
                 lr.bind_callables(pinfo.pdict)
@@ -3486,6 +3549,13 @@ def yacc(method='LALR', debug=yaccdebug, module=None, tabmodule=tab_module, star
         except IOError as e:
             errorlog.warning("Couldn't create %r. %s" % (picklefile, e))
 
+    # Write a marshalled version of the tables
+    if marshalfile:
+        try:
+            lr.marshal_table(marshalfile, signature)
+        except IOError as e:
+            errorlog.warning("Couldn't create %r. %s" % (marshalfile, e))
+
     # Build the parser
     lr.bind_callables(pinfo.pdict)
     parser = LRParser(lr, pinfo.error_func)
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Discord sends the signature as 64 bytes of hex and the timestamp as unix
+# seconds. Anything else cannot verify, so there is no point running crypto
+SIGNATURE_HEADER = 'x-signature-ed25519'
+TIMESTAMP_HEADER = 'x-signature-timestamp'
+SIGNATURE_HEX_LENGTH = 128
+
+# Unix seconds stay below 12 digits for tens of thousands of years. Longer
+# strings would only make int() slow, or fail past its digit limit
+MAX_TIMESTAMP_DIGITS = 12
+
+# Interaction payloads are a few kilobytes at most
+MAX_BODY_LENGTH = 64 * 1024
+
+# How far a request timestamp may be from our clock, in seconds
+TIMESTAMP_WINDOW = 5 * 60
+
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+
+def normalize_headers(event: dict) -> dict:
+    '''Returns the headers of an API Gateway event with lowercase names, as
+    API Gateway passes them through with whatever case the client used.'''
+    headers = event.get('headers') or {}
+    return {name.lower(): value for name, value in headers.items()}
+
+
+def precheck(headers: dict, body: Optional[str], now: Optional[float] = None) -> Optional[str]:
+    '''Runs the checks that are cheap compared to signature verification.
+    Returns the reason the request should be rejected, or None if it may go
+    on to be verified. The headers must already be normalized.'''
+
+    signature = headers.get(SIGNATURE_HEADER)
+    timestamp = headers.get(TIMESTAMP_HEADER)
+
+    if signature is None or timestamp is None:
+        return 'missing signature headers'
+
+    if len(signature) != SIGNATURE_HEX_LENGTH or not _HEX_DIGITS.issuperset(signature):
+        return 'malformed signature'
+
+    if body is None:
+        return 'missing body'
+
+    if len(body) > MAX_BODY_LENGTH:
+        return 'body too large'
+
+    # isdigit() alone would pass digits int() doesn't take, like '²'
+    if not (timestamp.isascii() and timestamp.isdigit()) or len(timestamp) > MAX_TIMESTAMP_DIGITS:
+        return 'malformed timestamp'
+
+    if now is None:
+        now = time.time()
+    if abs(now - int(timestamp)) > TIMESTAMP_WINDOW:
+        return 'stale timestamp'
+
+    return None
+
+
+class ReplayCache:
+    '''Remembers recently accepted (timestamp, signature) pairs so the same
+    signed request can't be accepted twice.
+
+    Only pairs whose timestamp is inside the timestamp window need to be
+    kept, since precheck rejects anything older. The cache lives in the
+    memory of one Lambda execution environment, so it stops replays that
+    land on the same warm environment and bounds its own size so a flood
+    can't exhaust memory.'''
+
+    def __init__(self, max_entries: int = 4096, window: float = TIMESTAMP_WINDOW):
+        self.max_entries = max_entries
+        self.window = window
+        # Maps (timestamp, signature) to the timestamp as a number, oldest
+        # accepted first
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            key, timestamp = next(iter(entries.items()))
+            if now - timestamp <= self.window and len(entries) <= self.max_entries:
+                break
+            entries.popitem(last=False)
+
+    def seen(self, timestamp: str, signature: str, now: Optional[float] = None) -> bool:
+        '''Returns True if this pair was already accepted.'''
+        if now is None:
+            now = time.time()
+        self._expire(now)
+        return (timestamp, signature.lower()) in self._entries
+
+    def add(self, timestamp: str, signature: str, now: Optional[float] = None):
+        '''Records a pair whose signature has been verified.'''
+        if now is None:
+            now = time.time()
+        self._entries[(timestamp, signature.lower())] = int(timestamp)
+        self._expire(now)
@@ -0,0 +1,55 @@
+'''Answers /mcstatus from the status snapshot in the state store.
+
+The stopper saves a snapshot of the instance state, public IP and player
+count each time it runs. Status requests answer from that snapshot
+without any EC2 or Minecraft round trip; once it is older than
+REVALIDATE_AFTER the caller should ask for a refresh in the background
+(stale-while-revalidate) and still answer from what it has.
+'''
+
+from typing import Optional
+
+# Snapshots younger than this are answered without asking for a refresh
+REVALIDATE_AFTER = 2 * 60
+
+# At most one refresh is requested per this many seconds
+REFRESH_COOLDOWN = 60
+
+
+def needs_refresh(snapshot: Optional[dict], now: float) -> bool:
+    return snapshot is None or now - snapshot['sampled_at'] > REVALIDATE_AFTER
+
+
+def claim_refresh(store, instance_id: str, now: float) -> bool:
+    '''Returns True for the one caller per cooldown that should request a
+    refresh, however many execution environments are answering.'''
+    return store.put_if_absent(f'refresh#{instance_id}', {'expires_at': now + REFRESH_COOLDOWN}, now)
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 90:
+        return 'just now'
+    if seconds < 90 * 60:
+        return f'{round(seconds / 60)} minutes ago'
+    return f'{round(seconds / 3600)} hours ago'
+
+
+def describe(snapshot: Optional[dict], now: float) -> str:
+    '''Returns the status message for a snapshot.'''
+    if snapshot is None:
+        return "Minecraft Server status hasn't been checked yet, try again in a minute"
+
+    state = snapshot['state']
+    if state == 'running':
+        message = 'Minecraft Server is running'
+        if 'public_ip' in snapshot:
+            message += f" at {snapshot['public_ip']}"
+        if 'num_players' in snapshot:
+            players = snapshot['num_players']
+            message += f" with {players} player{'' if players == 1 else 's'} online"
+        else:
+            message += ' but not answering'
+    else:
+        message = f'Minecraft Server is {state}'
+
+    return f"{message} (checked {format_age(now - snapshot['sampled_at'])})"
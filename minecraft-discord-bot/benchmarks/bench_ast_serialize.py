@@ -0,0 +1,59 @@
+"""Compare pycparser.ast_serialize with pickle for a parsed c_ast tree.
+
+Parses a generated translation unit once, then reports the encoded size
+and the best dump and load times of both formats.
+
+    python benchmarks/bench_ast_serialize.py [--decls N] [--repeat N]
+"""
+import argparse
+import os
+import pickle
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+from pycparser import ast_serialize, c_parser  # noqa: E402
+
+
+def make_source(n_decls):
+    lines = ['typedef unsigned long size_t;']
+    for i in range(n_decls):
+        lines.append('typedef struct s%d { int a; size_t n; char *p; } t%d;'
+                     % (i, i))
+        lines.append('int f%d(t%d *self, const char *buf, size_t n)'
+                     ' { if (n > 3) return self->a + n * 2; return 0; }'
+                     % (i, i))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--decls', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    ast = c_parser.CParser().parse(make_source(args.decls), 'bench.c')
+    formats = [
+        ('pickle', lambda a: pickle.dumps(a, pickle.HIGHEST_PROTOCOL),
+         pickle.loads),
+        ('ast_serialize', ast_serialize.dumps, ast_serialize.loads),
+        ('ast_serialize (no coords)',
+         lambda a: ast_serialize.dumps(a, coords=False),
+         ast_serialize.loads),
+    ]
+
+    print(f"{args.decls * 2} declarations")
+    for name, dumps, loads in formats:
+        data = dumps(ast)
+        t_dump = min(timeit.repeat(lambda: dumps(ast), number=1,
+                                   repeat=args.repeat))
+        t_load = min(timeit.repeat(lambda: loads(data), number=1,
+                                   repeat=args.repeat))
+        print(f"  {name:<26} {len(data) / 1024:8.0f} KiB"
+              f"  dump {t_dump * 1000:7.1f} ms  load {t_load * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compare CGenerator.visit() with streaming CGenerator.write().
+
+Parses a generated multi-megabyte translation unit once, then generates
+code from it with visit() (one string) and with write() into a file,
+reporting the time and the peak memory allocated by each.
+
+    python benchmarks/bench_c_generator.py [--funcs N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+from pycparser import c_generator, c_parser  # noqa: E402
+
+
+def make_source(n_funcs):
+    lines = ['typedef struct pt { int x; int y; } pt_t;']
+    for i in range(n_funcs):
+        lines.append('int f%d(pt_t *p, int n) {' % i)
+        lines.append('  int i, acc = %d;' % i)
+        lines.append('  for (i = 0; i < n; i++) {')
+        lines.append('    if (p[i].x > p[i].y) acc += p[i].x * 3 - p[i].y;')
+        lines.append('    else if (p[i].x == 0) acc -= 1;')
+        lines.append('    else acc = (acc << 1) ^ (p[i].y + %d);' % i)
+        lines.append('  }')
+        lines.append('  return acc;')
+        lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--funcs', type=int, default=12000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    source = make_source(args.funcs)
+    ast = c_parser.CParser().parse(source, 'bench.c')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'out.c')
+
+        def visit():
+            with open(path, 'w') as f:
+                f.write(c_generator.CGenerator().visit(ast))
+
+        def write():
+            with open(path, 'w') as f:
+                c_generator.CGenerator().write(ast, f)
+
+        print(f"{len(source) / 2**20:.1f} MiB of source, {args.funcs}"
+              f" functions")
+        for name, func in (('visit', visit), ('write', write)):
+            elapsed, peak = measure(func, args.repeat)
+            print(f"  {name:<6} {elapsed * 1000:8.1f} ms"
+                  f"  peak {peak / 2**20:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
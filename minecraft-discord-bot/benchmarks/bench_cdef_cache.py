@@ -0,0 +1,83 @@
+"""Measure FFI.cdef() startup time with and without the cdef parse cache.
+
+Each measurement runs in a fresh interpreter so that it reflects a Lambda
+cold start: the "cold" runs parse with pycparser, the "warm" runs load the
+pickled declarations from CFFI_CDEF_CACHE_DIR.
+
+    python benchmarks/bench_cdef_cache.py [--functions N] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ALEX_BOT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'alex_bot')
+
+CHILD = r'''
+import sys, time
+sys.path.insert(0, sys.argv[1])
+t0 = time.perf_counter()
+import cffi
+ffi = cffi.FFI()
+ffi.cdef(open(sys.argv[2]).read())
+print(time.perf_counter() - t0)
+'''
+
+
+def make_cdef(n_functions):
+    '''Generate a libsodium-sized block of declarations.'''
+    lines = []
+    for i in range(n_functions // 10):
+        lines.append('typedef struct crypto_state%d_s {'
+                     ' unsigned char opaque[%d]; uint64_t counter; }'
+                     ' crypto_state%d;' % (i, 32 + i, i))
+    for i in range(n_functions):
+        lines.append('int crypto_op%d(unsigned char *out,'
+                     ' unsigned long long *outlen, const unsigned char *in,'
+                     ' unsigned long long inlen, crypto_state%d *state);'
+                     % (i, i % max(1, n_functions // 10)))
+        lines.append('size_t crypto_op%d_bytes(void);' % i)
+    return '\n'.join(lines)
+
+
+def run(source_path, cache_dir, runs):
+    env = dict(os.environ)
+    if cache_dir is None:
+        env.pop('CFFI_CDEF_CACHE_DIR', None)
+    else:
+        env['CFFI_CDEF_CACHE_DIR'] = cache_dir
+    times = []
+    for _ in range(runs):
+        out = subprocess.check_output(
+            [sys.executable, '-c', CHILD, ALEX_BOT, source_path], env=env)
+        times.append(float(out))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--functions', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, 'decls.h')
+        with open(source_path, 'w') as f:
+            f.write(make_cdef(args.functions))
+        cache_dir = os.path.join(tmp, 'cache')
+
+        cold = run(source_path, None, args.runs)
+        run(source_path, cache_dir, 1)  # populate the cache
+        warm = run(source_path, cache_dir, args.runs)
+
+    print(f"{args.functions} functions, {args.runs} runs each")
+    for name, times in (('no cache', cold), ('disk cache hit', warm)):
+        print(f"  {name:15} median {statistics.median(times) * 1000:8.1f} ms"
+              f"  min {min(times) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
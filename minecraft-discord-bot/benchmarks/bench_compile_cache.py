@@ -0,0 +1,60 @@
+"""Measure FFI.compile() with a cold and a warm CFFI_COMPILE_CACHE_DIR.
+
+Builds a set of small API-mode modules into fresh build directories, as a
+new CI workspace or Lambda layer build would: once with an empty compile
+cache and once more with the cache filled by the first round.
+
+    python benchmarks/bench_compile_cache.py [--modules N] [--jobs N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+import cffi  # noqa: E402
+
+
+def build(index, n_functions=50):
+    ffi = cffi.FFI()
+    ffi.cdef('\n'.join('int f%d_%d(int, int);' % (index, i)
+                       for i in range(n_functions)))
+    ffi.set_source('_bench_mod%d' % index, '\n'.join(
+        'static int f%d_%d(int a, int b) { return a * %d + b; }'
+        % (index, i, i) for i in range(n_functions)))
+    with tempfile.TemporaryDirectory() as tmp:
+        ffi.compile(tmpdir=tmp)
+
+
+def build_all(n_modules, jobs):
+    t0 = time.perf_counter()
+    if jobs <= 1:
+        for i in range(n_modules):
+            build(i)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(build, range(n_modules)))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modules', type=int, default=8)
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ['CFFI_COMPILE_CACHE_DIR'] = cache_dir
+        print(f"{args.modules} modules, {args.jobs} jobs")
+        for name in ('cold cache', 'warm cache'):
+            elapsed = build_all(args.modules, args.jobs)
+            print(f"  {name:<11} {elapsed:6.2f} s"
+                  f"  {elapsed / args.modules * 1000:7.1f} ms/module")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Time the pure-Python ply.cpp preprocessor on a header tree.
+
+Generates a tree of headers in which every header includes the same
+guarded base headers, and every macro is defined in terms of others, then
+preprocesses the top-level file with pycparser.ply.cpp.Preprocessor, with
+and without its include and macro expansion caches.
+
+    python benchmarks/bench_cpp_include.py [--headers N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+from pycparser.ply import cpp, lex  # noqa: E402
+
+
+BASE_H = """\
+#ifndef BASE_H
+#define BASE_H
+#define WORD_BITS 32
+#define WORD_BYTES (WORD_BITS / 8)
+#define PAGE_SHIFT 12
+#define PAGE_SIZE (1 << PAGE_SHIFT)
+#define PAGE_MASK (~(PAGE_SIZE - 1))
+#define u32 unsigned int
+#define u64 unsigned long long
+#define MAX(a, b) ((a) > (b) ? (a) : (b))
+%s
+#endif
+"""
+
+MODULE_H = """\
+#include "base.h"
+#ifndef MOD%(i)d_H
+#define MOD%(i)d_H
+#include "base.h"
+#define MOD%(i)d_SIZE (PAGE_SIZE * %(i)d + WORD_BYTES)
+typedef struct mod%(i)d { u32 flags; u64 addr; char buf[MOD%(i)d_SIZE]; } mod%(i)d_t;
+static const u64 mod%(i)d_mask = PAGE_MASK & MOD%(i)d_SIZE;
+int mod%(i)d_init(mod%(i)d_t *m, u32 n);
+static const u64 mod%(i)d_consts[] = { %(consts)s };
+#endif
+"""
+
+
+def make_tree(root, n_headers):
+    extra = '\n'.join('#define BASE_CONST%d (PAGE_SIZE + %d)' % (i, i)
+                      for i in range(200))
+    with open(os.path.join(root, 'base.h'), 'w') as f:
+        f.write(BASE_H % extra)
+    top = []
+    for i in range(n_headers):
+        consts = ', '.join('BASE_CONST%d' % ((i + j) % 200)
+                           for j in range(20))
+        with open(os.path.join(root, 'mod%d.h' % i), 'w') as f:
+            f.write(MODULE_H % {'i': i, 'consts': consts})
+        top.append('#include "mod%d.h"' % i)
+        top.append('#include "base.h"')
+    path = os.path.join(root, 'top.c')
+    with open(path, 'w') as f:
+        f.write('\n'.join(top) + '\n')
+    return path
+
+
+def preprocess(path, lexer, cached):
+    p = cpp.Preprocessor(lexer)
+    p.add_path(os.path.dirname(path))
+    if not cached:
+        p.include_cache = None
+        p.memoize_macros = False
+    with open(path) as f:
+        p.parse(f.read(), path)
+    return sum(1 for _ in iter(p.token, None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--headers', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lexer = lex.lex(module=cpp)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_tree(tmp, args.headers)
+        print(f"{args.headers} headers, {args.headers * 4} includes")
+        for cached in (False, True):
+            best = None
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                ntokens = preprocess(path, lexer, cached)
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"  {'cached' if cached else 'uncached':<9}"
+                  f" {best * 1000:7.0f} ms  {ntokens} tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Measure ffi.dlopen() startup and first attribute access in ABI mode.
+
+Declares a few libc functions plus many integer constants and enumerators,
+then reports the dlopen() time and the mean latency of the first access to
+each name, for lazy lookup and for dlopen(..., preload=True).  A second
+case interleaves many small cdef() calls with attribute accesses, which
+is what indexing the declarations incrementally speeds up.
+
+    python benchmarks/bench_dlopen.py [--decls N] [--cdefs N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+import cffi  # noqa: E402
+
+LIBC_FUNCTIONS = """
+size_t strlen(const char *);
+int strcmp(const char *, const char *);
+int abs(int);
+long labs(long);
+int atoi(const char *);
+long atol(const char *);
+void *malloc(size_t);
+void free(void *);
+int toupper(int);
+int tolower(int);
+"""
+
+
+def make_cdef(n_decls, prefix='C'):
+    lines = []
+    for i in range(n_decls // 2):
+        lines.append('#define %s%d %d' % (prefix, i, i))
+    enumerators = ', '.join('%sE%d' % (prefix, i)
+                            for i in range(n_decls - n_decls // 2))
+    lines.append('enum %s_e { %s };' % (prefix, enumerators))
+    return '\n'.join(lines) + '\n'
+
+
+def first_access(ffi, preload):
+    t0 = time.perf_counter()
+    lib = ffi.dlopen(None, preload=preload)
+    t_open = time.perf_counter() - t0
+    names = dir(lib)
+    t0 = time.perf_counter()
+    for name in names:
+        getattr(lib, name)
+    t_access = time.perf_counter() - t0
+    return t_open, t_access / len(names), len(names)
+
+
+def interleaved(n_cdefs, n_decls):
+    ffi = cffi.FFI()
+    ffi.cdef(LIBC_FUNCTIONS)
+    lib = ffi.dlopen(None)
+    t0 = time.perf_counter()
+    for i in range(n_cdefs):
+        ffi.cdef(make_cdef(n_decls, prefix='P%d_' % i))
+        getattr(lib, 'P%d_0' % i)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--decls', type=int, default=5000)
+    parser.add_argument('--cdefs', type=int, default=200)
+    args = parser.parse_args()
+
+    ffi = cffi.FFI()
+    ffi.cdef(LIBC_FUNCTIONS + make_cdef(args.decls))
+    print(f"{args.decls} declarations")
+    for preload in (False, True):
+        t_open, t_first, n = first_access(ffi, preload)
+        print(f"  preload={preload!s:<5} dlopen {t_open * 1000:7.2f} ms"
+              f"  first access {t_first * 1e6:6.2f} us/name ({n} names)")
+
+    elapsed = interleaved(args.cdefs, 20)
+    print(f"{args.cdefs} cdef() calls of 20 declarations, one access after"
+          f" each: {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
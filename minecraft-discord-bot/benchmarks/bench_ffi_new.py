@@ -0,0 +1,51 @@
+"""Microbenchmark ffi.new() throughput for the FFI typeof cache settings.
+
+    python benchmarks/bench_ffi_new.py [--number N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+import cffi  # noqa: E402
+
+
+def bench(ffi, stmt, number):
+    namespace = {'ffi': ffi, 'n': 64, 'i': iter(range(10 ** 9))}
+    best = min(timeit.repeat(stmt, globals=namespace, number=number,
+                             repeat=5))
+    return number / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    configs = [
+        ('default', {}),
+        ('stats', {'stats': True}),
+        ('lru 128 + stats', {'maxsize': 128}),
+    ]
+    cases = [
+        ('fixed cdecl', 'ffi.new("unsigned char[]", n)'),
+        ('dynamic cdecl', 'ffi.new("unsigned char[%d]" % (next(i) % 100))'),
+    ]
+    for case, stmt in cases:
+        print(case)
+        for name, kwargs in configs:
+            ffi = cffi.FFI()
+            if kwargs:
+                ffi.set_typeof_cache(**kwargs)
+            rate = bench(ffi, stmt, args.number)
+            info = ffi.typeof_cache_info()
+            print(f"  {name:16} {rate / 1e6:6.2f} M calls/s"
+                  f"  entries={info['currsize']}"
+                  f"  hits={info['hits']} misses={info['misses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Measure CParser's incremental mode and the bound on its cache.
+
+Parses a large header followed by a small body that changes on every
+parse, the way a long-lived parser sees edits, once per cache size.
+Reports the first and later parse times and how many declarations the
+cache holds at the end.
+
+    python benchmarks/bench_incremental_parse.py [--decls N] [--parses N]
+        [--cache-sizes N ...]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+from pycparser import c_parser  # noqa: E402
+
+
+def make_header(n_decls):
+    lines = ['typedef unsigned long size_t;']
+    for i in range(n_decls):
+        lines.append('typedef struct s%d { int a; size_t n; char *p; } t%d;'
+                     % (i, i))
+    return '\n'.join(lines) + '\n'
+
+
+def make_body(version):
+    return ('int f%d(t0 *self, size_t n) { return self->a + n + %d; }\n'
+            'static int g%d = %d;\n' % (version, version, version, version))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--decls', type=int, default=1500)
+    parser.add_argument('--parses', type=int, default=200)
+    parser.add_argument('--cache-sizes', type=int, nargs='+',
+                        help='cache sizes to try, 0 for unbounded'
+                             ' (default: 0, the default size, and one'
+                             ' smaller than the header)')
+    args = parser.parse_args()
+
+    sizes = args.cache_sizes or [0, 10000, args.decls // 2]
+    header = make_header(args.decls)
+    print(f"{args.decls + 1} header declarations,"
+          f" {args.parses} parses with a changing body")
+    print(f"  {'cache size':>10} {'first':>9} {'later p50':>11}"
+          f" {'cached decls':>13}")
+    for size in sizes:
+        cparser = c_parser.CParser(incremental=True,
+                                   incremental_cache_size=size or None)
+        times = []
+        for version in range(args.parses):
+            t0 = time.perf_counter()
+            cparser.parse(header + make_body(version))
+            times.append(time.perf_counter() - t0)
+        label = size or 'unbounded'
+        print(f"  {label:>10} {times[0] * 1000:7.1f} ms"
+              f" {statistics.median(times[1:]) * 1000:8.1f} ms"
+              f" {len(cparser._decl_cache):13d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Measure pycparser.parse_files() throughput for different worker counts.
+
+Generates a set of preprocessed-looking header files and parses all of
+them once per worker count.
+
+    python benchmarks/bench_parse_files.py [--files N] [--decls N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+import pycparser  # noqa: E402
+
+
+def make_header(index, n_decls):
+    lines = ['typedef unsigned long size_t;']
+    for i in range(n_decls):
+        lines.append('typedef struct h%d_s%d { int a; size_t n; char *p; }'
+                     ' h%d_t%d;' % (index, i, index, i))
+        lines.append('int h%d_f%d(h%d_t%d *self, const char *buf, size_t n);'
+                     % (index, i, index, i))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=64)
+    parser.add_argument('--decls', type=int, default=100)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='worker counts to try (default: 1, 2, 4, 8'
+                             ' up to the number of CPUs)')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    counts = args.workers or sorted(
+        {n for n in (1, 2, 4, 8, cpus) if n <= cpus})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, 'h%d.h' % i)
+            with open(path, 'w') as f:
+                f.write(make_header(i, args.decls))
+            paths.append(path)
+
+        print(f"{args.files} files x {args.decls * 2} declarations,"
+              f" {cpus} CPUs")
+        for workers in counts:
+            t0 = time.perf_counter()
+            asts = pycparser.parse_files(paths, workers=workers)
+            elapsed = time.perf_counter() - t0
+            assert len(asts) == len(paths)
+            print(f"  workers={workers:<3} {elapsed:7.2f} s"
+                  f"  {len(paths) / elapsed:7.1f} files/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Measure event loop stalls while hashing passwords with nacl.pwhash.
+
+Runs a burst of argon2id hashes from an asyncio program, once by calling
+nacl.pwhash.str() directly and once through nacl.pwhash.aio, while a
+ticker task reports how late the loop wakes it up.  Finishes by running
+the calibration helper for the requested target latency.
+
+    python benchmarks/bench_pwhash_async.py [--hashes N] [--workers N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+import nacl.pwhash  # noqa: E402
+from nacl.pwhash import aio  # noqa: E402
+
+TICK = 0.005
+
+
+async def ticker(stalls):
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(TICK)
+        stalls.append(time.perf_counter() - t0 - TICK)
+
+
+async def burst(n_hashes, hasher):
+    stalls = []
+    tick = asyncio.ensure_future(ticker(stalls))
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    if hasher is None:
+        for i in range(n_hashes):
+            nacl.pwhash.str(b'password %d' % i)
+            await asyncio.sleep(0)
+    else:
+        await asyncio.gather(*[hasher.str(b'password %d' % i)
+                               for i in range(n_hashes)])
+    elapsed = time.perf_counter() - t0
+    tick.cancel()
+    return elapsed, max(stalls, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hashes', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--target', type=float, default=0.25)
+    args = parser.parse_args()
+
+    print(f"{args.hashes} argon2id hashes, {args.workers} workers")
+    with aio.PwhashExecutor(max_workers=args.workers) as hasher:
+        for name, h in (('blocking', None), ('aio', hasher)):
+            elapsed, stall = asyncio.run(burst(args.hashes, h))
+            print(f"  {name:<9} {elapsed * 1000:7.0f} ms"
+                  f"  worst loop stall {stall * 1000:7.1f} ms")
+
+    t0 = time.perf_counter()
+    opslimit, memlimit = aio.calibrate(args.target)
+    print(f"calibrate({args.target}): opslimit={opslimit}"
+          f" memlimit={memlimit // 2**20} MiB"
+          f" ({time.perf_counter() - t0:.1f} s)")
+
+
+if __name__ == '__main__':
+    main()
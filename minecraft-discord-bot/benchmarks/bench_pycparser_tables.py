@@ -0,0 +1,59 @@
+"""Compare pycparser startup with the marshalled and the yacctab.py tables.
+
+Each run builds a CParser in a fresh interpreter and reports the time to
+import pycparser and construct the parser, plus the peak resident memory
+of the process.
+
+    python benchmarks/bench_pycparser_tables.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ALEX_BOT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'alex_bot')
+
+CHILD = r'''
+import resource, sys, time
+sys.path.insert(0, sys.argv[1])
+t0 = time.perf_counter()
+import pycparser
+pycparser.CParser(yacc_marshal=sys.argv[2] == 'marshal')
+elapsed = time.perf_counter() - t0
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def run(mode, runs):
+    times, rss = [], []
+    for _ in range(runs):
+        out = subprocess.check_output(
+            [sys.executable, '-c', CHILD, ALEX_BOT, mode])
+        elapsed, maxrss = out.split()
+        times.append(float(elapsed))
+        rss.append(int(maxrss))
+    return times, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    # The first run of each mode may compile .pyc files; don't count it
+    for mode in ('marshal', 'module'):
+        run(mode, 1)
+
+    print(f"CParser() startup, {args.runs} runs each")
+    modes = (('module', 'yacctab.py'), ('marshal', 'yacctab.marshal'))
+    for mode, label in modes:
+        times, rss = run(mode, args.runs)
+        print(f"  {label:16} median {statistics.median(times) * 1000:7.1f} ms"
+              f"  min {min(times) * 1000:7.1f} ms"
+              f"  max rss {statistics.median(rss) / 1024:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Signed Discord interaction events and local AWS stand-ins for the bot.
+
+Shared by the load and emulator scripts in this directory: InteractionFactory
+mints API Gateway proxy events carrying valid (or deliberately invalid)
+Ed25519 signature headers, and StubBoto3 replaces the boto3 module in
+alex_bot/app.py so SSM and EC2 calls are answered locally.
+"""
+import collections
+import itertools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'alex_bot'))
+
+from nacl.signing import SigningKey  # noqa: E402
+
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+KINDS = ('ping', 'startmcserver', 'unknown', 'bad_signature')
+
+
+class InteractionFactory:
+    """Mints signed interaction events for one bot key."""
+
+    def __init__(self, signing_key=None):
+        self.signing_key = signing_key or SigningKey.generate()
+        self.public_key_hex = self.signing_key.verify_key.encode().hex()
+        self._ids = itertools.count(1)
+
+    def body(self, kind):
+        interaction_id = str(next(self._ids))
+        if kind == 'ping':
+            return {'id': interaction_id, 'type': 1}
+        name = 'startmcserver' if kind == 'startmcserver' else 'nosuchcommand'
+        return {'id': interaction_id, 'type': 2,
+                'data': {'id': interaction_id, 'name': name}}
+
+    def headers(self, body_text, timestamp=None, valid=True):
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        signed = self.signing_key.sign((timestamp + body_text).encode())
+        signature = signed.signature
+        if not valid:
+            signature = bytes([signature[0] ^ 1]) + signature[1:]
+        return {
+            'content-type': 'application/json',
+            'x-signature-ed25519': signature.hex(),
+            'x-signature-timestamp': timestamp,
+        }
+
+    def event(self, kind, timestamp=None):
+        """Returns an API Gateway proxy event of the given kind, one of
+        KINDS. Every event has a distinct body, so none is a replay."""
+        body_text = json.dumps(self.body(kind))
+        headers = self.headers(body_text, timestamp,
+                               valid=kind != 'bad_signature')
+        return proxy_event(body_text, headers)
+
+
+def proxy_event(body_text, headers, request_id=None):
+    """Wraps a request in the API Gateway proxy event shape read by
+    lambda_handler."""
+    return {
+        'body': body_text,
+        'resource': '/alex',
+        'path': '/alex',
+        'httpMethod': 'POST',
+        'isBase64Encoded': False,
+        'headers': headers,
+        'requestContext': {
+            'resourcePath': '/alex',
+            'httpMethod': 'POST',
+            'requestId': request_id or os.urandom(16).hex(),
+            'stage': 'Prod',
+        },
+    }
+
+
+class StubSSM:
+    def __init__(self, parameters, latency):
+        self.parameters = parameters
+        self.latency = latency
+
+    def get_parameter(self, Name, WithDecryption=False):
+        time.sleep(self.latency)
+        return {'Parameter': {'Name': Name, 'Type': 'String',
+                              'Value': self.parameters[Name]}}
+
+
+class StubEC2:
+    def __init__(self, latency, state='stopped'):
+        self.latency = latency
+        self.state = state
+        self.calls = collections.Counter()
+
+    def _instance(self):
+        return {'InstanceId': INSTANCE_ID, 'State': {'Name': self.state},
+                'PublicIpAddress': '203.0.113.10'}
+
+    def start_instances(self, InstanceIds, **kwargs):
+        time.sleep(self.latency)
+        self.calls['start_instances'] += 1
+        previous, self.state = self.state, 'pending'
+        return {'StartingInstances': [{
+            'InstanceId': InstanceIds[0],
+            'CurrentState': {'Name': self.state},
+            'PreviousState': {'Name': previous}}]}
+
+    def describe_instances(self, InstanceIds, **kwargs):
+        time.sleep(self.latency)
+        self.calls['describe_instances'] += 1
+        return {'Reservations': [{'Instances': [self._instance()]}]}
+
+
+class StubBoto3:
+    """Stands in for the boto3 module: client('ssm') and client('ec2')
+    answer from memory after sleeping ``latency`` seconds per call."""
+
+    def __init__(self, public_key_hex, latency=0.0):
+        self.ssm = StubSSM({'discord_alex_bot_token': public_key_hex},
+                           latency)
+        self.ec2 = StubEC2(latency)
+
+    def client(self, service, *args, **kwargs):
+        return getattr(self, service)
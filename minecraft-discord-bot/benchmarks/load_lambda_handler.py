@@ -0,0 +1,169 @@
+"""Drive alex_bot's lambda_handler with signed interactions at a target rate.
+
+Mints validly signed ping and startmcserver interactions, unknown commands
+and requests with bad signatures, stubs SSM and EC2 in-process, and replays
+the events through lambda_handler from several worker processes on an
+open-loop schedule.  Reports p50/p95/p99 latency of each stage of the
+handler: parse (json.loads), verify (verify_headers), dispatch
+(discord_handler), the stubbed AWS calls and the whole handler.  Stage
+times are exclusive: verify and dispatch do not include the AWS calls
+they make.
+
+    python benchmarks/load_lambda_handler.py [--rate N] [--duration S]
+        [--procs N] [--aws-latency MS] [--mix ping=5,startmcserver=2,...]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from discord_events import (  # noqa: E402
+    INSTANCE_ID, KINDS, InteractionFactory, StubBoto3)
+
+STAGES = ('parse', 'verify', 'dispatch', 'aws', 'total')
+
+
+class StageTimer:
+    """Accumulates exclusive time per stage for the request in flight:
+    time spent in a nested stage is not counted in the enclosing one."""
+
+    def __init__(self):
+        self.times = {}
+        self._stack = []
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            self._stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t0
+                nested = self._stack.pop()
+                self.times[stage] = (self.times.get(stage, 0.0)
+                                     + elapsed - nested)
+                if self._stack:
+                    self._stack[-1] += elapsed
+        return timed
+
+
+def instrument(app, public_key_hex, aws_latency):
+    timer = StageTimer()
+    stub = StubBoto3(public_key_hex, aws_latency)
+    stub.ssm.get_parameter = timer.wrap('aws', stub.ssm.get_parameter)
+    stub.ec2.start_instances = timer.wrap('aws', stub.ec2.start_instances)
+    app.boto3 = stub
+    app.json = types.SimpleNamespace(loads=timer.wrap('parse', json.loads),
+                                     dumps=json.dumps)
+    app.verify_headers = timer.wrap('verify', app.verify_headers)
+    app.discord_handler = timer.wrap('dispatch', app.discord_handler)
+    return timer
+
+
+def worker(args):
+    seed, kinds, rate, duration, aws_latency = args
+    os.environ.setdefault('MC_INSTANCE_ID', INSTANCE_ID)
+    import app
+
+    factory = InteractionFactory()
+    rng = random.Random(seed)
+    n_events = max(1, int(rate * duration))
+    # Signing happens up front so it does not count against the handler
+    events = [(kind, factory.event(kind))
+              for kind in rng.choices(kinds[0], kinds[1], k=n_events)]
+
+    timer = instrument(app, factory.public_key_hex, aws_latency)
+    samples = []
+    lag = 0.0
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for i, (kind, event) in enumerate(events):
+            due = start + i * interval
+            now = time.perf_counter()
+            if now < due:
+                time.sleep(due - now)
+            else:
+                lag = max(lag, now - due)
+            timer.times = {}
+            t0 = time.perf_counter()
+            response = app.lambda_handler(event, None)
+            timer.times['total'] = time.perf_counter() - t0
+            samples.append((kind, response['statusCode'], timer.times))
+    return samples, time.perf_counter() - start, lag
+
+
+def percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    q = statistics.quantiles(values, n=100, method='inclusive')
+    return q[49], q[94], q[98]
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(
+                f"unknown kind {kind!r}, expected one of {', '.join(KINDS)}")
+        weights[kind] = float(weight or 1)
+    return list(weights), list(weights.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=200,
+                        help='total requests per second')
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--procs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--aws-latency', type=float, default=0,
+                        help='simulated latency of each AWS call, in ms')
+    parser.add_argument('--mix', type=parse_mix,
+                        default='ping=5,startmcserver=2,unknown=2,'
+                                'bad_signature=1')
+    args = parser.parse_args()
+
+    per_proc = args.rate / args.procs
+    jobs = [(seed, args.mix, per_proc, args.duration, args.aws_latency / 1000)
+            for seed in range(args.procs)]
+    with multiprocessing.Pool(args.procs) as pool:
+        results = pool.map(worker, jobs)
+
+    samples = [s for result in results for s in result[0]]
+    elapsed = max(result[1] for result in results)
+    lag = max(result[2] for result in results)
+    statuses = {}
+    for kind, status, _ in samples:
+        statuses.setdefault(kind, {}).setdefault(status, 0)
+        statuses[kind][status] += 1
+
+    print(f"{len(samples)} requests from {args.procs} processes in"
+          f" {elapsed:.2f} s: {len(samples) / elapsed:.0f} req/s"
+          f" (target {args.rate:.0f}), worst schedule lag"
+          f" {lag * 1000:.1f} ms")
+    for kind, counts in sorted(statuses.items()):
+        summary = ', '.join(f"{status}: {n}"
+                            for status, n in sorted(counts.items()))
+        print(f"  {kind:<14} {summary}")
+    print(f"  {'stage':<9} {'n':>7} {'p50 ms':>9} {'p95 ms':>9}"
+          f" {'p99 ms':>9}")
+    for stage in STAGES:
+        values = [times[stage] for _, _, times in samples if stage in times]
+        p50, p95, p99 = percentiles(values)
+        print(f"  {stage:<9} {len(values):7d} {p50 * 1000:9.3f}"
+              f" {p95 * 1000:9.3f} {p99 * 1000:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
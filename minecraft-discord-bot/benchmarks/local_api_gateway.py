@@ -0,0 +1,385 @@
+"""Serve alex_bot's lambda_handler over local HTTP, the way API Gateway does.
+
+An asyncio HTTP front end turns POST /alex requests into API Gateway proxy
+events (header names lowercased, as lambda_handler reads them) and runs
+them in a pool of simulated Lambda execution environments: each one is a
+separate process that imports app.py once (its cold start) and then serves
+one request at a time until it has been idle for --idle-timeout seconds.
+With every environment busy, requests are throttled with a 429 like a
+Lambda at its concurrency limit, or queued with --queue.
+
+SSM and EC2 are stubbed unless --real-aws is given; the stub returns the
+public half of the signing key printed at startup (or given with --seed).
+With --load-rate the emulator also drives itself with signed interactions
+and reports throughput, cold-start share and tail latency.
+
+    python benchmarks/local_api_gateway.py [--port N] [--concurrency N]
+        [--idle-timeout S] [--cold-start-delay MS] [--queue] [--real-aws]
+        [--load-rate N --load-duration S]
+"""
+import argparse
+import asyncio
+import contextlib
+import http
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from discord_events import (  # noqa: E402
+    INSTANCE_ID, InteractionFactory, StubBoto3, proxy_event)
+from load_lambda_handler import percentiles  # noqa: E402
+from nacl.signing import SigningKey  # noqa: E402
+
+ROUTE = ('POST', '/alex')
+
+
+class Throttled(Exception):
+    pass
+
+
+class LocalContext:
+    """The parts of the Lambda context object a handler may use."""
+
+    def __init__(self, request_id, timeout):
+        self.aws_request_id = request_id
+        self.function_name = 'AlexBotDiscordFunction'
+        self.memory_limit_in_mb = 128
+        self._deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+def environment_main(conn, stub_key_hex, aws_latency, init_delay, verbose):
+    """Body of one execution environment process."""
+    t0 = time.perf_counter()
+    os.environ.setdefault('MC_INSTANCE_ID', INSTANCE_ID)
+    import app
+    if stub_key_hex is not None:
+        app.boto3 = StubBoto3(stub_key_hex, aws_latency)
+    time.sleep(init_delay)
+    conn.send(time.perf_counter() - t0)
+
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+        while True:
+            message = conn.recv()
+            if message is None:
+                return
+            event, timeout = message
+            context = LocalContext(event['requestContext']['requestId'],
+                                   timeout)
+            t0 = time.perf_counter()
+            try:
+                response, error = app.lambda_handler(event, context), None
+            except Exception as e:
+                response, error = None, repr(e)
+            conn.send((response, error, time.perf_counter() - t0))
+
+
+class Environment:
+    def __init__(self, mp_context, options):
+        self.conn, child = mp_context.Pipe()
+        self.process = mp_context.Process(
+            target=environment_main, daemon=True,
+            args=(child, options.stub_key_hex, options.aws_latency / 1000,
+                  options.cold_start_delay / 1000, options.verbose))
+        self.last_used = time.monotonic()
+
+    def start(self):
+        """Starts the process and waits for its init; blocking."""
+        self.process.start()
+        return self.conn.recv()
+
+    def invoke(self, event, timeout):
+        """Runs one event; blocking. Kills the environment and raises
+        TimeoutError if the handler runs past ``timeout`` seconds."""
+        self.conn.send((event, timeout))
+        if not self.conn.poll(timeout):
+            self.process.kill()
+            raise TimeoutError('Task timed out after %.2f seconds' % timeout)
+        return self.conn.recv()
+
+    def stop(self):
+        if self.process.is_alive():
+            self.conn.send(None)
+            self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+class EnvironmentPool:
+    """Hands each invocation to a warm idle environment, or starts a new
+    one up to ``concurrency`` environments."""
+
+    def __init__(self, options):
+        self.options = options
+        self.mp_context = multiprocessing.get_context('spawn')
+        self.executor = ThreadPoolExecutor(max_workers=options.concurrency)
+        # Most recently used last, so the reaper finds the oldest first
+        self.idle = []
+        self.active = 0
+        self.freed = asyncio.Condition()
+
+    async def _acquire(self):
+        async with self.freed:
+            while True:
+                if self.idle:
+                    return self.idle.pop(), None
+                if self.active < self.options.concurrency:
+                    self.active += 1
+                    break
+                if not self.options.queue:
+                    raise Throttled()
+                await self.freed.wait()
+
+        env = Environment(self.mp_context, self.options)
+        loop = asyncio.get_running_loop()
+        try:
+            init = await loop.run_in_executor(self.executor, env.start)
+        except BaseException:
+            env.stop()
+            await self._retire()
+            raise
+        return env, init
+
+    async def _retire(self):
+        async with self.freed:
+            self.active -= 1
+            self.freed.notify()
+
+    async def invoke(self, event):
+        """Returns (response, error, init seconds or None if warm,
+        handler seconds)."""
+        env, init = await self._acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            response, error, duration = await loop.run_in_executor(
+                self.executor, env.invoke, event, self.options.timeout)
+        except BaseException:
+            env.stop()
+            await self._retire()
+            raise
+        env.last_used = time.monotonic()
+        async with self.freed:
+            self.idle.append(env)
+            self.freed.notify()
+        return response, error, init, duration
+
+    async def reap(self):
+        """Shuts down environments idle for longer than the idle timeout."""
+        while True:
+            await asyncio.sleep(1)
+            cutoff = time.monotonic() - self.options.idle_timeout
+            while self.idle and self.idle[0].last_used < cutoff:
+                self.idle.pop(0).stop()
+                await self._retire()
+
+    def close(self):
+        for env in self.idle:
+            env.stop()
+        self.executor.shutdown(wait=False)
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies = []
+        self.cold = []
+        self.warm = []
+        self.statuses = {}
+
+    def record(self, status, latency, cold):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status != 429:
+            self.latencies.append(latency)
+            (self.cold if cold else self.warm).append(latency)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.statuses.values())
+        served = len(self.latencies)
+        print(f"{total} requests in {elapsed:.1f} s:"
+              f" {served / elapsed:.1f} served/s, cold starts"
+              f" {len(self.cold)} ({len(self.cold) / max(served, 1):.1%})")
+        print('  status ' + ', '.join(
+            f"{status}: {n}" for status, n in sorted(self.statuses.items())))
+        for name, values in (('all', self.latencies), ('warm', self.warm),
+                             ('cold', self.cold)):
+            if values:
+                p50, p95, p99 = percentiles(values)
+                print(f"  {name:<5} p50 {p50 * 1000:8.1f} ms"
+                      f"  p95 {p95 * 1000:8.1f} ms"
+                      f"  p99 {p99 * 1000:8.1f} ms")
+
+
+def json_response(status, payload):
+    return {'statusCode': status,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps(payload)}
+
+
+class Gateway:
+    def __init__(self, options):
+        self.options = options
+        self.pool = EnvironmentPool(options)
+        self.stats = Stats()
+
+    async def call(self, method, path, headers, body):
+        if (method, path) != ROUTE:
+            return json_response(
+                403, {'message': 'Missing Authentication Token'}), {}
+
+        event = proxy_event(body.decode('utf-8'), headers)
+        t0 = time.perf_counter()
+        try:
+            response, error, init, duration = await self.pool.invoke(event)
+        except Throttled:
+            self.stats.record(429, 0, False)
+            return json_response(429, {'message': 'Rate Exceeded'}), {}
+        except TimeoutError:
+            self.stats.record(504, time.perf_counter() - t0, False)
+            return json_response(
+                504, {'message': 'Endpoint request timed out'}), {}
+        if error is not None:
+            print(f"handler raised {error}")
+            response = json_response(502, {'message': 'Internal server error'})
+        self.stats.record(response['statusCode'], time.perf_counter() - t0,
+                          init is not None)
+        extra = {'x-amzn-RequestId': event['requestContext']['requestId'],
+                 'x-emulator-cold-start': '1' if init is not None else '0',
+                 'x-emulator-duration-ms': '%.3f' % (duration * 1000)}
+        if init is not None:
+            extra['x-emulator-init-ms'] = '%.3f' % (init * 1000)
+        return response, extra
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(
+                int(headers.get('content-length', 0)))
+            response, extra = await self.call(method, path.split('?')[0],
+                                              headers, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            response = json_response(400, {'message': 'Bad request'})
+            extra = {}
+
+        body = (response.get('body') or '').encode('utf-8')
+        status = response['statusCode']
+        lines = ['HTTP/1.1 %d %s' % (status, http.HTTPStatus(status).phrase)]
+        for name, value in {**response.get('headers', {}), **extra}.items():
+            lines.append('%s: %s' % (name, value))
+        lines.append('Content-Length: %d' % len(body))
+        lines.append('Connection: close')
+        head = '\r\n'.join(lines) + '\r\n\r\n'
+        writer.write(head.encode('latin-1') + body)
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+        writer.close()
+
+
+async def post(port, event):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = event['body'].encode('utf-8')
+    head = ['POST /alex HTTP/1.1', 'Host: 127.0.0.1:%d' % port,
+            'Content-Length: %d' % len(body)]
+    head += ['%s: %s' % item for item in event['headers'].items()]
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def drive(port, factory, rate, duration):
+    """Sends signed interactions at ``rate`` per second, open loop."""
+    kinds = ['ping', 'startmcserver', 'unknown']
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        event = factory.event(random.choice(kinds))
+        tasks.append(asyncio.ensure_future(post(port, event)))
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def serve(options, factory):
+    gateway = Gateway(options)
+    server = await asyncio.start_server(gateway.handle, options.host,
+                                        options.port)
+    port = server.sockets[0].getsockname()[1]
+    reaper = asyncio.ensure_future(gateway.pool.reap())
+    print(f"serving POST http://{options.host}:{port}/alex with up to"
+          f" {options.concurrency} environments")
+    try:
+        if options.load_rate:
+            await drive(port, factory, options.load_rate,
+                        options.load_duration)
+        else:
+            await server.serve_forever()
+    finally:
+        reaper.cancel()
+        server.close()
+        gateway.pool.close()
+        gateway.stats.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='maximum number of execution environments')
+    parser.add_argument('--idle-timeout', type=float, default=300,
+                        help='seconds before an idle environment is reaped')
+    parser.add_argument('--cold-start-delay', type=float, default=0,
+                        help='extra init time per environment, in ms')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='function timeout in seconds, as in '
+                             'template.yaml')
+    parser.add_argument('--queue', action='store_true',
+                        help='queue requests instead of throttling')
+    parser.add_argument('--real-aws', action='store_true',
+                        help='let the handler call SSM and EC2 for real')
+    parser.add_argument('--aws-latency', type=float, default=20,
+                        help='latency of each stubbed AWS call, in ms')
+    parser.add_argument('--seed', help='hex seed of the bot signing key')
+    parser.add_argument('--load-rate', type=float, default=0,
+                        help='drive the emulator at this many requests/s')
+    parser.add_argument('--load-duration', type=float, default=10)
+    parser.add_argument('--verbose', action='store_true',
+                        help="show the handlers' output")
+    options = parser.parse_args()
+
+    signing_key = (SigningKey(bytes.fromhex(options.seed)) if options.seed
+                   else SigningKey.generate())
+    factory = InteractionFactory(signing_key)
+    options.stub_key_hex = None if options.real_aws else factory.public_key_hex
+    if not options.real_aws:
+        print(f"stub SSM serves the public key of signing seed"
+              f" {bytes(signing_key).hex()}")
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(options, factory))
+
+
+if __name__ == '__main__':
+    main()
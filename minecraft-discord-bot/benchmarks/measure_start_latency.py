@@ -0,0 +1,99 @@
+"""Measure how long the Minecraft server takes to be joinable after a start.
+
+Against a real instance: stops it, either hibernating it or with a plain
+stop, starts it again and times the readiness stages of
+stopper/readiness.py until the server answers a Query status request.
+EC2 boot (or resume) and server load are reported separately, so resuming
+from hibernation can be compared with a cold start.  Each round stops and
+starts the instance, so don't run it while anyone is playing.
+
+    python benchmarks/measure_start_latency.py --instance-id ID
+        [--rounds N] [--modes hibernate,stop] [--query-port PORT]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'stopper'))
+
+import boto3  # noqa: E402
+from mcipc.query import Client  # noqa: E402
+
+import power  # noqa: E402
+import readiness  # noqa: E402
+
+STAGES = (readiness.EC2_BOOT, readiness.SERVER_LOAD, 'total')
+
+
+def measure(ec2, instance_id, hibernate, query_port, budget):
+    """Stops and starts the instance once. Returns how it was actually
+    stopped and the readiness result of the start."""
+
+    def describe_instance():
+        response = ec2.describe_instances(InstanceIds=[instance_id])
+        instance = response['Reservations'][0]['Instances'][0]
+        return instance['State']['Name'], instance.get('PublicIpAddress')
+
+    def probe(ip_address, timeout):
+        with Client(ip_address, query_port, timeout=timeout / 2) as client:
+            return dict(client.stats())
+
+    # Start from a joinable server, so the world is loaded and, for
+    # hibernation, the instance has had time to be ready for it
+    ec2.start_instances(InstanceIds=[instance_id])
+    if readiness.wait_until_ready(describe_instance, probe,
+                                  budget)['outcome'] != readiness.READY:
+        raise SystemExit('the server did not come up before the round')
+
+    _, mode = power.stop(ec2, instance_id, hibernate)
+    ec2.get_waiter('instance_stopped').wait(InstanceIds=[instance_id])
+
+    ec2.start_instances(InstanceIds=[instance_id])
+    result = readiness.wait_until_ready(describe_instance, probe, budget)
+    result['stages']['total'] = sum(result['stages'].values())
+    return mode, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instance-id', required=True)
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='starts measured per mode')
+    parser.add_argument('--modes', default='hibernate,stop',
+                        help='comma separated: hibernate, stop')
+    parser.add_argument('--query-port', type=int, default=25575)
+    parser.add_argument('--budget', type=float, default=15 * 60,
+                        help='longest wait for the server to answer, in s')
+    args = parser.parse_args()
+
+    ec2 = boto3.client('ec2')
+    times = {}
+    for round_number in range(args.rounds):
+        for requested in args.modes.split(','):
+            t0 = time.monotonic()
+            mode, result = measure(ec2, args.instance_id,
+                                   requested == power.HIBERNATE,
+                                   args.query_port, args.budget)
+            stages = ', '.join(f"{name} {result['stages'][name]:.1f} s"
+                               for name in STAGES
+                               if name in result['stages'])
+            print(f"round {round_number + 1} {mode}: {result['outcome']},"
+                  f" {stages} ({time.monotonic() - t0:.0f} s round)")
+            if result['outcome'] == readiness.READY:
+                times.setdefault(mode, []).append(result['stages'])
+
+    kinds = {power.HIBERNATE: readiness.RESUME, power.STOP: readiness.COLD}
+    print(f"  {'start':<8} {'n':>3}"
+          + ''.join(f" {name + ' p50':>16}" for name in STAGES))
+    for mode, samples in times.items():
+        medians = [statistics.median(s[name] for s in samples)
+                   for name in STAGES]
+        print(f"  {kinds[mode]:<8} {len(samples):3d}"
+              + ''.join(f" {m:14.1f} s" for m in medians))
+
+
+if __name__ == '__main__':
+    main()
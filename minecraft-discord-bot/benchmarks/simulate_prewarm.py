@@ -0,0 +1,220 @@
+"""Replay player history to weigh pre-warming against extra instance-hours.
+
+Simulates the server minute by minute under two policies: on demand only,
+where players wait for the instance and world to load every time they find
+it stopped, and pre-warming, where the stopper learns the occupancy
+histogram from its own runs (stopper/occupancy.py) as it would in
+production, starts the server ahead of predicted sessions and keeps it
+running through them.  The stopper runs at the adaptive cadence of
+stopper/cadence.py plus its fixed-rate backstop, or at a fixed interval.
+Reports the wait each policy leaves players with and the instance-hours it
+costs.
+
+History is a CSV of "unix timestamp,num_players" rows, each holding until
+the next, or generated with --synthetic.
+
+    python benchmarks/simulate_prewarm.py [HISTORY.csv | --synthetic WEEKS]
+        [--boot-minutes M] [--interval-minutes M] [--threshold F]
+        [--decay F] [--lookahead-minutes M] [--seed N]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'stopper'))
+
+import cadence  # noqa: E402
+import occupancy  # noqa: E402
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+# Rate of the fixed schedule kept as a backstop for the adaptive cadence,
+# as in template.yaml
+BACKSTOP = 30 * MINUTE
+
+# Monday 2024-01-01 00:00 UTC, where synthetic history starts
+SYNTHETIC_START = 1704067200
+
+
+def synthetic_history(weeks, rng):
+    """Returns rows of a group that mostly plays on weekday evenings and
+    weekend afternoons, with the odd unplanned session."""
+    sessions = []
+    for day in range(weeks * 7):
+        midnight = SYNTHETIC_START + day * DAY
+        weekend = day % 7 >= 5
+        if rng.random() < (0.6 if weekend else 0.75):
+            start = midnight + (14 if weekend else 19) * HOUR
+            start += rng.randint(-20, 20) * MINUTE
+            sessions.append((start, rng.uniform(1.5, 3.5) * HOUR))
+        if rng.random() < 0.3:
+            start = midnight + rng.randrange(24) * HOUR
+            sessions.append((start, rng.uniform(0.5, 1.5) * HOUR))
+
+    rows = [(SYNTHETIC_START, 0)]
+    for start, length in sorted(sessions):
+        if start < rows[-1][0]:
+            continue
+        rows.append((int(start), rng.randint(1, 4)))
+        rows.append((int(start + length), 0))
+    rows.append((SYNTHETIC_START + weeks * WEEK, 0))
+    return rows
+
+
+def read_history(path):
+    rows = []
+    with open(path, newline='') as f:
+        for record in csv.reader(f):
+            if not record or not record[0].strip().isdigit():
+                continue
+            rows.append((int(record[0]), int(record[1])))
+    return sorted(rows)
+
+
+def demand_by_minute(rows):
+    """Returns the start time and the player count of every minute."""
+    start = rows[0][0] - rows[0][0] % MINUTE
+    minutes = []
+    for (t, players), (t_next, _) in zip(rows, rows[1:]):
+        end = (t_next - start) // MINUTE
+        minutes.extend([players] * (end - len(minutes)))
+    return start, minutes
+
+
+def simulate(start, minutes, boot, interval, prewarm):
+    """Simulates a fixed schedule every interval seconds, or the adaptive
+    cadence if interval is None."""
+    histogram = occupancy.OccupancyHistogram()
+    state = 'stopped'
+    ready_at = launched_at = 0
+    next_at = None
+    previous_players = None
+    result = {'sessions': 0, 'wait': 0, 'instance_seconds': 0,
+              'prewarms': 0, 'wasted_prewarms': 0, 'invocations': 0}
+    prewarmed_unused = False
+    previous = 0
+
+    for i, players in enumerate(minutes):
+        t = start + i * MINUTE
+        if state == 'booting' and t >= ready_at:
+            state = 'running'
+            if interval is None:
+                # The readiness function schedules the first check
+                next_at = cadence.next_check(t, 'running', players)
+
+        # A session starts: someone wants to play and runs /startmcserver
+        # if the server is stopped
+        if players > 0 and previous == 0:
+            result['sessions'] += 1
+            prewarmed_unused = False
+            if state == 'stopped':
+                state, launched_at, ready_at = 'booting', t, t + boot
+            if state == 'booting':
+                result['wait'] += ready_at - t
+        previous = players
+
+        # The scheduled stopper run
+        if interval is not None:
+            due = (t - start) % interval == 0
+        else:
+            due = ((next_at is not None and t >= next_at)
+                   or (t - start) % BACKSTOP == 0)
+        if due:
+            result['invocations'] += 1
+            if state != 'running':
+                # The stopper only queries a running instance
+                histogram.record(t, 0)
+                if (prewarm and state == 'stopped'
+                        and histogram.should_prewarm(t)):
+                    state, launched_at, ready_at = 'booting', t, t + boot
+                    result['prewarms'] += 1
+                    prewarmed_unused = True
+            else:
+                histogram.record(t, players)
+                if (players == 0 and not cadence.in_start_grace(t, launched_at)
+                        and not (prewarm and histogram.should_hold(t))):
+                    state = 'stopped'
+                    if prewarmed_unused:
+                        result['wasted_prewarms'] += 1
+                        prewarmed_unused = False
+            if interval is None:
+                observed = players if state == 'running' else None
+                next_at = cadence.next_check(
+                    t, 'pending' if state == 'booting' else state, observed,
+                    previous_players, launched_at,
+                    histogram.next_prewarm(t) if prewarm else None)
+                previous_players = observed
+
+        if state != 'stopped':
+            result['instance_seconds'] += MINUTE
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('history', nargs='?',
+                        help='CSV of unix timestamp,num_players rows')
+    parser.add_argument('--synthetic', type=int, metavar='WEEKS',
+                        help='generate this many weeks of history instead')
+    parser.add_argument('--boot-minutes', type=float, default=4,
+                        help='time for the instance to boot and load the'
+                             ' world')
+    parser.add_argument('--interval-minutes', type=int,
+                        help='time between scheduled stopper runs, instead'
+                             ' of the adaptive cadence')
+    parser.add_argument('--threshold', type=float,
+                        default=occupancy.BUSY_THRESHOLD,
+                        help='occupancy above which an hour is predicted'
+                             ' busy')
+    parser.add_argument('--decay', type=float, default=occupancy.DECAY,
+                        help='weight kept by an hour\'s past samples each'
+                             ' week')
+    parser.add_argument('--lookahead-minutes', type=float,
+                        default=occupancy.LOOKAHEAD / MINUTE,
+                        help='how far ahead a session is looked for')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    occupancy.BUSY_THRESHOLD = args.threshold
+    occupancy.DECAY = args.decay
+    occupancy.LOOKAHEAD = int(args.lookahead_minutes * MINUTE)
+
+    if args.history:
+        rows = read_history(args.history)
+    else:
+        rows = synthetic_history(args.synthetic or 12,
+                                 random.Random(args.seed))
+    start, minutes = demand_by_minute(rows)
+    boot = int(args.boot_minutes * MINUTE)
+    interval = (args.interval_minutes * MINUTE
+                if args.interval_minutes else None)
+
+    baseline = simulate(start, minutes, boot, interval, prewarm=False)
+    prewarm = simulate(start, minutes, boot, interval, prewarm=True)
+
+    print(f"{len(minutes) / (7 * 24 * 60):.1f} weeks of history,"
+          f" {baseline['sessions']} sessions")
+    print(f"  {'policy':<10} {'wait min':>9} {'mean wait s':>12}"
+          f" {'inst hours':>11} {'prewarms':>9} {'unused':>7} {'runs':>6}")
+    for name, r in (('on demand', baseline), ('prewarm', prewarm)):
+        mean = r['wait'] / r['sessions'] if r['sessions'] else 0.0
+        print(f"  {name:<10} {r['wait'] / MINUTE:9.0f} {mean:12.0f}"
+              f" {r['instance_seconds'] / HOUR:11.1f} {r['prewarms']:9d}"
+              f" {r['wasted_prewarms']:7d} {r['invocations']:6d}")
+
+    saved = (baseline['wait'] - prewarm['wait']) / MINUTE
+    extra = (prewarm['instance_seconds'] - baseline['instance_seconds']) / HOUR
+    print(f"saved {saved:.0f} minutes of waiting for {extra:.1f} extra"
+          f" instance-hours", end='')
+    print(f", {saved / extra:.1f} minutes per extra hour" if extra > 0
+          else '')
+
+
+if __name__ == '__main__':
+    main()
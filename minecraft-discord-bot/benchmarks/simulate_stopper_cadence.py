@@ -0,0 +1,129 @@
+"""Compare stopper polling policies on cost and idle time over player traces.
+
+Replays player history minute by minute under fixed-rate stopper
+schedules and the adaptive cadence of stopper/cadence.py, where each run
+schedules the next one (plus the fixed-rate backstop).  Every policy
+starts the server when players turn up to a stopped one and stops it when
+a check finds nobody online outside the start grace period; pre-warming is
+left out so only the cadence differs.  Reports stopper invocations, how
+long an empty server keeps running before it is stopped, instance-hours
+and the cost of both.
+
+History is read or generated as by simulate_prewarm.py.
+
+    python benchmarks/simulate_stopper_cadence.py [HISTORY.csv |
+        --synthetic WEEKS] [--boot-minutes M] [--instance-price USD]
+        [--seed N]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulate_prewarm import (  # noqa: E402
+    BACKSTOP, HOUR, MINUTE, demand_by_minute, read_history,
+    synthetic_history)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'stopper'))
+
+import cadence  # noqa: E402
+
+# Cost of one 128 MB stopper invocation of about a second, in USD
+INVOCATION_COST = 0.0000002 + 0.125 * 0.0000166667
+
+
+def simulate(start, minutes, boot, interval=None):
+    """Simulates a fixed schedule every interval seconds, or the adaptive
+    cadence if interval is None."""
+    state = 'stopped'
+    ready_at = launched_at = 0
+    next_at = None
+    previous_players = None
+    emptied_at = None
+    result = {'invocations': 0, 'instance_seconds': 0, 'idle_seconds': 0,
+              'stops': 0, 'stop_delay': 0}
+    previous = 0
+
+    for i, players in enumerate(minutes):
+        t = start + i * MINUTE
+
+        if players > 0 and previous == 0 and state == 'stopped':
+            state, launched_at, ready_at = 'booting', t, t + boot
+        if players == 0 and previous > 0:
+            emptied_at = t
+        previous = players
+
+        if state == 'booting' and t >= ready_at:
+            state = 'running'
+            if interval is None:
+                # The readiness function schedules the first check
+                next_at = cadence.next_check(t, 'running', players)
+
+        if interval is not None:
+            due = (t - start) % interval == 0
+        else:
+            due = ((next_at is not None and t >= next_at)
+                   or (t - start) % BACKSTOP == 0)
+
+        if due:
+            result['invocations'] += 1
+            if (state == 'running' and players == 0
+                    and not cadence.in_start_grace(t, launched_at)):
+                state = 'stopped'
+                result['stops'] += 1
+                result['stop_delay'] += t - max(emptied_at or t, ready_at)
+            if interval is None:
+                observed = players if state == 'running' else None
+                next_at = cadence.next_check(t, state, observed,
+                                             previous_players, launched_at)
+                previous_players = observed
+
+        if state != 'stopped':
+            result['instance_seconds'] += MINUTE
+            if state == 'running' and players == 0:
+                result['idle_seconds'] += MINUTE
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('history', nargs='?',
+                        help='CSV of unix timestamp,num_players rows')
+    parser.add_argument('--synthetic', type=int, metavar='WEEKS',
+                        help='generate this many weeks of history instead')
+    parser.add_argument('--boot-minutes', type=float, default=4)
+    parser.add_argument('--instance-price', type=float, default=0.0832,
+                        help='on-demand price of the instance per hour')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.history:
+        rows = read_history(args.history)
+    else:
+        rows = synthetic_history(args.synthetic or 12,
+                                 random.Random(args.seed))
+    start, minutes = demand_by_minute(rows)
+    boot = int(args.boot_minutes * MINUTE)
+
+    policies = [('fixed 30m', 30 * MINUTE), ('fixed 5m', 5 * MINUTE),
+                ('adaptive', None)]
+    print(f"{len(minutes) / (7 * 24 * 60):.1f} weeks of history")
+    print(f"  {'policy':<10} {'runs':>6} {'stops':>6} {'mean idle m':>12}"
+          f" {'idle h':>7} {'inst h':>7} {'lambda $':>9} {'ec2 $':>7}")
+    for name, interval in policies:
+        r = simulate(start, minutes, boot, interval)
+        mean_delay = r['stop_delay'] / r['stops'] if r['stops'] else 0.0
+        print(f"  {name:<10} {r['invocations']:6d} {r['stops']:6d}"
+              f" {mean_delay / MINUTE:12.1f}"
+              f" {r['idle_seconds'] / HOUR:7.1f}"
+              f" {r['instance_seconds'] / HOUR:7.1f}"
+              f" {r['invocations'] * INVOCATION_COST:9.4f}"
+              f" {r['instance_seconds'] / HOUR * args.instance_price:7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,156 @@
 import json
 import os
+import time
+import urllib.request
 import boto3
+from botocore.config import Config
 from mcipc.query import Client
+from mcipc.rcon.je import Client as RconClient
+
+# Status snapshots shared with the bot's /mcstatus command
+import state_store
+
+# Waiting for a starting server to be joinable
+import readiness
+
+# Weekly usage patterns, for starting the server ahead of sessions
+import occupancy
+
+# When to check on the server next, and scheduling that check
+import cadence
+import scheduler
+
+# The time left before the invocation times out, shared between stages
+from deadline import Deadline, DeadlineExceeded
+
+# Skipping queries of a host that has stopped answering
+import breaker
+
+# Stopping the instance by hibernating it
+import power
+
+# Saving the world and shutting the server down before the instance stops
+import flush
 
 # The list of EC2 states that are considered stopped or stopping
 STOP_STATES = ['shutting-down','terminated','stopping','stopped']
 
+# The port the Minecraft server answers Query requests on
+QUERY_PORT = 25575
+
+# The port the Minecraft server accepts RCON connections on. RCON is TCP
+# and Query UDP, so both can use the same number
+RCON_PORT = 25575
+
+# The longest an EC2 call or a Query of the server may take, in seconds.
+# Each also gets at most a share of the time the invocation has left
+EC2_TIMEOUT = 8
+QUERY_TIMEOUT = 6
+
+# Timeouts of the state store and scheduler clients, which live across
+# invocations. Their calls are skipped with less than BOOKKEEPING_TIME
+# left, which covers both attempts
+BOOKKEEPING_CONFIG = Config(connect_timeout=1, read_timeout=1.5,
+                            retries={'total_max_attempts': 2, 'mode': 'standard'})
+BOOKKEEPING_TIME = 5
+
+# The longest the readiness waiter keeps polling, in seconds, and the time
+# it leaves itself to post the follow-up before the function times out.
+# Discord accepts follow-ups for 15 minutes after the interaction
+READY_TIMEOUT = 10 * 60
+READY_MARGIN = 15
+
+# Follow-up messages are posted to the interaction's webhook
+DISCORD_WEBHOOK_URL = 'https://discord.com/api/v10/webhooks/{application_id}/{token}'
+
+class ServerUnreachable(Exception):
+    '''Raised instead of querying a host whose breaker is open.'''
+
+# Created on first use by get_state_store, get_scheduler and
+# get_rcon_password
+_STATE_STORE = None
+_SCHEDULER = None
+_RCON_PASSWORD = None
+
+# RCON connections kept open across the invocations of this execution
+# environment
+_RCON_POOL = flush.RconPool(RconClient)
+
 def lambda_handler(event, context):
     '''This lambda function reaches out to the EC2 instance that is running the
     minecraft server. If it is active, it will ping the server to find out how
     many players are currently online. If no one is online, it will stop the
     server. If players are online, or the server is already inactive, it will
-    do nothing.'''
+    do nothing.
+
+    Every run also saves a snapshot of the server status for the bot's
+    /mcstatus command. An event of {"action": "refresh_status"} only does
+    that, and never stops the server.
+
+    Scheduled runs record whether anyone is online in a weekly occupancy
+    histogram. With PREDICTED_SESSIONS set to prewarm, a stopped server is
+    started ahead of a predicted session, and an idle one is kept running
+    through it; set to hold, only the latter.
+
+    Scheduled runs then schedule the next one, at a time chosen from what
+    they saw.
+
+    Every network call gets a timeout from what is left of the invocation,
+    so a result is always returned before Lambda's own timeout. A host that
+    keeps failing to answer trips a circuit breaker and isn't queried for a
+    while; with UNRESPONSIVE_ACTION set to stop, its instance is stopped if
+    one last query fails too.
+
+    Before an empty server's instance is stopped, the world is saved over
+    RCON, with the password from the RCON_PASSWORD_PARAMETER parameter.'''
+
+    refresh_only = isinstance(event, dict) and event.get('action') == 'refresh_status'
+    deadline = Deadline.from_context(context)
+
+    observed = {}
+    response = check_server(os.environ['MC_INSTANCE_ID'], refresh_only, observed, deadline)
+    if not refresh_only:
+        schedule_next_check(context.invoked_function_arn if context is not None else None, observed, deadline)
+    return response
+
+def check_server(instance_id, refresh_only, observed, deadline):
+    '''Runs one check of the server for lambda_handler, and returns its
+    response. Fills observed with the state, launch time and player counts
+    seen, for scheduling the next check.'''
 
     # All our interactions on the AWS side happen in this block
     try:
 
-        # Grab the id of the EC2 instance running the Minecraft server
-        instance_id = os.environ['MC_INSTANCE_ID']
-
-        ec2 = boto3.client('ec2')
+        ec2 = ec2_client(deadline, 'describing the instance', share=0.25)
 
         # Check if the EC2 instance is running
         response = ec2.describe_instances(InstanceIds=[instance_id])
         state = response['Reservations'][0]['Instances'][0]['State']['Name']
+        launch_time = response['Reservations'][0]['Instances'][0].get('LaunchTime')
+        observed['state'] = state
+        observed['hibernation_configured'] = power.hibernation_configured(response['Reservations'][0]['Instances'][0])
+        observed['launched_at'] = launch_time.timestamp() if launch_time is not None else None
 
         # If the EC2 instance is not running, return
         if state != 'running':
+            save_status(instance_id, state, None, None, deadline)
+            if not refresh_only:
+                # Nobody can be online while the instance is down
+                histogram = update_occupancy(instance_id, 0, deadline)
+                observed['histogram'] = histogram
+                if (state == 'stopped' and histogram is not None and prewarm_enabled()
+                        and histogram.should_prewarm(time.time())):
+                    print("Starting Minecraft Server ahead of a predicted session")
+                    ec2 = ec2_client(deadline, 'starting the instance', share=0.5)
+                    response = ec2.start_instances(InstanceIds=[instance_id])
+                    current_state = response['StartingInstances'][0]['CurrentState']['Name']
+                    save_status(instance_id, current_state, None, None, deadline)
+                    observed['state'] = current_state
+                    observed['launched_at'] = time.time()
+                    return {
+                        "statusCode": 200,
+                        "body": "Server pre-warming"
+                    }
             print("Minecraft Server is not currently running")
             return {
                 "statusCode": 200,
@@ -36,6 +160,9 @@ def lambda_handler(event, context):
         # Get the ip address of the EC2 instance so we can query it
         ip_address = response['Reservations'][0]['Instances'][0]['PublicIpAddress']
 
+    except DeadlineExceeded as e:
+        return out_of_time(e)
+
     # Catch any error and return a 400
     except Exception as e:
         print(f"Encounterd exception: {e}")
@@ -47,31 +174,93 @@ def lambda_handler(event, context):
     # All our interactions with the Minecraft server happen in this block
     try:
 
+        # A host that failed its last few queries isn't queried again until
+        # its breaker half opens, so the run doesn't wait on a timeout
+        if not breaker_allows(ip_address, deadline):
+            raise ServerUnreachable(f"{ip_address} failed its last {breaker.THRESHOLD} queries, not querying it")
+
         # Ping the server using mcipc to see if anyone is online
         # If no one is online, stop the server
-        with mcipc.Client(ip_address, 25575) as client:
-            basic_stats = dict( client.stats() )
+        basic_stats = query_stats(ip_address, deadline)
+        record_query(ip_address, True, deadline)
+
+    except DeadlineExceeded as e:
+        return out_of_time(e)
+
+    except Exception as e:
+        print(f"Could not reach out to MC server. Encountered exception: {e}")
+
+        # A server that is still booting fails its queries, and status
+        # refreshes come at any time, so only the scheduled checks after the
+        # start grace count towards opening the breaker
+        counted = not refresh_only and not cadence.in_start_grace(time.time(), observed['launched_at'])
+        breaker_state = breaker.OPEN
+        if not isinstance(e, ServerUnreachable):
+            breaker_state = record_query(ip_address, False, deadline) if counted else None
+
+        # Optionally treat a host whose breaker is open as idle, since a
+        # crashed server won't be stopped for being empty otherwise. It gets
+        # one last query first, and is only stopped if that fails too
+        stop_unresponsive = (counted and breaker_state == breaker.OPEN
+                             and os.environ.get('UNRESPONSIVE_ACTION') == 'stop')
+        basic_stats = None
+        if stop_unresponsive:
+            try:
+                basic_stats = probe_before_stop(ip_address, deadline)
+            except DeadlineExceeded as e:
+                return out_of_time(e)
+
+        if basic_stats is None:
+            save_status(instance_id, state, ip_address, None, deadline)
+            if stop_unresponsive:
+                print("Minecraft Server stopped answering, stopping the instance")
+                try:
+                    # RCON is skipped, as the server didn't answer Query either
+                    return stop_instance(instance_id, observed, deadline)
+                except DeadlineExceeded as e:
+                    return out_of_time(e)
+                except Exception as e:
+                    print(f"Encounterd exception: {e}")
+
+            return {
+                "statusCode": 400,
+                "body": "Minecraft Server Unresponsive"
+            }
+
+    try:
 
         num_players = basic_stats['num_players']
+        observed['num_players'] = num_players
+        observed['previous_players'] = load_previous_players(instance_id, deadline)
+        save_status(instance_id, state, ip_address, num_players, deadline)
 
-        # If no one is online, stop the server
+        if refresh_only:
+            return {
+                "statusCode": 200,
+                "body": "Status refreshed"
+            }
+
+        histogram = update_occupancy(instance_id, num_players, deadline)
+        observed['histogram'] = histogram
+
+        # Give players time to join a server that was just started
+        if num_players == 0 and cadence.in_start_grace(time.time(), observed['launched_at']):
+            print("No players online yet, but the server just started, server will not stop")
+            return {
+                "statusCode": 200,
+                "body": "Server just started"
+            }
+
+        # If no one is online, stop the server unless a session is predicted
+        if num_players == 0 and histogram is not None and hold_enabled() and histogram.should_hold(time.time()):
+            print("No players online, but a session is predicted, server will not stop")
+            return {
+                "statusCode": 200,
+                "body": "Session predicted"
+            }
         if num_players == 0:
             print("Stopping Minecraft Server")
-            response = ec2.stop_instances(InstanceIds=[instance_id])
-            # If the server is now stopping return successfully, otherwise error
-            current_state = response['StoppingInstances'][0]['CurrentState']['Name']
-            
-            if current_state in STOP_STATES:
-                return {
-                    "statusCode": 200,
-                    "body": "Server Stopping"
-                }
-            else:
-                return {
-                    "statusCode": 400,
-                    "body": "Error"
-                }
-
+            return stop_instance(instance_id, observed, deadline, ip_address)
 
         print(f"There are {num_players} players online, server will not stop")
         # A successful return
@@ -79,10 +268,334 @@ def lambda_handler(event, context):
             "statusCode": 200,
             "body": "Players online"
         }
-    
+
+    except DeadlineExceeded as e:
+        return out_of_time(e)
+
+    # Catch any error and return a 400
     except Exception as e:
-        print(f"Could not reach out to MC server. Encountered exception: {e}")
+        print(f"Encounterd exception: {e}")
+        return {
+            "statusCode": 400,
+            "body": "Error"
+        }
+
+def query_stats(ip_address, deadline):
+    '''Queries the Minecraft server for its basic stats. The handshake and
+    the stats request each wait up to half the timeout.'''
+    timeout = deadline.timeout(QUERY_TIMEOUT, share=0.5, stage='querying the server')
+    with Client(ip_address, QUERY_PORT, timeout=timeout / 2) as client:
+        return dict( client.stats() )
+
+def probe_before_stop(ip_address, deadline):
+    '''Queries a host whose breaker is open once more before its instance
+    is stopped as unresponsive, and returns its stats, or None if it still
+    doesn't answer. Either way the outcome is recorded in the breaker.'''
+    try:
+        basic_stats = query_stats(ip_address, deadline)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"Minecraft Server still not answering: {e}")
+        record_query(ip_address, False, deadline)
+        return None
+    print("Minecraft Server answered again, closing its circuit breaker")
+    record_query(ip_address, True, deadline)
+    return basic_stats
+
+def stop_instance(instance_id, observed, deadline, ip_address=None):
+    '''Stops the EC2 instance and returns the stopper's response. With
+    STOP_MODE set to hibernate, an instance launched with hibernation
+    enabled is hibernated instead, so it resumes with the world loaded.
+
+    Given the server's ip_address, the world is first saved over RCON and,
+    unless the instance is hibernated, the server shut down, so the next
+    boot has nothing to recover. The time spent in each phase is logged as
+    metrics. If RCON can't be reached the instance is stopped anyway.'''
+    hibernate = os.environ.get('STOP_MODE') == power.HIBERNATE and observed.get('hibernation_configured', False)
+
+    result = {'outcome': flush.SKIPPED, 'phases': {}}
+    if ip_address is not None:
+        result = flush.pre_stop(_RCON_POOL, ip_address, RCON_PORT, get_rcon_password(deadline), deadline,
+                                shutdown=not hibernate)
+        if result['outcome'] == flush.FAILED:
+            print(f"Could not save the world over RCON, stopping the instance anyway: {result['error']}")
+
+    ec2 = ec2_client(deadline, 'stopping the instance', share=0.5)
+    # If the server is now stopping return successfully, otherwise error
+    start = time.monotonic()
+    try:
+        current_state, mode = power.stop(ec2, instance_id, hibernate)
+    finally:
+        result['phases']['ec2_stop'] = time.monotonic() - start
+        print(json.dumps(flush.metric_log(instance_id, result, time.time())))
+    print(f"Instance {'hibernating' if mode == power.HIBERNATE else 'stopping'}")
+
+    observed['state'] = current_state
+
+    if current_state in STOP_STATES:
+        save_status(instance_id, current_state, None, 0, deadline)
+        save_stop_mode(instance_id, mode, deadline)
+        return {
+            "statusCode": 200,
+            "body": "Server Stopping"
+        }
+    else:
         return {
             "statusCode": 400,
-            "body": "Minecraft Server Unresponsive"
-        }
\ No newline at end of file
+            "body": "Error"
+        }
+
+def readiness_handler(event, context):
+    '''Invoked by the bot right after it starts the EC2 instance, with the
+    application_id and token of the /startmcserver interaction. Waits for
+    the instance to boot and the Minecraft server to answer, then posts a
+    follow-up to the interaction saying whether it is joinable. Logs the
+    time spent in each stage as metrics.'''
+
+    instance_id = os.environ['MC_INSTANCE_ID']
+    deadline = Deadline.from_context(context, default=READY_TIMEOUT + READY_MARGIN, margin=READY_MARGIN)
+    ec2 = ec2_client(deadline, 'describing the instance')
+
+    def describe_instance():
+        response = ec2.describe_instances(InstanceIds=[instance_id])
+        instance = response['Reservations'][0]['Instances'][0]
+        return instance['State']['Name'], instance.get('PublicIpAddress')
+
+    def probe(ip_address, timeout):
+        # The handshake and the stats request each wait up to half
+        with Client(ip_address, QUERY_PORT, timeout=timeout / 2) as client:
+            return dict(client.stats())
+
+    # Resuming from hibernation and booting cold are told apart in the
+    # metrics, to compare how long each takes to be joinable
+    start_kind = readiness.RESUME if load_stop_mode(instance_id) == power.HIBERNATE else readiness.COLD
+
+    budget = min(READY_TIMEOUT, deadline.remaining())
+
+    result = readiness.wait_until_ready(describe_instance, probe, budget)
+    print(json.dumps(readiness.metric_log(instance_id, result, time.time(), start_kind)))
+
+    if result['outcome'] == readiness.READY:
+        save_status(instance_id, 'running', result['public_ip'], result['num_players'], deadline)
+        # The server answered, so failures seen while it booted are cleared
+        record_query(result['public_ip'], True, deadline)
+
+    # The stopper doesn't run while the server is stopped, so the first
+    # check after a start is scheduled from here
+    if result['outcome'] in (readiness.READY, readiness.TIMED_OUT):
+        schedule_next_check(os.environ.get('STOPPER_FUNCTION_ARN'),
+                            {'state': 'running', 'num_players': result.get('num_players')}, deadline)
+
+    content = readiness.message(result)
+    if content is not None:
+        try:
+            post_followup(event['application_id'], event['token'], content,
+                          deadline.timeout(10, stage='posting the follow-up'))
+        except Exception as e:
+            print(f"Could not post the follow-up message: {e}")
+
+    return {
+        "statusCode": 200,
+        "body": result['outcome']
+    }
+
+def out_of_time(e):
+    print(f"Ran out of time: {e}")
+    return {
+        "statusCode": 504,
+        "body": "Out of time"
+    }
+
+def ec2_client(deadline, stage, share=1.0):
+    '''Returns an EC2 client whose calls fit in the stage's share of the
+    time left.'''
+    return boto3.client('ec2', config=deadline.boto_config(EC2_TIMEOUT, share, stage))
+
+def post_followup(application_id, token, content, timeout):
+    '''Posts a follow-up message to a Discord interaction.'''
+    request = urllib.request.Request(
+        DISCORD_WEBHOOK_URL.format(application_id=application_id, token=token),
+        data=json.dumps({'content': content}).encode(),
+        headers={
+            'Content-Type': 'application/json',
+            # Discord rejects requests without a bot user agent
+            'User-Agent': 'DiscordBot (minecraft-discord-bot, 1.0)',
+        },
+        method='POST')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+
+def prewarm_enabled():
+    '''Returns True if a stopped server is started ahead of predicted
+    sessions. Off unless set, as most simulated pre-warms went unused.'''
+    return os.environ.get('PREDICTED_SESSIONS') == 'prewarm'
+
+def hold_enabled():
+    '''Returns True if an idle server is kept running through predicted
+    sessions, which pre-warming implies.'''
+    return os.environ.get('PREDICTED_SESSIONS') in ('hold', 'prewarm')
+
+def bookkeeping_allowed(deadline, what):
+    '''Returns True if there is time left for a state store or scheduler
+    call, which are all optional.'''
+    if deadline is not None and deadline.remaining() < BOOKKEEPING_TIME:
+        print(f"Not enough time left to {what}")
+        return False
+    return True
+
+def save_status(instance_id, state, ip_address, num_players, deadline=None):
+    '''Saves the server status for the bot's /mcstatus command. Failing to
+    save it never keeps the stopper from doing its job.'''
+    if not bookkeeping_allowed(deadline, 'save the server status'):
+        return
+    try:
+        state_store.save_status(get_state_store(), instance_id, state, ip_address, num_players, time.time())
+    except Exception as e:
+        print(f"Could not save the server status: {e}")
+
+def update_occupancy(instance_id, num_players, deadline=None):
+    '''Records a sample in the occupancy histogram and returns it, or None
+    if it could not be updated, in which case the stopper works as if
+    nothing was predicted.'''
+    if not bookkeeping_allowed(deadline, 'update the occupancy histogram'):
+        return None
+    try:
+        store = get_state_store()
+        histogram = occupancy.load_histogram(store, instance_id)
+        histogram.record(time.time(), num_players)
+        occupancy.save_histogram(store, instance_id, histogram)
+    except Exception as e:
+        print(f"Could not update the occupancy histogram: {e}")
+        return None
+    return histogram
+
+def save_stop_mode(instance_id, mode, deadline=None):
+    '''Saves how the instance was stopped, for the readiness metrics.'''
+    if not bookkeeping_allowed(deadline, 'save the stop mode'):
+        return
+    try:
+        state_store.save_stop_mode(get_state_store(), instance_id, mode, time.time())
+    except Exception as e:
+        print(f"Could not save the stop mode: {e}")
+
+def load_stop_mode(instance_id):
+    '''Returns how the instance was last stopped, or None.'''
+    try:
+        return state_store.load_stop_mode(get_state_store(), instance_id)
+    except Exception as e:
+        print(f"Could not load the stop mode: {e}")
+        return None
+
+def breaker_allows(ip_address, deadline=None):
+    '''Returns True unless the breaker for the host is open. If the
+    breaker can't be read, the host is queried.'''
+    if not bookkeeping_allowed(deadline, 'check the circuit breaker'):
+        return True
+    try:
+        return breaker.CircuitBreaker(get_state_store(), ip_address).allow()
+    except Exception as e:
+        print(f"Could not check the circuit breaker: {e}")
+        return True
+
+def record_query(ip_address, succeeded, deadline=None):
+    '''Records the outcome of a query in the host's breaker and returns
+    the breaker's state, or None if it could not be updated.'''
+    if not bookkeeping_allowed(deadline, 'update the circuit breaker'):
+        return None
+    try:
+        host_breaker = breaker.CircuitBreaker(get_state_store(), ip_address)
+        if succeeded:
+            host_breaker.record_success()
+            return breaker.CLOSED
+        return host_breaker.record_failure()
+    except Exception as e:
+        print(f"Could not update the circuit breaker: {e}")
+        return None
+
+def load_previous_players(instance_id, deadline=None):
+    '''Returns the player count seen by the last check, or None.'''
+    if not bookkeeping_allowed(deadline, 'load the server status'):
+        return None
+    try:
+        snapshot = state_store.load_status(get_state_store(), instance_id)
+    except Exception as e:
+        print(f"Could not load the server status: {e}")
+        return None
+    return snapshot.get('num_players') if snapshot is not None else None
+
+def schedule_next_check(target_arn, observed, deadline=None):
+    '''Schedules the stopper to run again at the time cadence picks from
+    what this run observed, or cancels the next run if none is needed. A
+    run that couldn't see the instance's state tries again shortly. If
+    scheduling fails it is logged as an error and counted in the
+    schedule_failures metric, and the fixed-rate schedule still runs the
+    stopper.'''
+    if not bookkeeping_allowed(deadline, 'schedule the next check'):
+        return
+    now = time.time()
+    try:
+        if 'state' not in observed:
+            next_at = now + cadence.IDLE_INTERVAL
+        else:
+            histogram = observed.get('histogram')
+            next_at = cadence.next_check(
+                now, observed['state'], observed.get('num_players'),
+                observed.get('previous_players'), observed.get('launched_at'),
+                histogram.next_prewarm(now) if histogram is not None and prewarm_enabled() else None)
+
+        if next_at is None:
+            print("No check needed until the server is started")
+            get_scheduler(target_arn).cancel()
+        else:
+            print(f"Next check in {round(next_at - now)} seconds")
+            get_scheduler(target_arn).schedule(next_at)
+    except Exception as e:
+        # Until this is fixed only the fixed-rate schedule runs the stopper
+        print(f"ERROR Could not schedule the next check: {e}")
+        print(json.dumps(scheduler.failure_metric_log(os.environ.get('MC_INSTANCE_ID'), str(e), now)))
+
+def get_scheduler(target_arn):
+    '''Returns the scheduler for the stopper's next check: the one-time
+    EventBridge schedule named by the NEXT_CHECK_SCHEDULE environment
+    variable, invoking target_arn as the role SCHEDULER_ROLE_ARN, or a
+    scheduler in this execution environment's memory if they are not
+    set.'''
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        name = os.environ.get('NEXT_CHECK_SCHEDULE')
+        role_arn = os.environ.get('SCHEDULER_ROLE_ARN')
+        if name and role_arn and target_arn:
+            _SCHEDULER = scheduler.EventBridgeScheduler(boto3.client('scheduler', config=BOOKKEEPING_CONFIG), name, target_arn, role_arn)
+        else:
+            _SCHEDULER = scheduler.MemoryScheduler()
+    return _SCHEDULER
+
+def get_rcon_password(deadline=None):
+    '''Returns the RCON password from the SecureString parameter named by
+    the RCON_PASSWORD_PARAMETER environment variable, or None if it is not
+    set or can't be read, in which case the world isn't saved over RCON.'''
+    global _RCON_PASSWORD
+    if _RCON_PASSWORD is None:
+        name = os.environ.get('RCON_PASSWORD_PARAMETER')
+        if not name or not bookkeeping_allowed(deadline, 'load the RCON password'):
+            return None
+        try:
+            ssm = boto3.client('ssm', config=BOOKKEEPING_CONFIG)
+            _RCON_PASSWORD = ssm.get_parameter(Name=name, WithDecryption=True)['Parameter']['Value']
+        except Exception as e:
+            print(f"Could not load the RCON password: {e}")
+    return _RCON_PASSWORD
+
+def get_state_store():
+    '''Returns the store for state shared with the bot: the DynamoDB table
+    named by the STATE_TABLE environment variable, or a store in this
+    execution environment's memory if it is not set.'''
+    global _STATE_STORE
+    if _STATE_STORE is None:
+        table_name = os.environ.get('STATE_TABLE')
+        if table_name:
+            _STATE_STORE = state_store.DynamoStore(boto3.client('dynamodb', config=BOOKKEEPING_CONFIG), table_name)
+        else:
+            _STATE_STORE = state_store.MemoryStore()
+    return _STATE_STORE
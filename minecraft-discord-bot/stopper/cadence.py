@@ -0,0 +1,65 @@
+'''Decides when the stopper should next check on the server.
+
+Instead of waking at a fixed rate, each run picks the time of the next one
+from what it saw. It checks often while a server could be sitting empty,
+rarely while players are on, and not at all while the instance is stopped
+unless a session is predicted. A freshly started server gets a grace
+period for its players to join before it may be stopped.
+'''
+
+from typing import Optional
+
+# A started server isn't stopped for being empty until this long after the
+# instance launched, giving players time to join once it is up
+START_GRACE = 15 * 60
+
+# Time to the next check while the server is empty but kept running, or
+# isn't answering
+IDLE_INTERVAL = 5 * 60
+
+# Time to the next check while few players are on or players are leaving,
+# and while the player count is steady or growing. Checks cost far less
+# than an empty instance, so even busy servers are checked every quarter
+# hour (see benchmarks/simulate_stopper_cadence.py)
+DROPPING_INTERVAL = 5 * 60
+BUSY_INTERVAL = 15 * 60
+
+# Below this many players a session may be about to end
+FEW_PLAYERS = 2
+
+# States the instance doesn't leave without someone starting it
+STOP_STATES = ['shutting-down', 'terminated', 'stopping', 'stopped']
+
+
+def in_start_grace(now: float, launched_at: Optional[float]) -> bool:
+    return launched_at is not None and now - launched_at < START_GRACE
+
+
+def next_check(now: float, state: str, num_players: Optional[int] = None,
+               previous_players: Optional[int] = None, launched_at: Optional[float] = None,
+               prewarm_at: Optional[float] = None) -> Optional[float]:
+    '''Returns the time of the next check, or None if no check is needed.
+
+    state is the instance's EC2 state after this run acted on it, and
+    num_players the players online, None if the server didn't answer or
+    wasn't queried. previous_players is the count seen by the last run,
+    launched_at the time the instance was last started, and prewarm_at the
+    time a stopped server should be started for a predicted session.'''
+
+    if state in STOP_STATES:
+        return prewarm_at
+
+    if state != 'running':
+        # Still booting: look again once the start grace is over
+        return (launched_at or now) + START_GRACE
+
+    if num_players == 0 and in_start_grace(now, launched_at):
+        return launched_at + START_GRACE
+
+    if not num_players:
+        return now + IDLE_INTERVAL
+
+    if num_players < FEW_PLAYERS or (previous_players is not None and num_players < previous_players):
+        return now + DROPPING_INTERVAL
+
+    return now + BUSY_INTERVAL
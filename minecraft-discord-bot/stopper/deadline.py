@@ -0,0 +1,74 @@
+'''Shares the time a Lambda invocation has left between its network calls.
+
+A Deadline is taken from the Lambda context when the invocation starts,
+keeping back a safety margin for logging and returning a result. Each
+stage then asks it for a timeout, a share of what remains, and passes
+that to its socket, Query or RCON client, or boto3 client config, so a
+dead server or slow API can't run the function into its hard timeout.
+'''
+
+import time
+from typing import Optional
+
+# Time kept back from the Lambda timeout to log and return a result
+SAFETY_MARGIN = 2.0
+
+# The shortest timeout handed to a network call; with less time left than
+# this a stage isn't started
+MIN_TIMEOUT = 0.1
+
+# botocore retries a failed call once if each attempt gets at least this
+# long
+MIN_RETRY_TIMEOUT = 2.0
+
+
+class DeadlineExceeded(Exception):
+    '''Raised when a stage is about to start with no time left.'''
+
+
+class Deadline:
+    '''A point in time that the invocation's network calls must finish by.'''
+
+    def __init__(self, seconds: float, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def from_context(cls, context, default: float = 30.0, margin: float = SAFETY_MARGIN) -> 'Deadline':
+        '''Returns the deadline margin seconds before the invocation times
+        out. Without a context, as when run locally, the invocation is taken
+        to have default seconds.'''
+        if context is None:
+            seconds = default
+        else:
+            seconds = context.get_remaining_time_in_millis() / 1000
+        return cls(seconds - margin)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+    def timeout(self, maximum: Optional[float] = None, share: float = 1.0, stage: str = 'the next stage') -> float:
+        '''Returns the timeout for a stage: share of the time remaining, at
+        most maximum. Raises DeadlineExceeded if too little time is left to
+        start it.'''
+        remaining = self.remaining()
+        if remaining < MIN_TIMEOUT:
+            raise DeadlineExceeded(f'no time left for {stage}')
+        timeout = remaining * share
+        if maximum is not None:
+            timeout = min(timeout, maximum)
+        return max(MIN_TIMEOUT, timeout)
+
+    def boto_config(self, maximum: Optional[float] = None, share: float = 1.0, stage: str = 'the next stage'):
+        '''Returns a botocore config whose connect and read timeouts, over
+        all attempts, fit in the stage's timeout.'''
+        from botocore.config import Config
+
+        timeout = self.timeout(maximum, share, stage)
+        attempts = 2 if timeout >= 2 * MIN_RETRY_TIMEOUT else 1
+        per_attempt = timeout / attempts
+        return Config(
+            connect_timeout=per_attempt / 4,
+            read_timeout=per_attempt * 3 / 4,
+            retries={'total_max_attempts': attempts, 'mode': 'standard'},
+        )
@@ -0,0 +1,176 @@
+'''Saves the world and shuts the Minecraft server down over RCON before its
+instance is stopped.
+
+Stopping the instance under a running server leaves it to save whatever
+it can while the OS shuts down, and chunks it didn't get to are recovered
+on the next boot, which makes that boot slower. pre_stop runs save-all
+flush, which only answers once every chunk is on disk, then stop, and
+waits for the server to exit. When the instance is hibernated only the
+save is run, so the server resumes with its world still loaded. Each phase
+is bounded by the invocation's deadline. If RCON can't be reached the
+instance is stopped anyway, as before.
+'''
+
+import socket
+import time
+from typing import Callable, Optional
+
+# Phases of pre_stop, as recorded in its result and the metrics
+SAVE = 'save'
+SHUTDOWN = 'shutdown'
+
+# Outcomes of pre_stop
+FLUSHED = 'flushed'
+SAVED = 'saved'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+# The longest each phase may take, in seconds, and the largest share of
+# the invocation's remaining time it may use, leaving time to stop the
+# instance afterwards
+SAVE_TIMEOUT = 20
+SHUTDOWN_TIMEOUT = 20
+PHASE_SHARE = 0.4
+
+# How often to look whether the server has exited
+EXIT_POLL_INTERVAL = 0.5
+
+# Namespace of the metrics logged by metric_log
+METRIC_NAMESPACE = 'MinecraftDiscordBot'
+
+
+class RconPool:
+    '''Keeps logged-in RCON connections open across the invocations a warm
+    execution environment serves, one per host and port. client_factory
+    is called like mcipc.rcon.je.Client.'''
+
+    def __init__(self, client_factory: Callable):
+        self.client_factory = client_factory
+        self._clients = {}
+
+    def get(self, host: str, port: int, password: str, timeout: float):
+        '''Returns a logged-in client, and whether it was opened now rather
+        than taken from the pool.'''
+        client = self._clients.get((host, port))
+        if client is not None:
+            client.timeout = timeout
+            return client, False
+        client = self.client_factory(host, port, timeout=timeout, passwd=password)
+        try:
+            client.connect(login=True)
+        except BaseException:
+            client.close()
+            raise
+        self._clients[(host, port)] = client
+        return client, True
+
+    def discard(self, host: str, port: int):
+        client = self._clients.pop((host, port), None)
+        if client is not None:
+            try:
+                client.close()
+            except OSError:
+                pass
+
+    def run(self, host: str, port: int, password: str, timeout: float, command: Callable):
+        '''Calls command(client) on a pooled connection. A pooled connection
+        that fails, which the server may have closed while it sat idle, is
+        replaced by a new one and the command tried once more.'''
+        client, fresh = self.get(host, port, password, timeout)
+        try:
+            return command(client)
+        except Exception:
+            self.discard(host, port)
+            if fresh:
+                raise
+        client, _ = self.get(host, port, password, timeout)
+        try:
+            return command(client)
+        except Exception:
+            self.discard(host, port)
+            raise
+
+
+def port_open(host: str, port: int, timeout: float) -> bool:
+    '''Returns True if something accepts TCP connections on the port.'''
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def pre_stop(pool: RconPool, host: str, port: int, password: Optional[str], deadline, shutdown: bool = True,
+             is_open: Callable[[str, int, float], bool] = port_open, clock: Callable[[], float] = time.monotonic,
+             sleep: Callable[[float], None] = time.sleep) -> dict:
+    '''Saves the world and, if shutdown is True, stops the server and waits
+    for it to exit. deadline is a deadline.Deadline for the invocation.
+
+    Returns a dict with the outcome: flushed if the server saved and
+    exited, saved if only the save was run or the server didn't exit in
+    time, skipped without an RCON password, failed if RCON didn't answer.
+    It also holds the seconds spent in each phase that was entered, and
+    the error if there was one. Never raises for a server that can't be
+    reached, so the caller can go on to stop the instance.'''
+
+    result = {'outcome': SKIPPED, 'phases': {}}
+    if not password:
+        return result
+
+    start = clock()
+    try:
+        timeout = deadline.timeout(SAVE_TIMEOUT, PHASE_SHARE, 'saving the world')
+        pool.run(host, port, password, timeout, lambda client: client.save_all(flush=True))
+    except Exception as e:
+        result['outcome'] = FAILED
+        result['error'] = str(e)
+        return result
+    finally:
+        result['phases'][SAVE] = clock() - start
+
+    result['outcome'] = SAVED
+    if not shutdown:
+        return result
+
+    start = clock()
+    try:
+        timeout = deadline.timeout(SHUTDOWN_TIMEOUT, PHASE_SHARE, 'shutting the server down')
+        pool.run(host, port, password, timeout, lambda client: client.stop())
+        # The server closes RCON as it shuts down, so the connection can't
+        # be used again
+        pool.discard(host, port)
+
+        wait_until = clock() + timeout
+        while is_open(host, port, min(EXIT_POLL_INTERVAL, max(0.1, wait_until - clock()))):
+            if clock() >= wait_until:
+                result['error'] = 'the server did not exit in time'
+                return result
+            sleep(EXIT_POLL_INTERVAL)
+        result['outcome'] = FLUSHED
+    except Exception as e:
+        pool.discard(host, port)
+        result['error'] = str(e)
+    finally:
+        result['phases'][SHUTDOWN] = clock() - start
+    return result
+
+
+def metric_log(instance_id: str, result: dict, timestamp: float) -> dict:
+    '''Returns the phase timings of a pre_stop result, plus any the caller
+    added, in CloudWatch embedded metric format.'''
+    values = {f'stop_{name}': round(seconds, 3) for name, seconds in result['phases'].items()}
+    log = {'stop_outcome': result['outcome'], 'instance_id': instance_id}
+    if 'error' in result:
+        log['error'] = result['error']
+    return {
+        '_aws': {
+            'Timestamp': int(timestamp * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRIC_NAMESPACE,
+                'Dimensions': [['stop_outcome']],
+                'Metrics': [{'Name': name, 'Unit': 'Seconds'} for name in values],
+            }],
+        },
+        **log,
+        **values,
+    }
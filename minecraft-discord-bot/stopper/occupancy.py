@@ -0,0 +1,127 @@
+'''Learns when the Minecraft server is usually in use, by hour of the week.
+
+Each scheduled stopper run records whether anyone was online. The samples
+are kept in 168 buckets, one per hour of the week (UTC), as exponentially
+decayed counts, so recent weeks count the most and a pattern nobody follows
+any more fades out. The stopper's cadence checks every five minutes on an
+idle server and every four hours on a stopped one, so runs aren't an even
+sample of the week: each hour counts once, as occupied if any run in it
+saw players. From the histogram the stopper decides whether to start
+the server ahead of a likely session, and whether to keep an idle server
+running because a session is likely to begin soon.
+'''
+
+import json
+import time
+from typing import Optional
+
+HOUR = 60 * 60
+HOURS_PER_WEEK = 7 * 24
+
+# Weight kept by a bucket's past samples each time it gets a new one, which
+# is once a week: an hour's history halves about every three weeks
+DECAY = 0.8
+
+# An hour is predicted busy when at least this fraction of its decayed
+# samples had players online, and it has at least MIN_SAMPLES of them,
+# which takes runs in that hour in two different weeks
+BUSY_THRESHOLD = 0.5
+MIN_SAMPLES = 1.5
+
+# How far ahead a session is looked for: the time the instance and world
+# take to load, plus the idle check interval, so a held server's next run
+# isn't too late. A stopped server's run is scheduled for the pre-warm
+# itself (see next_prewarm), so it needs no interval of its own
+LOOKAHEAD = 10 * 60 + 5 * 60
+
+
+def hour_of_week(timestamp: float) -> int:
+    '''Returns the hour of the week of a unix timestamp, 0 being Monday
+    00:00 to 01:00 UTC.'''
+    t = time.gmtime(timestamp)
+    return t.tm_wday * 24 + t.tm_hour
+
+
+class OccupancyHistogram:
+    '''Decayed counts of samples, and of samples with players online, per
+    hour of the week. last_hour is the hour since the epoch of the latest
+    sample, and last_occupied whether any sample in it had players.'''
+
+    def __init__(self, samples: Optional[list] = None, occupied: Optional[list] = None,
+                 last_hour: Optional[int] = None, last_occupied: bool = False):
+        self.samples = samples or [0.0] * HOURS_PER_WEEK
+        self.occupied = occupied or [0.0] * HOURS_PER_WEEK
+        self.last_hour = last_hour
+        self.last_occupied = last_occupied
+
+    def record(self, timestamp: float, num_players: int):
+        '''Records a run's player count. Later runs in the same hour only
+        turn its sample occupied.'''
+        hour = hour_of_week(timestamp)
+        occupied = num_players > 0
+        if int(timestamp // HOUR) == self.last_hour:
+            if occupied and not self.last_occupied:
+                self.occupied[hour] += 1
+                self.last_occupied = True
+            return
+        self.samples[hour] = self.samples[hour] * DECAY + 1
+        self.occupied[hour] = self.occupied[hour] * DECAY + (1 if occupied else 0)
+        self.last_hour = int(timestamp // HOUR)
+        self.last_occupied = occupied
+
+    def occupancy(self, timestamp: float) -> float:
+        '''Returns the decayed fraction of samples in the hour of timestamp
+        that had players online.'''
+        hour = hour_of_week(timestamp)
+        if self.samples[hour] == 0:
+            return 0.0
+        return self.occupied[hour] / self.samples[hour]
+
+    def busy(self, timestamp: float) -> bool:
+        '''Returns True if the hour of timestamp is predicted to have
+        players online.'''
+        hour = hour_of_week(timestamp)
+        return self.samples[hour] >= MIN_SAMPLES and self.occupancy(timestamp) >= BUSY_THRESHOLD
+
+    def should_prewarm(self, now: float) -> bool:
+        '''Returns True if a stopped server should be started now, so it is
+        ready for a session predicted before the next stopper run.'''
+        return self.busy(now + LOOKAHEAD)
+
+    def should_hold(self, now: float) -> bool:
+        '''Returns True if an idle server should be kept running, because a
+        session is predicted now or before the next stopper run.'''
+        return self.busy(now) or self.busy(now + LOOKAHEAD)
+
+    def next_prewarm(self, now: float) -> Optional[float]:
+        '''Returns the first time from now on at which should_prewarm will
+        be True, or None if no hour of the week is predicted busy.'''
+        ahead = now + LOOKAHEAD
+        first = ahead - ahead % HOUR
+        for i in range(HOURS_PER_WEEK):
+            if self.busy(first + i * HOUR):
+                return max(now, first + i * HOUR - LOOKAHEAD)
+        return None
+
+    def encode(self) -> str:
+        '''Returns the histogram as compact text for the state store.'''
+        return json.dumps([[round(n, 3) for n in self.samples],
+                           [round(n, 3) for n in self.occupied],
+                           self.last_hour, self.last_occupied], separators=(',', ':'))
+
+    @classmethod
+    def decode(cls, text: str) -> 'OccupancyHistogram':
+        # Histograms saved before the latest hour was kept have only counts
+        return cls(*json.loads(text))
+
+
+def load_histogram(store, instance_id: str) -> OccupancyHistogram:
+    '''Returns the histogram saved by save_histogram, or an empty one.'''
+    record = store.get(f'occupancy#{instance_id}')
+    if record is None:
+        return OccupancyHistogram()
+    return OccupancyHistogram.decode(record['histogram'])
+
+
+def save_histogram(store, instance_id: str, histogram: OccupancyHistogram):
+    store.put(f'occupancy#{instance_id}', {'histogram': histogram.encode()})
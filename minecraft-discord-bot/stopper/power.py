@@ -0,0 +1,37 @@
+'''Stops the Minecraft instance, hibernating it where possible.
+
+A hibernated instance saves its memory to the root volume, so on the next
+start the JVM comes back with the world already loaded instead of booting
+from scratch. StartInstances resumes a hibernated instance by itself, so
+nothing changes on the start side. Hibernation only works on instances
+launched with it configured, and only once the instance is ready for it,
+so a refused hibernation falls back to a plain stop.
+'''
+
+from typing import Tuple
+
+from botocore.exceptions import ClientError
+
+# How the instance was stopped, as saved with state_store.save_stop_mode
+HIBERNATE = 'hibernate'
+STOP = 'stop'
+
+
+def hibernation_configured(instance: dict) -> bool:
+    '''Returns True if an instance from describe_instances was launched
+    with hibernation enabled.'''
+    return instance.get('HibernationOptions', {}).get('Configured', False)
+
+
+def stop(ec2, instance_id: str, hibernate: bool) -> Tuple[str, str]:
+    '''Stops the instance, hibernating it if hibernate is True. Returns the
+    instance's new state and how it was stopped.'''
+    if hibernate:
+        try:
+            response = ec2.stop_instances(InstanceIds=[instance_id], Hibernate=True)
+            return response['StoppingInstances'][0]['CurrentState']['Name'], HIBERNATE
+        except ClientError as e:
+            print(f"Could not hibernate, stopping instead: {e}")
+
+    response = ec2.stop_instances(InstanceIds=[instance_id])
+    return response['StoppingInstances'][0]['CurrentState']['Name'], STOP
@@ -0,0 +1,160 @@
+'''Waits for a starting Minecraft server to become joinable.
+
+Readiness has two stages. First the EC2 instance boots until it is running
+with a public IP, then the server answers a Query request once the JVM has
+loaded the world. Each stage is polled with exponential backoff, and both
+share a single time budget. The time spent in each stage is returned so it
+can be logged as metrics.
+'''
+
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+# Stage names, as recorded in the result and in the metrics
+EC2_BOOT = 'ec2_boot'
+SERVER_LOAD = 'server_load'
+
+# Outcomes of wait_until_ready
+READY = 'ready'
+TIMED_OUT = 'timed_out'
+STOPPED = 'stopped'
+CANCELLED = 'cancelled'
+
+# How the instance was started, a dimension of the metrics: resumed from
+# hibernation, or booted cold
+RESUME = 'resume'
+COLD = 'cold'
+
+# EC2 states the instance never comes back from by itself
+STOP_STATES = ['shutting-down', 'terminated', 'stopping', 'stopped']
+
+# Backoff between polls, in seconds: doubling from the first delay up to
+# the maximum
+INITIAL_DELAY = 2
+MAX_DELAY = 15
+
+# The longest a single Query probe may wait for an answer
+PROBE_TIMEOUT = 3
+
+# Namespace of the metrics logged by metric_log
+METRIC_NAMESPACE = 'MinecraftDiscordBot'
+
+
+def backoff(initial: float = INITIAL_DELAY, maximum: float = MAX_DELAY):
+    '''Yields the delays between successive polls.'''
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * 2, maximum)
+
+
+def wait_until_ready(describe_instance: Callable[[], Tuple[str, Optional[str]]],
+                     probe: Callable[[str, float], dict], budget: float,
+                     cancel: Optional[threading.Event] = None,
+                     clock: Callable[[], float] = time.monotonic) -> dict:
+    '''Polls until the server answers, the budget runs out, the instance
+    stops or cancel is set.
+
+    describe_instance() returns the instance's EC2 state and public IP (or
+    None). probe(ip, timeout) queries the Minecraft server and returns its
+    basic stats, raising if it doesn't answer. Returns a dict with the
+    outcome, the public IP and player count when known, and the seconds
+    spent in each stage that was entered.'''
+
+    if cancel is None:
+        cancel = threading.Event()
+    start = clock()
+    deadline = start + budget
+    result = {'outcome': TIMED_OUT, 'public_ip': None, 'stages': {}}
+
+    def pause(delays) -> bool:
+        # Sleeps until the next poll; False if there is no time left for
+        # one or the wait was cancelled
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return False
+        if cancel.wait(min(next(delays), remaining)):
+            result['outcome'] = CANCELLED
+            return False
+        return clock() < deadline
+
+    stage_start = start
+    delays = backoff()
+    while True:
+        if cancel.is_set():
+            result['outcome'] = CANCELLED
+            return result
+        state, public_ip = describe_instance()
+        if state in STOP_STATES:
+            result['outcome'] = STOPPED
+            return result
+        if state == 'running' and public_ip:
+            result['public_ip'] = public_ip
+            break
+        if not pause(delays):
+            result['stages'][EC2_BOOT] = clock() - stage_start
+            return result
+
+    now = clock()
+    result['stages'][EC2_BOOT] = now - stage_start
+    stage_start = now
+    delays = backoff()
+    while True:
+        if cancel.is_set():
+            result['outcome'] = CANCELLED
+            break
+        try:
+            stats = probe(public_ip, max(0.1, min(PROBE_TIMEOUT, deadline - clock())))
+        except Exception as e:
+            print(f"Minecraft Server not answering yet: {e}")
+        else:
+            result['outcome'] = READY
+            result['num_players'] = stats['num_players']
+            break
+        if not pause(delays):
+            break
+
+    result['stages'][SERVER_LOAD] = clock() - stage_start
+    return result
+
+
+def message(result: dict) -> Optional[str]:
+    '''Returns the follow-up message for a result, or None if nothing
+    should be posted.'''
+    outcome = result['outcome']
+    if outcome == READY:
+        return f"Minecraft Server is up at {result['public_ip']}"
+    if outcome == TIMED_OUT:
+        if result['public_ip']:
+            return f"Minecraft Server is still loading at {result['public_ip']}, try /mcstatus in a bit"
+        return "Minecraft Server is still booting, try /mcstatus in a bit"
+    if outcome == STOPPED:
+        return "Minecraft Server stopped before it was ready"
+    return None
+
+
+def metric_log(instance_id: str, result: dict, timestamp: float, start_kind: Optional[str] = None) -> dict:
+    '''Returns the stage timings of a result in CloudWatch embedded metric
+    format. Printed as one line of JSON from a Lambda function, it is turned
+    into metrics without any API call. With a start_kind the timings are
+    also broken down by it.'''
+    values = {name: round(seconds, 3) for name, seconds in result['stages'].items()}
+    values['total'] = round(sum(result['stages'].values()), 3)
+    dimensions = [['outcome']]
+    log = {'outcome': result['outcome'], 'instance_id': instance_id}
+    if start_kind is not None:
+        dimensions.append(['outcome', 'start_kind'])
+        log['start_kind'] = start_kind
+    return {
+        '_aws': {
+            'Timestamp': int(timestamp * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRIC_NAMESPACE,
+                'Dimensions': dimensions,
+                'Metrics': [{'Name': name, 'Unit': 'Seconds'} for name in values],
+            }],
+        },
+        **log,
+        **values,
+    }
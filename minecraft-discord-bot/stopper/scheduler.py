@@ -0,0 +1,84 @@
+'''Schedules the stopper's next check.
+
+In production the check is a one-time EventBridge Scheduler schedule that
+invokes the stopper function, moved to each new time rather than created
+again. MemoryScheduler stands in for it in tests and simulations.
+'''
+
+import json
+import time
+from typing import Optional
+
+# The earliest a check is scheduled, in seconds from now. One-time
+# schedules have a granularity of a minute
+MIN_DELAY = 60
+
+# Metrics are emitted in CloudWatch embedded metric format, under the same
+# namespace as the stop and readiness timings
+METRIC_NAMESPACE = 'MinecraftDiscordBot'
+
+
+class MemoryScheduler:
+    '''Remembers the scheduled time, and every time it was set.'''
+
+    def __init__(self):
+        self.next_at: Optional[float] = None
+        self.history = []
+
+    def schedule(self, at: float):
+        self.next_at = at
+        self.history.append(at)
+
+    def cancel(self):
+        self.next_at = None
+
+
+class EventBridgeScheduler:
+    '''Keeps one one-time schedule, named name, which invokes target_arn
+    with an empty event, assuming role_arn. Takes a boto3 scheduler
+    client.'''
+
+    def __init__(self, client, name: str, target_arn: str, role_arn: str):
+        self.client = client
+        self.name = name
+        self.target_arn = target_arn
+        self.role_arn = role_arn
+
+    def schedule(self, at: float):
+        at = max(at, time.time() + MIN_DELAY)
+        schedule = {
+            'Name': self.name,
+            'ScheduleExpression': time.strftime('at(%Y-%m-%dT%H:%M:%S)', time.gmtime(at)),
+            'ScheduleExpressionTimezone': 'UTC',
+            'FlexibleTimeWindow': {'Mode': 'OFF'},
+            'Target': {'Arn': self.target_arn, 'RoleArn': self.role_arn, 'Input': json.dumps({})},
+            'ActionAfterCompletion': 'NONE',
+        }
+        try:
+            self.client.update_schedule(**schedule)
+        except self.client.exceptions.ResourceNotFoundException:
+            self.client.create_schedule(**schedule)
+
+    def cancel(self):
+        try:
+            self.client.delete_schedule(Name=self.name)
+        except self.client.exceptions.ResourceNotFoundException:
+            pass
+
+
+def failure_metric_log(instance_id: str, error: str, timestamp: float) -> dict:
+    '''Returns a count of one failed scheduling in CloudWatch embedded
+    metric format, for an alarm on the chain of checks breaking.'''
+    return {
+        '_aws': {
+            'Timestamp': int(timestamp * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRIC_NAMESPACE,
+                'Dimensions': [[]],
+                'Metrics': [{'Name': 'schedule_failures', 'Unit': 'Count'}],
+            }],
+        },
+        'instance_id': instance_id,
+        'error': error,
+        'schedule_failures': 1,
+    }
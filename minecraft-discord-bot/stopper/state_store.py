@@ -0,0 +1,161 @@
+'''Small key/value records shared between invocations of the bot.
+
+In production the records live in the DynamoDB table named by the
+STATE_TABLE environment variable, so every Lambda execution environment
+sees the same state. MemoryStore stands in for it in tests and local runs,
+with the same conditional write semantics. Record values are strings or
+numbers.
+'''
+
+import threading
+from typing import Optional
+
+# How long a server status snapshot is kept after it was sampled
+STATUS_RETENTION = 7 * 24 * 60 * 60
+
+
+class MemoryStore:
+    '''Keeps records in this process, guarded by a lock so conditional
+    writes are atomic between threads.'''
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def put_if_absent(self, key: str, item: dict, now: float) -> bool:
+        '''Writes the record unless one exists whose expires_at has not
+        passed. Returns True if the record was written.'''
+        with self._lock:
+            existing = self._items.get(key)
+            if existing is not None and existing.get('expires_at', 0) >= now:
+                return False
+            self._items[key] = dict(item)
+            return True
+
+    def put(self, key: str, item: dict):
+        '''Writes the record unconditionally.'''
+        with self._lock:
+            self._items[key] = dict(item)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            item = self._items.get(key)
+            return None if item is None else dict(item)
+
+    def update_if_owner(self, key: str, owner: str, fields: dict) -> bool:
+        '''Sets fields on the record if its owner is still ``owner``.
+        Returns True if the record was updated.'''
+        with self._lock:
+            existing = self._items.get(key)
+            if existing is None or existing.get('owner') != owner:
+                return False
+            existing.update(fields)
+            return True
+
+
+def _encode(item: dict) -> dict:
+    return {name: {'N': str(value)} if isinstance(value, (int, float)) else {'S': value}
+            for name, value in item.items()}
+
+
+def _decode(attributes: dict) -> dict:
+    item = {}
+    for name, value in attributes.items():
+        if 'N' in value:
+            number = value['N']
+            item[name] = float(number) if '.' in number else int(number)
+        else:
+            item[name] = value['S']
+    return item
+
+
+class DynamoStore:
+    '''Keeps records in a DynamoDB table with a string partition key named
+    pk, using conditional writes so concurrent invocations can't both win.
+    Takes a low-level boto3 DynamoDB client.'''
+
+    def __init__(self, client, table_name: str):
+        self.client = client
+        self.table_name = table_name
+
+    def put_if_absent(self, key: str, item: dict, now: float) -> bool:
+        # DynamoDB deletes expired items lazily, so an item still present
+        # may already have expired
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item=_encode({'pk': key, **item}),
+                ConditionExpression='attribute_not_exists(pk) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}},
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def put(self, key: str, item: dict):
+        self.client.put_item(TableName=self.table_name, Item=_encode({'pk': key, **item}))
+
+    def get(self, key: str) -> Optional[dict]:
+        response = self.client.get_item(
+            TableName=self.table_name,
+            Key={'pk': {'S': key}},
+            ConsistentRead=True,
+        )
+        if 'Item' not in response:
+            return None
+        item = _decode(response['Item'])
+        del item['pk']
+        return item
+
+    def update_if_owner(self, key: str, owner: str, fields: dict) -> bool:
+        # Field names go through placeholders since names like status are
+        # reserved words in DynamoDB expressions
+        names = {'#owner': 'owner'}
+        values = {':owner': {'S': owner}}
+        assignments = []
+        for i, (name, value) in enumerate(_encode(fields).items()):
+            names[f'#f{i}'] = name
+            values[f':f{i}'] = value
+            assignments.append(f'#f{i} = :f{i}')
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key={'pk': {'S': key}},
+                UpdateExpression='SET ' + ', '.join(assignments),
+                ConditionExpression='#owner = :owner',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+
+def save_status(store, instance_id: str, state: str, public_ip: Optional[str],
+                num_players: Optional[int], sampled_at: float):
+    '''Saves a snapshot of the server's status. The public IP and player
+    count are left out when unknown.'''
+    item = {'state': state, 'sampled_at': sampled_at,
+            'expires_at': sampled_at + STATUS_RETENTION}
+    if public_ip:
+        item['public_ip'] = public_ip
+    if num_players is not None:
+        item['num_players'] = num_players
+    store.put(f'status#{instance_id}', item)
+
+
+def load_status(store, instance_id: str) -> Optional[dict]:
+    '''Returns the last snapshot saved by save_status, or None.'''
+    return store.get(f'status#{instance_id}')
+
+
+def save_stop_mode(store, instance_id: str, mode: str, stopped_at: float):
+    '''Saves how the instance was last stopped: 'hibernate' or 'stop'.'''
+    store.put(f'stop#{instance_id}', {'mode': mode, 'stopped_at': stopped_at,
+                                      'expires_at': stopped_at + STATUS_RETENTION})
+
+
+def load_stop_mode(store, instance_id: str) -> Optional[str]:
+    '''Returns how the instance was last stopped, or None if unknown.'''
+    record = store.get(f'stop#{instance_id}')
+    return None if record is None else record['mode']
@@ -0,0 +1,55 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# The bot's dependencies are vendored next to its code for the Lambda
+# package. Tests of them must import those copies, not installed ones
+ALEX_BOT = os.path.join(ROOT, 'alex_bot')
+sys.path.insert(0, ALEX_BOT)
+
+
+class FakeClock:
+    '''Stands in for time.time or time.monotonic, and its sleep for
+    time.sleep: time only passes when a test moves now or something
+    sleeps.'''
+
+    def __init__(self, now=1700000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def load_app():
+    '''Returns a function that imports a fresh copy of a function's app.py,
+    given the function's directory, with its own modules first on the
+    path. Both functions have an app module and copies of some others,
+    which must not be taken from the other function.'''
+    def load(function):
+        directory = os.path.join(ROOT, function)
+        for name in os.listdir(directory):
+            if name.endswith('.py') and name != '__init__.py':
+                sys.modules.pop(name[:-3], None)
+        spec = importlib.util.spec_from_file_location(f'{function}_app', os.path.join(directory, 'app.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.path.insert(0, directory)
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(directory)
+        return module
+
+    return load
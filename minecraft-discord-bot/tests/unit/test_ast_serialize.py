@@ -0,0 +1,93 @@
+import marshal
+import pickle
+import sys
+from array import array
+
+import pytest
+
+from pycparser import ast_serialize, c_ast, c_parser
+
+SOURCE = '''
+typedef unsigned long size_t;
+typedef struct node { int value; struct node *next; } node_t;
+enum color { RED, GREEN = 3 };
+static const char *names[] = { "red", "green" };
+int count(node_t *head) {
+    size_t n = 0;
+    for (node_t *p = head; p; p = p->next)
+        n += 1.5 > 1 ? 1 : 0;
+    return n;
+}
+'''
+
+
+@pytest.fixture(scope='module')
+def ast():
+    return c_parser.CParser().parse(SOURCE, 'list.c')
+
+
+def coords(node):
+    found = [(type(node).__name__, node.coord and (node.coord.file, node.coord.line, node.coord.column))]
+    for _, child in node.children():
+        found.extend(coords(child))
+    return found
+
+
+def test_round_trip(ast):
+    loaded = ast_serialize.loads(ast_serialize.dumps(ast))
+    assert repr(loaded) == repr(ast)
+    assert coords(loaded) == coords(ast)
+
+
+def test_smaller_than_pickle(ast):
+    assert len(ast_serialize.dumps(ast)) < len(pickle.dumps(ast, pickle.HIGHEST_PROTOCOL)) / 2
+
+
+def test_without_coords(ast):
+    data = ast_serialize.dumps(ast, coords=False)
+    assert len(data) < len(ast_serialize.dumps(ast))
+    loaded = ast_serialize.loads(data)
+    assert repr(loaded) == repr(ast)
+    assert all(coord is None for _, coord in coords(loaded))
+
+
+def test_shared_coords_stay_shared():
+    coord = c_parser.CParser().parse('int a;', 'a.c').ext[0].coord
+    first, second = c_ast.ID('a', coord), c_ast.ID('b', coord)
+    loaded = ast_serialize.loads(ast_serialize.dumps(c_ast.ExprList([first, second])))
+    assert loaded.exprs[0].coord is loaded.exprs[1].coord
+    assert str(loaded.exprs[0].coord) == str(coord)
+
+
+def test_scalars_keep_their_types():
+    node = c_ast.Pragma([True, 1, 1.0, '1', b'1'])
+    loaded = ast_serialize.loads(ast_serialize.dumps(node))
+    assert [type(v) for v in loaded.string] == [bool, int, float, str, bytes]
+
+
+def test_other_byte_order(ast):
+    version, sig, with_coords, byteorder, strings, packed, packed_coords = \
+        marshal.loads(ast_serialize.dumps(ast))
+
+    def swap(packed):
+        ints = array(packed[0])
+        ints.frombytes(packed[1])
+        ints.byteswap()
+        return packed[0], ints.tobytes()
+    other = 'big' if sys.byteorder == 'little' else 'little'
+    data = marshal.dumps((version, sig, with_coords, other, strings, swap(packed), swap(packed_coords)))
+    assert repr(ast_serialize.loads(data)) == repr(ast)
+
+
+def test_rejects_foreign_data(ast):
+    with pytest.raises(ValueError):
+        ast_serialize.loads(b'not a tree')
+    fields = list(marshal.loads(ast_serialize.dumps(ast)))
+    fields[1] ^= 1
+    with pytest.raises(ValueError, match='incompatible'):
+        ast_serialize.loads(marshal.dumps(tuple(fields)))
+
+
+def test_rejects_unknown_values():
+    with pytest.raises(TypeError):
+        ast_serialize.dumps(c_ast.ID(object()))
@@ -0,0 +1,179 @@
+import json
+
+import pytest
+
+from alex_bot.state_store import MemoryStore
+
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+
+class FakeEC2:
+    def __init__(self, state='pending'):
+        self.state = state
+        self.starts = []
+
+    def start_instances(self, InstanceIds):
+        self.starts.append(InstanceIds)
+        return {
+            'StartingInstances': [{
+                'InstanceId': InstanceIds[0],
+                'CurrentState': {'Name': self.state},
+                'PreviousState': {'Name': 'stopped'},
+            }],
+            'ResponseMetadata': {'HTTPStatusCode': 200},
+        }
+
+
+class FakeLambda:
+    def __init__(self, error=None):
+        self.error = error
+        self.invocations = []
+
+    def invoke(self, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.invocations.append(kwargs)
+
+
+class FakeBoto3:
+    '''Stands in for the boto3 module, handing out the fake clients.'''
+
+    def __init__(self, **clients):
+        self.clients = clients
+        self.configs = {}
+
+    def client(self, name, config=None):
+        self.configs[name] = config
+        return self.clients[name]
+
+
+class FailingStore:
+    '''A state store whose every call fails, like a throttled table.'''
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise RuntimeError('ProvisionedThroughputExceededException')
+        return fail
+
+
+@pytest.fixture()
+def bot(load_app, monkeypatch):
+    monkeypatch.setenv('MC_INSTANCE_ID', INSTANCE_ID)
+    monkeypatch.delenv('STATE_TABLE', raising=False)
+    monkeypatch.delenv('READINESS_FUNCTION', raising=False)
+    monkeypatch.delenv('STATUS_REFRESH_FUNCTION', raising=False)
+    app = load_app('alex_bot')
+    app.boto3 = FakeBoto3(ec2=FakeEC2(), **{'lambda': FakeLambda()})
+    return app
+
+
+def command(name, **fields):
+    return {'type': 2, 'data': {'name': name}, 'application_id': 'app', 'token': 'token', **fields}
+
+
+def content(response):
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])['data']['content']
+
+
+def test_start_runs_once_for_requests_arriving_together(bot):
+    ec2 = bot.boto3.clients['ec2']
+    assert content(bot.command_handler(command('startmcserver'))) == 'Minecraft Server is now pending'
+    assert content(bot.command_handler(command('startmcserver'))) == 'Minecraft Server is now pending'
+    assert ec2.starts == [[INSTANCE_ID]]
+    assert bot.get_state_store().get(f'status#{INSTANCE_ID}')['state'] == 'pending'
+
+
+def test_start_asks_for_a_readiness_follow_up(bot, monkeypatch):
+    monkeypatch.setenv('READINESS_FUNCTION', 'readiness')
+    response = content(bot.command_handler(command('startmcserver')))
+    assert response.endswith(", I'll post here once it's joinable")
+    invocation, = bot.boto3.clients['lambda'].invocations
+    assert json.loads(invocation['Payload']) == {'application_id': 'app', 'token': 'token'}
+
+
+def test_start_without_the_state_store(bot):
+    bot._STATE_STORE = FailingStore()
+    assert content(bot.command_handler(command('startmcserver'))) == 'Minecraft Server is now pending'
+    assert bot.boto3.clients['ec2'].starts == [[INSTANCE_ID]]
+
+
+def test_start_error_is_not_retried_without_the_store(bot):
+    def fail(InstanceIds):
+        raise RuntimeError('UnauthorizedOperation')
+    bot.boto3.clients['ec2'].start_instances = fail
+    with pytest.raises(RuntimeError, match='UnauthorizedOperation'):
+        bot.command_handler(command('startmcserver'))
+
+
+def test_state_table_client_fails_fast(bot, monkeypatch):
+    monkeypatch.setenv('STATE_TABLE', 'state')
+    bot.boto3.clients['dynamodb'] = object()
+    bot.get_state_store()
+    config = bot.boto3.configs['dynamodb']
+    assert config.connect_timeout + config.read_timeout <= 1.5
+    assert config.retries['total_max_attempts'] == 2
+
+
+def save_status(bot, state, sampled_at, **fields):
+    bot.state_store.save_status(bot.get_state_store(), INSTANCE_ID, state,
+                                fields.get('public_ip'), fields.get('num_players'), sampled_at)
+
+
+def test_status_answers_from_a_fresh_snapshot(bot, monkeypatch):
+    monkeypatch.setenv('STATUS_REFRESH_FUNCTION', 'stopper')
+    save_status(bot, 'running', bot.time.time(), public_ip='203.0.113.7', num_players=2)
+    response = content(bot.command_handler(command('mcstatus')))
+    assert response == 'Minecraft Server is running at 203.0.113.7 with 2 players online (checked just now)'
+    assert bot.boto3.clients['lambda'].invocations == []
+    assert bot.boto3.clients['ec2'].starts == []
+
+
+def test_stale_status_asks_for_one_refresh(bot, monkeypatch):
+    monkeypatch.setenv('STATUS_REFRESH_FUNCTION', 'stopper')
+    save_status(bot, 'stopped', bot.time.time() - 3600)
+    assert content(bot.command_handler(command('mcstatus'))) == 'Minecraft Server is stopped (checked 60 minutes ago)'
+    content(bot.command_handler(command('mcstatus')))
+    invocation, = bot.boto3.clients['lambda'].invocations
+    assert invocation['FunctionName'] == 'stopper'
+    assert json.loads(invocation['Payload']) == {'action': 'refresh_status'}
+
+
+def test_status_without_a_snapshot(bot):
+    response = content(bot.command_handler(command('mcstatus')))
+    assert response == "Minecraft Server status hasn't been checked yet, try again in a minute"
+
+
+def test_status_answers_when_the_refresh_request_fails(bot, monkeypatch):
+    monkeypatch.setenv('STATUS_REFRESH_FUNCTION', 'stopper')
+    bot.boto3.clients['lambda'].error = RuntimeError('AccessDeniedException')
+    save_status(bot, 'stopped', bot.time.time() - 3600)
+    assert content(bot.command_handler(command('mcstatus'))) == 'Minecraft Server is stopped (checked 60 minutes ago)'
+
+
+def test_status_skips_the_refresh_of_an_unreachable_host(bot, monkeypatch):
+    monkeypatch.setenv('STATUS_REFRESH_FUNCTION', 'stopper')
+    save_status(bot, 'running', bot.time.time() - 3600, public_ip='203.0.113.7')
+    circuit = bot.breaker.CircuitBreaker(bot.get_state_store(), '203.0.113.7')
+    for _ in range(bot.breaker.THRESHOLD):
+        circuit.record_failure()
+    content(bot.command_handler(command('mcstatus')))
+    assert bot.boto3.clients['lambda'].invocations == []
+
+
+def test_status_without_the_state_store(bot, monkeypatch):
+    monkeypatch.setenv('STATUS_REFRESH_FUNCTION', 'stopper')
+    bot._STATE_STORE = FailingStore()
+    response = content(bot.command_handler(command('mcstatus')))
+    assert response == "Minecraft Server status hasn't been checked yet, try again in a minute"
+    assert bot.boto3.clients['lambda'].invocations == []
+
+
+def test_status_answers_when_the_refresh_claim_fails(bot, monkeypatch):
+    monkeypatch.setenv('STATUS_REFRESH_FUNCTION', 'stopper')
+    save_status(bot, 'stopped', bot.time.time() - 3600)
+    def fail(*args):
+        raise RuntimeError('ProvisionedThroughputExceededException')
+    monkeypatch.setattr(bot.get_state_store(), 'put_if_absent', fail)
+    assert content(bot.command_handler(command('mcstatus'))) == 'Minecraft Server is stopped (checked 60 minutes ago)'
+    assert bot.boto3.clients['lambda'].invocations == []
@@ -0,0 +1,55 @@
+import pytest
+
+from alex_bot import state_store
+from stopper import breaker
+
+
+@pytest.fixture()
+def host_breaker(clock):
+    return breaker.CircuitBreaker(state_store.MemoryStore(), '203.0.113.10', clock=clock)
+
+
+def test_opens_after_consecutive_failures(host_breaker):
+    assert host_breaker.state() == breaker.CLOSED
+    for _ in range(breaker.THRESHOLD - 1):
+        assert host_breaker.record_failure() == breaker.CLOSED
+        assert host_breaker.allow()
+    assert host_breaker.record_failure() == breaker.OPEN
+    assert not host_breaker.allow()
+    assert host_breaker.failures() == breaker.THRESHOLD
+
+
+def test_success_resets_the_count(host_breaker):
+    for _ in range(breaker.THRESHOLD - 1):
+        host_breaker.record_failure()
+    host_breaker.record_success()
+    assert host_breaker.record_failure() == breaker.CLOSED
+    assert host_breaker.failures() == 1
+
+
+def test_half_opens_on_a_timer(host_breaker, clock):
+    for _ in range(breaker.THRESHOLD):
+        host_breaker.record_failure()
+    clock.now += breaker.RESET_AFTER - 1
+    assert host_breaker.state() == breaker.OPEN
+    clock.now += 1
+    assert host_breaker.state() == breaker.HALF_OPEN
+    assert host_breaker.allow()
+
+    # A failed trial query opens it again for another RESET_AFTER
+    assert host_breaker.record_failure() == breaker.OPEN
+    clock.now += breaker.RESET_AFTER - 1
+    assert not host_breaker.allow()
+    clock.now += 1
+    host_breaker.record_success()
+    assert host_breaker.state() == breaker.CLOSED
+
+
+def test_state_is_shared_through_the_store(clock):
+    store = state_store.MemoryStore()
+    for _ in range(breaker.THRESHOLD):
+        breaker.CircuitBreaker(store, '203.0.113.10', clock=clock).record_failure()
+    assert breaker.CircuitBreaker(store, '203.0.113.10', clock=clock).state() == breaker.OPEN
+    # A restarted server on a new IP starts closed
+    assert breaker.CircuitBreaker(store, '203.0.113.11', clock=clock).state() == breaker.CLOSED
+    assert store.get('breaker#203.0.113.10')['expires_at'] == clock.now + breaker.RETENTION
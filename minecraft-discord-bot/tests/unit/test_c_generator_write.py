@@ -0,0 +1,96 @@
+import io
+import re
+
+import pytest
+
+from pycparser import c_ast, c_generator, c_parser
+
+SOURCE = '''
+typedef struct node { int value; struct node *next; } node_t;
+enum color { RED, GREEN = 3 };
+int count(node_t *head, int limit) {
+    int n = 0;
+    for (node_t *p = head; p; p = p->next) {
+        if (n > limit) break; else if (n == limit) continue; else n++;
+    }
+    while (n < 0) n += 2;
+    do { n--; } while (n > 100);
+    switch (n) { case 1: return 1; default: ; }
+    goto done;
+done:
+    return n ? a + b * c - (d - e) : -1;
+}
+'''
+
+
+@pytest.fixture(scope='module')
+def ast():
+    return c_parser.CParser().parse(SOURCE)
+
+
+@pytest.mark.parametrize('reduce_parentheses', [False, True])
+def test_write_matches_visit(ast, reduce_parentheses):
+    expected = c_generator.CGenerator(reduce_parentheses).visit(ast)
+    fragments = []
+    c_generator.CGenerator(reduce_parentheses).write(ast, fragments)
+    assert ''.join(fragments) == expected
+    out = io.StringIO()
+    c_generator.CGenerator(reduce_parentheses).write(ast, out)
+    assert out.getvalue() == expected
+
+
+def test_write_uses_overridden_visit_methods(ast):
+    class Uppercase(c_generator.CGenerator):
+        def visit_ID(self, n):
+            return n.name.upper()
+
+        def visit_Return(self, n):
+            return self._make_indent() + 'return /* out */ ' + self.visit(n.expr) + ';\n'
+    out = []
+    Uppercase().write(ast, out)
+    code = ''.join(out)
+    assert code == Uppercase().visit(ast)
+    assert 'LIMIT' in code and 'return /* out */ (N) ?' in code
+
+
+def reparse(code):
+    return c_parser.CParser().parse(code)
+
+
+def test_long_binary_op_chain():
+    terms = ' + '.join(f'x{i}' for i in range(2000))
+    ast = reparse(f'int f(void) {{ return {terms}; }}')
+    code = c_generator.CGenerator().visit(ast)
+    assert c_generator.CGenerator().visit(reparse(code)) == code
+    out = []
+    c_generator.CGenerator().write(ast, out)
+    assert ''.join(out) == code
+    assert terms in c_generator.CGenerator(reduce_parentheses=True).visit(ast)
+
+
+def test_long_else_if_chain():
+    branches = ' else '.join(f'if (x == {i}) return {i};' for i in range(800))
+    body = f'int f(int x) {{ {branches} return -1; }}'
+    ast = reparse(body)
+    out = io.StringIO()
+    c_generator.CGenerator().write(ast, out)
+    assert out.getvalue().count('else\n') == 799
+    assert c_generator.CGenerator().visit(reparse(out.getvalue())) == out.getvalue()
+
+
+def test_single_expression():
+    node = c_ast.BinaryOp('*', c_ast.ID('a'), c_ast.BinaryOp('+', c_ast.ID('b'), c_ast.Constant('int', '1')))
+    out = []
+    c_generator.CGenerator().write(node, out)
+    assert ''.join(out) == 'a * (b + 1)'
+
+
+@pytest.mark.parametrize('reduce_parentheses', [False, True])
+def test_overridden_visit_binary_op_sees_nested_operators(reduce_parentheses):
+    class Tagged(c_generator.CGenerator):
+        def visit_BinaryOp(self, n):
+            return '/*%s*/' % n.op + super().visit_BinaryOp(n)
+    ast = reparse('int f(void) { return a + b * c - (d - e); }')
+    code = Tagged(reduce_parentheses).visit(ast)
+    assert code.count('/*') == 4
+    assert re.sub(r'/\*.\*/', '', code) == c_generator.CGenerator(reduce_parentheses).visit(ast)
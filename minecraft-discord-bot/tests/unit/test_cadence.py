@@ -0,0 +1,91 @@
+import pytest
+
+from stopper import cadence, scheduler
+
+NOW = 1700000000.0
+
+
+@pytest.mark.parametrize('state', cadence.STOP_STATES)
+def test_no_check_while_stopped(state):
+    assert cadence.next_check(NOW, state) is None
+
+
+def test_stopped_server_is_checked_for_a_predicted_session():
+    assert cadence.next_check(NOW, 'stopped', prewarm_at=NOW + 3600) == NOW + 3600
+
+
+def test_booting_server_is_checked_after_the_start_grace():
+    assert cadence.next_check(NOW, 'pending', launched_at=NOW - 60) == NOW - 60 + cadence.START_GRACE
+    assert cadence.next_check(NOW, 'pending') == NOW + cadence.START_GRACE
+
+
+def test_empty_server_in_start_grace():
+    launched_at = NOW - 60
+    assert cadence.in_start_grace(NOW, launched_at)
+    assert cadence.next_check(NOW, 'running', 0, launched_at=launched_at) == launched_at + cadence.START_GRACE
+    assert not cadence.in_start_grace(NOW, NOW - cadence.START_GRACE)
+    assert not cadence.in_start_grace(NOW, None)
+
+
+@pytest.mark.parametrize('num_players, previous_players, delay', [
+    (0, 3, cadence.IDLE_INTERVAL),
+    (None, None, cadence.IDLE_INTERVAL),
+    (1, None, cadence.DROPPING_INTERVAL),
+    (3, 5, cadence.DROPPING_INTERVAL),
+    (3, 3, cadence.BUSY_INTERVAL),
+    (5, 2, cadence.BUSY_INTERVAL),
+    (4, None, cadence.BUSY_INTERVAL),
+])
+def test_running_server(num_players, previous_players, delay):
+    assert cadence.next_check(NOW, 'running', num_players, previous_players,
+                              launched_at=NOW - 3600) == NOW + delay
+
+
+def test_idle_checks_are_more_frequent_than_busy_ones():
+    assert cadence.IDLE_INTERVAL <= cadence.DROPPING_INTERVAL < cadence.BUSY_INTERVAL
+
+
+class FakeSchedulerClient:
+    class exceptions:
+        class ResourceNotFoundException(Exception):
+            pass
+
+    def __init__(self):
+        self.schedules = {}
+
+    def create_schedule(self, **schedule):
+        self.schedules[schedule['Name']] = schedule
+
+    def update_schedule(self, **schedule):
+        if schedule['Name'] not in self.schedules:
+            raise self.exceptions.ResourceNotFoundException()
+        self.schedules[schedule['Name']] = schedule
+
+    def delete_schedule(self, Name):
+        if Name not in self.schedules:
+            raise self.exceptions.ResourceNotFoundException()
+        del self.schedules[Name]
+
+
+def test_eventbridge_schedule_is_moved_and_cancelled():
+    client = FakeSchedulerClient()
+    next_check = scheduler.EventBridgeScheduler(client, 'next-check', 'arn:function', 'arn:role')
+
+    # 2100-01-01 00:05 UTC
+    next_check.schedule(4102445100)
+    assert client.schedules['next-check']['ScheduleExpression'] == 'at(2100-01-01T00:05:00)'
+    assert client.schedules['next-check']['Target']['Arn'] == 'arn:function'
+
+    next_check.schedule(4102445100 + 600)
+    assert list(client.schedules) == ['next-check']
+    assert client.schedules['next-check']['ScheduleExpression'] == 'at(2100-01-01T00:15:00)'
+
+    next_check.cancel()
+    next_check.cancel()
+    assert client.schedules == {}
+
+
+def test_checks_are_never_scheduled_in_the_past():
+    client = FakeSchedulerClient()
+    scheduler.EventBridgeScheduler(client, 'next-check', 'arn:function', 'arn:role').schedule(0)
+    assert client.schedules['next-check']['ScheduleExpression'] > 'at(2000'
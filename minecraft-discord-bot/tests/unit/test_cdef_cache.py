@@ -0,0 +1,142 @@
+import collections
+import os
+
+import pytest
+
+from cffi import FFI
+from cffi import cparser
+
+CDEF = '''
+    typedef struct { int x; double y; } point_t;
+    int add(int, int);
+    point_t *make_point(int x);
+    #define ANSWER 42
+'''
+
+
+@pytest.fixture()
+def parses(monkeypatch):
+    '''Counts the cdefs that were actually parsed by pycparser, with an
+    empty in-memory cache and no cache directory.'''
+    monkeypatch.setattr(cparser, '_cdef_cache', collections.OrderedDict())
+    monkeypatch.delenv('CFFI_CDEF_CACHE_DIR', raising=False)
+    calls = []
+    internal_parse = cparser.Parser._internal_parse
+
+    def counting(self, csource):
+        calls.append(csource)
+        return internal_parse(self, csource)
+    monkeypatch.setattr(cparser.Parser, '_internal_parse', counting)
+    return calls
+
+
+def declarations(ffi):
+    return {name: str(tp) for name, (tp, quals) in ffi._parser._declarations.items()}
+
+
+def test_second_ffi_skips_the_parse(parses):
+    first = FFI()
+    first.cdef(CDEF)
+    second = FFI()
+    second.cdef(CDEF)
+    assert len(parses) == 1
+    assert declarations(second) == declarations(first)
+    assert second.sizeof('point_t') == first.sizeof('point_t')
+    # Each FFI gets its own model objects
+    assert second._parser._declarations['typedef point_t'][0] is not first._parser._declarations['typedef point_t'][0]
+
+
+def test_key_includes_earlier_cdefs_and_options(parses):
+    first = FFI()
+    first.cdef('typedef int handle_t;')
+    first.cdef('handle_t open_handle(void);')
+    second = FFI()
+    second.cdef('typedef long handle_t;')
+    second.cdef('handle_t open_handle(void);')
+    third = FFI()
+    third.cdef('typedef int handle_t;')
+    third.cdef('handle_t open_handle(void);', packed=True)
+    assert len(parses) == 5
+    assert declarations(second)['function open_handle'] != declarations(first)['function open_handle']
+
+
+def test_hit_keeps_the_identity_of_earlier_types(parses):
+    for _ in range(2):
+        ffi = FFI()
+        ffi.cdef('struct node { int value; };')
+        ffi.cdef('struct node *next_node(struct node *);')
+        function = ffi._parser._declarations['function next_node'][0]
+        assert function.result.totype is ffi._parser._declarations['struct node'][0]
+    assert len(parses) == 2
+
+
+def test_disk_cache_survives_the_memory_cache(parses, monkeypatch, tmp_path):
+    monkeypatch.setenv('CFFI_CDEF_CACHE_DIR', str(tmp_path))
+    FFI().cdef(CDEF)
+    assert len(list(tmp_path.glob('*.pickle'))) == 1
+
+    monkeypatch.setattr(cparser, '_cdef_cache', collections.OrderedDict())
+    ffi = FFI()
+    ffi.cdef(CDEF)
+    assert len(parses) == 1
+    assert ffi.sizeof('point_t') == FFI().sizeof('struct { int x; double y; }')
+
+
+def test_corrupted_disk_entry_is_reparsed(parses, monkeypatch, tmp_path):
+    monkeypatch.setenv('CFFI_CDEF_CACHE_DIR', str(tmp_path))
+    FFI().cdef(CDEF)
+    for entry in tmp_path.glob('*.pickle'):
+        entry.write_bytes(b'not a pickle')
+    monkeypatch.setattr(cparser, '_cdef_cache', collections.OrderedDict())
+    ffi = FFI()
+    ffi.cdef(CDEF)
+    assert len(parses) == 2
+    assert 'typedef point_t' in ffi._parser._declarations
+
+
+def test_include_stops_caching(parses):
+    base = FFI()
+    base.cdef('typedef int handle_t;')
+    for _ in range(2):
+        ffi = FFI()
+        ffi.include(base)
+        ffi.cdef('handle_t open_handle(void);')
+    assert len(parses) == 3
+
+
+def test_memory_cache_keeps_the_most_recently_used(parses, monkeypatch):
+    monkeypatch.setattr(cparser, '_CDEF_CACHE_SIZE', 2)
+    for source in ['int a(void);', 'int b(void);', 'int a(void);', 'int c(void);', 'int a(void);', 'int b(void);']:
+        FFI().cdef(source)
+    assert len(cparser._cdef_cache) == 2
+    assert parses == ['int a(void);', 'int b(void);', 'int c(void);', 'int b(void);']
+
+
+def test_key_includes_the_cffi_version(parses, monkeypatch):
+    import cffi
+    cparser.Parser().parse(CDEF)
+    # FFI() itself checks the version against the backend's
+    monkeypatch.setattr(cffi, '__version__', cffi.__version__ + '.post1')
+    cparser.Parser().parse(CDEF)
+    assert len(parses) == 2
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='needs POSIX permissions')
+def test_disk_cache_others_can_write_to_is_ignored(parses, monkeypatch, tmp_path):
+    monkeypatch.setenv('CFFI_CDEF_CACHE_DIR', str(tmp_path))
+    FFI().cdef(CDEF)
+    assert len(list(tmp_path.glob('*.pickle'))) == 1
+
+    tmp_path.chmod(0o777)
+    monkeypatch.setattr(cparser, '_cdef_cache', collections.OrderedDict())
+    FFI().cdef(CDEF)
+    assert len(parses) == 2
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='needs POSIX permissions')
+def test_disk_cache_directory_is_created_private(parses, monkeypatch, tmp_path):
+    cache_dir = tmp_path / 'cdefs'
+    monkeypatch.setenv('CFFI_CDEF_CACHE_DIR', str(cache_dir))
+    FFI().cdef(CDEF)
+    assert cache_dir.stat().st_mode & 0o077 == 0
+    assert len(list(cache_dir.glob('*.pickle'))) == 1
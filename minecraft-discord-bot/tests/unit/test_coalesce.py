@@ -0,0 +1,164 @@
+import threading
+
+import pytest
+
+from alex_bot import coalesce
+from alex_bot.state_store import DynamoStore, MemoryStore
+
+
+def test_first_caller_runs_operation(clock):
+    store = MemoryStore()
+    result = coalesce.run_once(store, 'k', lambda: {'n': 1}, ttl=60, wait=2,
+                               clock=clock, sleep=clock.sleep)
+    assert result == ({'n': 1}, False)
+
+
+def test_late_arrival_shares_result(clock):
+    store = MemoryStore()
+    calls = []
+    operation = lambda: calls.append(1) or len(calls)
+    coalesce.run_once(store, 'k', operation, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
+    clock.now += 30
+    result = coalesce.run_once(store, 'k', operation, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
+    assert result == (1, True)
+    assert calls == [1]
+
+
+def test_operation_runs_again_after_ttl(clock):
+    store = MemoryStore()
+    calls = []
+    operation = lambda: calls.append(1) or len(calls)
+    coalesce.run_once(store, 'k', operation, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
+    clock.now += 61
+    assert coalesce.run_once(store, 'k', operation, ttl=60, wait=2, clock=clock, sleep=clock.sleep) == (2, False)
+
+
+def test_waiter_gives_up_on_slow_operation(clock):
+    store = MemoryStore()
+    store.put_if_absent('k', {'status': coalesce.PENDING, 'owner': 'other', 'expires_at': clock.now + 60}, clock.now)
+    start = clock.now
+    result = coalesce.run_once(store, 'k', lambda: 1, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
+    assert result == (None, True)
+    assert clock.now >= start + 2
+
+
+def test_failure_releases_key(clock):
+    store = MemoryStore()
+
+    def fail():
+        raise RuntimeError('throttled')
+
+    with pytest.raises(RuntimeError):
+        coalesce.run_once(store, 'k', fail, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
+    assert coalesce.run_once(store, 'k', lambda: 2, ttl=60, wait=2, clock=clock, sleep=clock.sleep) == (2, False)
+
+
+def test_concurrent_callers_make_one_call():
+    store = MemoryStore()
+    calls = []
+    started = threading.Event()
+
+    def operation():
+        calls.append(1)
+        started.wait(1)
+        return 'pending'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        coalesce.run_once(store, 'k', operation, ttl=60, wait=5, poll_interval=0.01)))
+        for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert sorted(joined for _, joined in results) == [False] + [True] * 7
+    assert all(result == 'pending' for result, _ in results)
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+class FakeDynamoClient:
+    '''Records requests; fails conditional writes when told to.'''
+
+    class exceptions:
+        ConditionalCheckFailedException = ConditionalCheckFailedException
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.requests = []
+
+    def put_item(self, **kwargs):
+        self.requests.append(('put_item', kwargs))
+        if self.fail:
+            raise ConditionalCheckFailedException()
+
+    def update_item(self, **kwargs):
+        self.requests.append(('update_item', kwargs))
+        if self.fail:
+            raise ConditionalCheckFailedException()
+
+    def get_item(self, **kwargs):
+        return {'Item': {'pk': {'S': 'k'}, 'status': {'S': 'done'}, 'expires_at': {'N': '1060.5'}}}
+
+
+def test_dynamo_store_conditional_put():
+    client = FakeDynamoClient()
+    store = DynamoStore(client, 'table')
+    assert store.put_if_absent('k', {'status': 'pending', 'expires_at': 1060}, 1000)
+    _, request = client.requests[0]
+    assert request['Item'] == {'pk': {'S': 'k'}, 'status': {'S': 'pending'}, 'expires_at': {'N': '1060'}}
+    assert request['ExpressionAttributeValues'] == {':now': {'N': '1000'}}
+    client.fail = True
+    assert not store.put_if_absent('k', {'status': 'pending'}, 1000)
+
+
+def test_dynamo_store_update_and_get():
+    client = FakeDynamoClient()
+    store = DynamoStore(client, 'table')
+    assert store.update_if_owner('k', 'me', {'status': 'done'})
+    _, request = client.requests[0]
+    assert request['UpdateExpression'] == 'SET #f0 = :f0'
+    assert request['ExpressionAttributeNames'] == {'#owner': 'owner', '#f0': 'status'}
+    assert store.get('k') == {'status': 'done', 'expires_at': 1060.5}
+
+
+class FlakyStore(MemoryStore):
+    '''Fails the calls named in fail.'''
+
+    def __init__(self, *fail):
+        super().__init__()
+        self.fail = set(fail)
+
+    def __getattribute__(self, name):
+        if name in object.__getattribute__(self, 'fail'):
+            raise RuntimeError(f'{name} throttled')
+        return object.__getattribute__(self, name)
+
+
+def test_store_failure_before_the_operation_runs(clock):
+    calls = []
+    operation = lambda: calls.append(1)
+    with pytest.raises(coalesce.StoreError, match='throttled'):
+        coalesce.run_once(FlakyStore('put_if_absent'), 'k', operation, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
+
+    # While waiting on another invocation's run
+    store = FlakyStore('get')
+    store.put_if_absent('k', {'status': coalesce.PENDING, 'owner': 'other', 'expires_at': clock.now + 60}, clock.now)
+    with pytest.raises(coalesce.StoreError, match='throttled'):
+        coalesce.run_once(store, 'k', operation, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
+    assert calls == []
+
+
+def test_store_failure_after_the_operation_runs(clock):
+    store = FlakyStore('update_if_owner')
+    assert coalesce.run_once(store, 'k', lambda: 1, ttl=60, wait=2, clock=clock, sleep=clock.sleep) == (1, False)
+
+    def fail():
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError):
+        coalesce.run_once(FlakyStore('update_if_owner'), 'k', fail, ttl=60, wait=2, clock=clock, sleep=clock.sleep)
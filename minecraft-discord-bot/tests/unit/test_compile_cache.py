@@ -0,0 +1,105 @@
+import importlib.util
+import shutil
+
+import pytest
+
+import cffi
+from cffi import ffiplatform
+
+needs_compiler = pytest.mark.skipif(shutil.which('cc') is None, reason='needs a C compiler')
+
+
+@pytest.fixture()
+def builds(monkeypatch, tmp_path):
+    '''Counts the builds that ran the compiler, with the compile cache in a
+    fresh directory.'''
+    monkeypatch.setenv('CFFI_COMPILE_CACHE_DIR', str(tmp_path / 'cache'))
+    calls = []
+    build = ffiplatform._build
+
+    def counting(*args, **kwargs):
+        calls.append(args[1].name)
+        return build(*args, **kwargs)
+    monkeypatch.setattr(ffiplatform, '_build', counting)
+    return calls
+
+
+def extension(tmp_path, source='int f(void) { return 1; }', **kwargs):
+    path = tmp_path / 'module.c'
+    path.write_text(source)
+    return ffiplatform.get_extension(str(path), '_cache_test', **kwargs)
+
+
+def test_key_depends_on_source_settings_and_environment(tmp_path, monkeypatch):
+    monkeypatch.delenv('CFLAGS', raising=False)
+    filename, key = ffiplatform._compile_cache_key(extension(tmp_path), debug=False)
+    assert filename.startswith('_cache_test')
+    assert ffiplatform._compile_cache_key(extension(tmp_path), debug=False)[1] == key
+
+    assert ffiplatform._compile_cache_key(extension(tmp_path, 'int f(void) { return 2; }'), False)[1] != key
+    assert ffiplatform._compile_cache_key(extension(tmp_path, extra_compile_args=['-O0']), False)[1] != key
+    assert ffiplatform._compile_cache_key(extension(tmp_path), debug=True)[1] != key
+    monkeypatch.setenv('CFLAGS', '-DEXTRA')
+    assert ffiplatform._compile_cache_key(extension(tmp_path), False)[1] != key
+
+
+def test_key_covers_depends(tmp_path):
+    header = tmp_path / 'module.h'
+    header.write_text('#define VALUE 1\n')
+    ext = extension(tmp_path, depends=[str(header)])
+    key = ffiplatform._compile_cache_key(ext, False)[1]
+    header.write_text('#define VALUE 2\n')
+    assert ffiplatform._compile_cache_key(ext, False)[1] != key
+
+
+def test_install_and_store(tmp_path):
+    built = tmp_path / 'built.so'
+    built.write_bytes(b'module')
+    cached = str(tmp_path / 'cache' / 'key-built.so')
+    output = str(tmp_path / 'build' / 'sub' / 'built.so')
+    assert not ffiplatform._install_cached(cached, output)
+    (tmp_path / 'cache').mkdir()
+    ffiplatform._store_cached(str(built), cached)
+    assert ffiplatform._install_cached(cached, output)
+    with open(output, 'rb') as f:
+        assert f.read() == b'module'
+    assert [p.name for p in (tmp_path / 'cache').iterdir()] == ['key-built.so']
+
+
+def build(tmp_path, name, body):
+    ffi = cffi.FFI()
+    ffi.cdef('int triple(int);')
+    ffi.set_source(name, 'static int triple(int x) { return %s; }' % body)
+    return ffi.compile(tmpdir=str(tmp_path))
+
+
+def load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@needs_compiler
+def test_second_build_comes_from_the_cache(builds, tmp_path):
+    first = build(tmp_path / 'a', '_cache_test_triple', 'x * 3')
+    second = build(tmp_path / 'b', '_cache_test_triple', 'x * 3')
+    assert builds == ['_cache_test_triple']
+    assert first != second
+    assert load(second, '_cache_test_triple').lib.triple(5) == 15
+
+
+@needs_compiler
+def test_changed_source_is_compiled(builds, tmp_path):
+    build(tmp_path / 'a', '_cache_test_changed', 'x * 3')
+    path = build(tmp_path / 'b', '_cache_test_changed', 'x + x + x + 1')
+    assert builds == ['_cache_test_changed'] * 2
+    assert load(path, '_cache_test_changed').lib.triple(5) == 16
+
+
+@needs_compiler
+def test_without_a_cache_dir_every_build_compiles(builds, tmp_path, monkeypatch):
+    monkeypatch.delenv('CFFI_COMPILE_CACHE_DIR')
+    build(tmp_path / 'a', '_cache_test_uncached', 'x * 3')
+    build(tmp_path / 'b', '_cache_test_uncached', 'x * 3')
+    assert builds == ['_cache_test_uncached'] * 2
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from pycparser.ply import cpp, lex
+
+
+@pytest.fixture(scope='module')
+def lexer():
+    return lex.lex(module=cpp)
+
+
+def preprocess(lexer, root, text, cached=True, p=None):
+    if p is None:
+        p = cpp.Preprocessor(lexer)
+        p.add_path(str(root))
+        if not cached:
+            p.include_cache = None
+            p.memoize_macros = False
+    p.parse(text, str(root / 'main.c'))
+    return ''.join(tok.value for tok in iter(p.token, None) if tok.type not in p.t_WS), p
+
+
+TEXT = '''
+#include "base.h"
+int a = SIZE;
+#include "base.h"
+#undef WORD
+#define WORD 8
+int b = SIZE;
+#include "base.h"
+int c = SIZE + STRLEN("x");
+'''
+
+
+@pytest.fixture()
+def root(tmp_path):
+    (tmp_path / 'base.h').write_text(
+        '#define WORD 4\n'
+        '#define SIZE (WORD * COUNT)\n'
+        '#define COUNT 2\n'
+        '#define STRLEN(s) (sizeof(s) - 1)\n'
+        'int from_base = SIZE;\n')
+    return tmp_path
+
+
+def test_caches_give_the_same_output(lexer, root):
+    cached, p = preprocess(lexer, root, TEXT)
+    uncached, _ = preprocess(lexer, root, TEXT, cached=False)
+    assert cached == uncached
+    assert 'inta=(4*2);' in cached
+    # The redefinition of WORD is seen through the memoized SIZE
+    assert 'intb=(8*2);' in cached
+    # base.h redefines WORD again
+    assert 'intc=(4*2)+(sizeof("x")-1);' in cached
+    assert list(p.include_cache) == [os.path.join(str(root), 'base.h')]
+
+
+def test_expansions_are_memoized(lexer, root):
+    _, p = preprocess(lexer, root, TEXT)
+    assert p.macros['SIZE'].expansion is not None
+    # Function-like macros are not memoized
+    assert p.macros['STRLEN'].expansion is None
+
+
+def test_changed_file_is_read_again(lexer, root):
+    first, p = preprocess(lexer, root, '#include "base.h"\nint x = COUNT;\n')
+    (root / 'base.h').write_text('#define COUNT 300\n')
+    second, _ = preprocess(lexer, root, '#include "base.h"\nint x = COUNT;\n', p=p)
+    assert 'intx=2;' in first
+    assert second.endswith('intx=300;')
+
+
+def test_cached_tokens_are_not_modified_by_expansion(lexer, root):
+    p = cpp.Preprocessor(lexer)
+    p.add_path(str(root))
+    outputs = [preprocess(lexer, root, '#include "base.h"\n', p=p)[0] for _ in range(3)]
+    assert outputs[0] == outputs[1] == outputs[2] == 'intfrom_base=(4*2);'
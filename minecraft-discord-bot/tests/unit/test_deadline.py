@@ -0,0 +1,49 @@
+import pytest
+
+from stopper.deadline import Deadline, DeadlineExceeded, SAFETY_MARGIN
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def test_from_context_keeps_a_safety_margin():
+    deadline = Deadline.from_context(FakeContext(30000))
+    assert 30 - SAFETY_MARGIN - 0.5 < deadline.remaining() <= 30 - SAFETY_MARGIN
+    assert 10 - 3 - 0.5 < Deadline.from_context(None, default=10, margin=3).remaining() <= 7
+
+
+def test_timeouts_are_shares_of_what_is_left(clock):
+    deadline = Deadline(20, clock)
+    assert deadline.timeout() == 20
+    assert deadline.timeout(share=0.25) == 5
+    assert deadline.timeout(maximum=3, share=0.5) == 3
+
+    clock.now += 16
+    assert deadline.remaining() == 4
+    assert deadline.timeout(maximum=8, share=0.5) == 2
+
+
+def test_no_stage_starts_after_the_deadline(clock):
+    deadline = Deadline(1, clock)
+    clock.now += 1
+    assert deadline.remaining() == 0
+    with pytest.raises(DeadlineExceeded, match='querying the server'):
+        deadline.timeout(stage='querying the server')
+
+
+def test_boto_config_fits_all_attempts_in_the_timeout(clock):
+    deadline = Deadline(24, clock)
+
+    config = deadline.boto_config(maximum=8)
+    assert config.retries['total_max_attempts'] == 2
+    assert config.connect_timeout + config.read_timeout == 4
+
+    clock.now += 21
+    config = deadline.boto_config()
+    assert config.retries['total_max_attempts'] == 1
+    assert config.connect_timeout + config.read_timeout == 3
@@ -0,0 +1,61 @@
+import warnings
+
+import pytest
+
+from cffi import FFI, CDefError, VerificationMissing
+
+LIBC = '''
+int abs(int);
+long labs(long);
+#define ANSWER 42
+enum color { RED, GREEN = 5 };
+'''
+
+
+@pytest.fixture()
+def ffi():
+    ffi = FFI()
+    ffi.cdef(LIBC)
+    return ffi
+
+
+def test_preload_resolves_everything_up_front(ffi):
+    lib = ffi.dlopen(None, preload=True)
+    assert {'abs', 'labs', 'ANSWER', 'GREEN'} <= set(lib.__dict__)
+    assert lib.abs(-3) == 3
+    assert (lib.ANSWER, lib.RED, lib.GREEN) == (42, 0, 5)
+
+
+def test_lazy_and_preloaded_libraries_agree(ffi):
+    lazy = ffi.dlopen(None)
+    preloaded = ffi.dlopen(None, preload=True)
+    assert sorted(dir(lazy)) == sorted(dir(preloaded))
+    assert lazy.labs(-7) == preloaded.labs(-7) == 7
+
+
+def test_names_declared_after_dlopen_are_found(ffi):
+    lib = ffi.dlopen(None)
+    assert lib.abs(-1) == 1
+    ffi.cdef('int atoi(const char *);')
+    assert lib.atoi(b'12') == 12
+    assert 'atoi' in dir(lib)
+
+
+def test_unresolvable_names_are_skipped_by_preload(ffi):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        ffi.cdef('''
+            int no_such_function_for_cffi_tests(int);
+            int arr[...];
+            enum partial { P1 = 1, P2 = ... };
+        ''')
+    lib = ffi.dlopen(None, preload=True)
+    assert lib.abs(-2) == 2
+    # They fail on access as with a lazily loaded library
+    with pytest.raises(AttributeError):
+        lib.no_such_function_for_cffi_tests
+    with pytest.raises(CDefError):
+        lib.arr
+    with pytest.raises(VerificationMissing):
+        lib.P2
+    assert lib in ffi._libraries
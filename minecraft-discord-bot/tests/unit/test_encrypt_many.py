@@ -0,0 +1,137 @@
+import array
+import os
+
+import pytest
+
+import nacl.exceptions
+import nacl.utils
+from nacl.secret import Aead, SecretBox
+from nacl.utils import CounterNonces, PooledRandomNonces
+
+BOXES = [SecretBox, Aead]
+MESSAGES = [b'', b'x', b'hello world', nacl.utils.random(1000)]
+
+
+@pytest.mark.parametrize('box_class', BOXES)
+@pytest.mark.parametrize('nonces', ['random', 'counter'])
+def test_round_trip(box_class, nonces):
+    box = box_class(nacl.utils.random(box_class.KEY_SIZE))
+    records = box.encrypt_many(MESSAGES, nonces=nonces)
+    assert [box.decrypt(bytes(record)) for record in records] == MESSAGES
+    assert len({bytes(record[:box.NONCE_SIZE]) for record in records}) == len(MESSAGES)
+
+
+@pytest.mark.parametrize('box_class', BOXES)
+@pytest.mark.parametrize('wrap', [bytearray, memoryview, lambda m: memoryview(bytearray(m))])
+def test_accepts_buffers(box_class, wrap):
+    box = box_class(nacl.utils.random(box_class.KEY_SIZE))
+    records = box.encrypt_many([wrap(message) for message in MESSAGES])
+    assert [box.decrypt(bytes(record)) for record in records] == MESSAGES
+
+
+@pytest.mark.parametrize('box_class', BOXES)
+def test_buffers_are_sized_in_bytes(box_class):
+    box = box_class(nacl.utils.random(box_class.KEY_SIZE))
+    message = array.array('I', [1, 2, 3])
+    record, = box.encrypt_many([memoryview(message)])
+    assert box.decrypt(bytes(record)) == message.tobytes()
+
+
+@pytest.mark.parametrize('box_class', BOXES)
+def test_out_buffer(box_class):
+    box = box_class(nacl.utils.random(box_class.KEY_SIZE))
+    size = sum(map(len, MESSAGES)) + len(MESSAGES) * (box.NONCE_SIZE + box.MACBYTES)
+    out = bytearray(size)
+    records = box.encrypt_many(MESSAGES, out=out)
+    assert all(record.obj is out for record in records)
+    assert [box.decrypt(bytes(record)) for record in records] == MESSAGES
+
+    with pytest.raises(nacl.exceptions.ValueError):
+        box.encrypt_many(MESSAGES, out=bytearray(size - 1))
+
+
+def test_nonce_source_must_fit_the_box():
+    box = Aead(nacl.utils.random(Aead.KEY_SIZE))
+    with pytest.raises(nacl.exceptions.ValueError):
+        box.encrypt_many(MESSAGES, nonces=CounterNonces(12))
+    with pytest.raises(nacl.exceptions.ValueError):
+        box.encrypt_many(MESSAGES, nonces='sequential')
+
+
+def test_counter_nonces():
+    nonces = CounterNonces(12, prefix=b'pref', start=255)
+    taken = nonces.take(2)
+    assert taken == b'pref' + (255).to_bytes(8, 'little') + b'pref' + (256).to_bytes(8, 'little')
+
+    exhausted = CounterNonces(8, start=2**64 - 1)
+    exhausted.take(1)
+    with pytest.raises(nacl.exceptions.ValueError):
+        exhausted.take(1)
+
+
+def in_child(function):
+    '''Forks, runs function in the child and returns what it returned, or
+    the name of the exception it raised.'''
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            os.close(read)
+            try:
+                result = function()
+            except Exception as e:
+                result = type(e).__name__.encode()
+            os.write(write, result)
+        except BaseException:
+            status = 1
+        finally:
+            os._exit(status)
+    os.close(write)
+    with os.fdopen(read, 'rb') as pipe:
+        result = pipe.read()
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    return result
+
+
+def split(nonces, size):
+    return {nonces[i:i + size] for i in range(0, len(nonces), size)}
+
+
+fork_only = pytest.mark.skipif(not hasattr(os, 'register_at_fork'), reason='needs os.fork')
+
+
+@fork_only
+@pytest.mark.parametrize('generator', [
+    lambda: CounterNonces(24),
+    lambda: PooledRandomNonces(24, pool_size=64),
+])
+def test_forked_child_does_not_repeat_nonces(generator):
+    nonces = generator()
+    nonces.take(1)
+    child = in_child(lambda: nonces.take(32))
+    parent = nonces.take(32)
+    assert len(child) == len(parent) == 32 * 24
+    assert not split(child, 24) & split(parent, 24)
+
+
+@fork_only
+@pytest.mark.parametrize('nonces', ['random', 'counter'])
+def test_forked_child_does_not_repeat_encrypt_many_nonces(nonces):
+    box = Aead(nacl.utils.random(Aead.KEY_SIZE))
+    box.encrypt_many(MESSAGES, nonces=nonces)
+
+    def nonces_of(records):
+        return b''.join(bytes(record[:box.NONCE_SIZE]) for record in records)
+
+    child = in_child(lambda: nonces_of(box.encrypt_many(MESSAGES, nonces=nonces)))
+    parent = nonces_of(box.encrypt_many(MESSAGES, nonces=nonces))
+    assert not split(child, box.NONCE_SIZE) & split(parent, box.NONCE_SIZE)
+
+
+@fork_only
+def test_fixed_prefix_counter_refuses_to_run_in_a_forked_child():
+    nonces = CounterNonces(24, prefix=bytes(16))
+    assert in_child(lambda: nonces.take(1)) == b'RuntimeError'
+    assert len(nonces.take(1)) == 24
@@ -0,0 +1,153 @@
+from stopper import flush
+from stopper.deadline import Deadline
+
+HOST = '203.0.113.7'
+PORT = 25575
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+
+class FakeServer:
+    '''The Minecraft server behind the fake RCON clients: takes save_seconds
+    to save, exits exit_seconds after stop, and drops idle connections
+    when drop_idle is set.'''
+
+    def __init__(self, clock, save_seconds=1.0, exit_seconds=2.0, reachable=True):
+        self.clock = clock
+        self.save_seconds = save_seconds
+        self.exit_seconds = exit_seconds
+        self.reachable = reachable
+        self.drop_idle = False
+        self.exits_at = None
+        self.commands = []
+        self.logins = 0
+
+    def is_open(self, host, port, timeout):
+        return self.reachable and (self.exits_at is None or self.clock() < self.exits_at)
+
+
+class FakeRconClient:
+    '''Stands in for mcipc.rcon.je.Client.'''
+
+    def __init__(self, server, host, port, timeout=None, passwd=None):
+        self.server = server
+        self.passwd = passwd
+        self.timeout = timeout
+        self.connected = False
+
+    def connect(self, login=False):
+        if not self.server.reachable:
+            raise ConnectionRefusedError('connection refused')
+        self.connected = True
+        self.server.logins += 1
+
+    def close(self):
+        self.connected = False
+
+    def _command(self, name):
+        if self.server.drop_idle:
+            self.server.drop_idle = False
+            raise ConnectionResetError('connection reset')
+        self.server.commands.append(name)
+
+    def save_all(self, flush=False):
+        self._command(('save-all', flush))
+        self.server.clock.now += self.server.save_seconds
+        return 'Saved the game'
+
+    def stop(self):
+        self._command('stop')
+        self.server.exits_at = self.server.clock() + self.server.exit_seconds
+        return 'Stopping the server'
+
+
+def setup(clock, **kwargs):
+    server = FakeServer(clock, **kwargs)
+    pool = flush.RconPool(lambda *args, **kw: FakeRconClient(server, *args, **kw))
+    return server, pool
+
+
+def pre_stop(clock, server, pool, password='secret', shutdown=True, seconds=50):
+    return flush.pre_stop(pool, HOST, PORT, password, Deadline(seconds, clock), shutdown,
+                          is_open=server.is_open, clock=clock, sleep=clock.sleep)
+
+
+def test_saves_then_stops_and_waits_for_the_server_to_exit(clock):
+    server, pool = setup(clock)
+    result = pre_stop(clock, server, pool)
+    assert result['outcome'] == flush.FLUSHED
+    assert server.commands == [('save-all', True), 'stop']
+    assert result['phases'][flush.SAVE] == 1.0
+    assert 2.0 <= result['phases'][flush.SHUTDOWN] < 2.0 + 2 * flush.EXIT_POLL_INTERVAL
+    assert not server.is_open(HOST, PORT, 1)
+
+
+def test_only_saves_when_hibernating(clock):
+    server, pool = setup(clock)
+    result = pre_stop(clock, server, pool, shutdown=False)
+    assert result['outcome'] == flush.SAVED
+    assert server.commands == [('save-all', True)]
+    assert flush.SHUTDOWN not in result['phases']
+
+
+def test_skipped_without_a_password(clock):
+    server, pool = setup(clock)
+    assert pre_stop(clock, server, pool, password=None) == {'outcome': flush.SKIPPED, 'phases': {}}
+    assert server.logins == 0
+
+
+def test_unreachable_server_fails_without_raising(clock):
+    server, pool = setup(clock, reachable=False)
+    result = pre_stop(clock, server, pool)
+    assert result['outcome'] == flush.FAILED
+    assert 'refused' in result['error']
+    assert server.commands == []
+
+
+def test_server_that_does_not_exit_in_time(clock):
+    server, pool = setup(clock, exit_seconds=60)
+    result = pre_stop(clock, server, pool)
+    assert result['outcome'] == flush.SAVED
+    assert 'did not exit' in result['error']
+    # Bounded by the phase's share of the deadline, not the server
+    assert result['phases'][flush.SHUTDOWN] <= flush.SHUTDOWN_TIMEOUT + flush.EXIT_POLL_INTERVAL
+
+
+def test_phase_timeouts_come_from_the_deadline(clock):
+    server, pool = setup(clock)
+    timeouts = []
+    pool.client_factory = lambda *args, **kw: timeouts.append(kw['timeout']) or FakeRconClient(server, *args, **kw)
+    pre_stop(clock, server, pool, shutdown=False, seconds=10)
+    assert timeouts == [10 * flush.PHASE_SHARE]
+
+    # Without time left the save isn't attempted
+    server, pool = setup(clock)
+    result = pre_stop(clock, server, pool, seconds=0)
+    assert result['outcome'] == flush.FAILED
+    assert server.commands == []
+
+
+def test_pool_reuses_and_replaces_connections(clock):
+    server, pool = setup(clock)
+    first, fresh = pool.get(HOST, PORT, 'secret', 5)
+    assert fresh
+    assert pool.get(HOST, PORT, 'secret', 3) == (first, False)
+    assert first.timeout == 3
+    assert server.logins == 1
+
+    # A pooled connection the server dropped is replaced once
+    server.drop_idle = True
+    pool.run(HOST, PORT, 'secret', 5, lambda client: client.save_all(flush=True))
+    assert server.logins == 2
+    assert not first.connected
+    assert server.commands == [('save-all', True)]
+
+
+def test_metric_log():
+    result = {'outcome': flush.FLUSHED, 'phases': {flush.SAVE: 1.23456, flush.SHUTDOWN: 4.0, 'ec2_stop': 0.5}}
+    log = flush.metric_log(INSTANCE_ID, result, 1700000000.0)
+    assert log['stop_save'] == 1.235
+    assert log['stop_ec2_stop'] == 0.5
+    assert log['stop_outcome'] == flush.FLUSHED
+    metrics = log['_aws']['CloudWatchMetrics'][0]
+    assert {m['Name'] for m in metrics['Metrics']} == {'stop_save', 'stop_shutdown', 'stop_ec2_stop'}
+    assert metrics['Dimensions'] == [['stop_outcome']]
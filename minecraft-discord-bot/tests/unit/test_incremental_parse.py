@@ -0,0 +1,98 @@
+import pytest
+
+from pycparser import c_parser
+from pycparser.plyparser import ParseError
+
+HEADER = '''
+typedef unsigned long size_t;
+typedef struct node { int value; struct node *next; } node_t;
+enum color { RED, GREEN = 3 };
+int count(node_t *head);
+'''
+
+BODY = '''
+int count(node_t *head) {
+    size_t n = 0;
+    for (node_t *p = head; p; p = p->next)
+        n++;
+    return n;
+}
+'''
+
+
+def dump(ast):
+    '''The AST with the coordinates of every node.'''
+    lines = []
+
+    def visit(node):
+        lines.append(f'{type(node).__name__} {node.coord}')
+        for _, child in node.children():
+            visit(child)
+    visit(ast)
+    return repr(ast), lines
+
+
+def full_parse(text, filename='x.c'):
+    return c_parser.CParser().parse(text, filename)
+
+
+@pytest.mark.parametrize('text', [HEADER, HEADER + BODY, 'int x;\n\n    long y = 2;'])
+def test_matches_a_full_parse(text):
+    parser = c_parser.CParser(incremental=True)
+    assert dump(parser.parse(text, 'x.c')) == dump(full_parse(text))
+    # And again from the cache
+    assert dump(parser.parse(text, 'x.c')) == dump(full_parse(text))
+
+
+def test_reuses_a_shared_prefix(monkeypatch):
+    parser = c_parser.CParser(incremental=True)
+    parser.parse(HEADER + BODY, 'x.c')
+    parsed = []
+    parse_pieces = parser._parse_external_declarations
+    monkeypatch.setattr(parser, '_parse_external_declarations',
+                        lambda text, *args: parsed.append(text.strip()) or parse_pieces(text, *args))
+    edited = HEADER + BODY.replace('n++', 'n += 2')
+    assert dump(parser.parse(edited, 'x.c')) == dump(full_parse(edited))
+    # Only the edited function, and the whitespace after it, were parsed
+    # again
+    assert parsed == [BODY.replace('n++', 'n += 2').strip(), '']
+
+
+def test_typedef_names_of_the_cached_prefix_are_restored():
+    parser = c_parser.CParser(incremental=True)
+    parser.parse(HEADER, 'x.c')
+    ast = parser.parse(HEADER + 'node_t *first;\n', 'x.c')
+    assert type(ast.ext[-1].type.type.type).__name__ == 'IdentifierType'
+
+
+def test_syntax_errors_are_reported_as_by_a_full_parse():
+    parser = c_parser.CParser(incremental=True)
+    with pytest.raises(ParseError) as incremental:
+        parser.parse(HEADER + 'int broken(;\n', 'x.c')
+    with pytest.raises(ParseError) as full:
+        full_parse(HEADER + 'int broken(;\n')
+    assert str(incremental.value) == str(full.value)
+
+
+def test_cache_is_bounded():
+    parser = c_parser.CParser(incremental=True, incremental_cache_size=8)
+    for version in range(20):
+        text = HEADER + f'int v{version} = {version};\n'
+        assert dump(parser.parse(text, 'x.c')) == dump(full_parse(text))
+    assert len(parser._decl_cache) == 8
+    # The header is used by every parse, so it is what stays cached
+    parser.parse(HEADER, 'x.c')
+    assert len(parser._decl_cache) == 8
+
+
+def test_least_recently_used_declarations_are_evicted():
+    parser = c_parser.CParser(incremental=True, incremental_cache_size=3)
+    parser.parse('int a;\nint b;\nint c;', 'x.c')
+    first, second, _ = parser._decl_cache
+    parser.parse('int a;', 'x.c')
+    parser.parse('int z;', 'x.c')
+    assert first in parser._decl_cache
+    assert second not in parser._decl_cache
+    assert len(parser._decl_cache) == 3
+    parser.clear_cache()
+    assert len(parser._decl_cache) == 0
@@ -0,0 +1,129 @@
+from alex_bot import state_store
+from stopper import occupancy
+
+# Monday 2024-01-01 00:00 UTC
+MONDAY = 1704067200
+HOUR = 60 * 60
+WEEK = 7 * 24 * HOUR
+
+
+def test_hour_of_week():
+    assert occupancy.hour_of_week(MONDAY) == 0
+    assert occupancy.hour_of_week(MONDAY + 19 * HOUR + 59 * 60) == 19
+    assert occupancy.hour_of_week(MONDAY + 6 * 24 * HOUR + 23 * HOUR) == occupancy.HOURS_PER_WEEK - 1
+    assert occupancy.hour_of_week(MONDAY + WEEK) == 0
+
+
+def test_learns_a_weekly_session():
+    histogram = occupancy.OccupancyHistogram()
+    evening = MONDAY + 19 * HOUR
+    for week in range(3):
+        histogram.record(evening + week * WEEK, 2)
+        histogram.record(evening + week * WEEK + 1800, 1)
+        histogram.record(evening + week * WEEK + HOUR, 0)
+        histogram.record(evening + week * WEEK + HOUR + 1800, 0)
+    assert histogram.occupancy(evening) == 1.0
+    assert histogram.busy(evening)
+    assert histogram.occupancy(evening + HOUR) == 0.0
+    assert not histogram.busy(evening + HOUR)
+    assert not histogram.busy(evening + 24 * HOUR)
+
+
+def test_one_sample_is_not_a_pattern():
+    histogram = occupancy.OccupancyHistogram()
+    histogram.record(MONDAY, 3)
+    assert histogram.occupancy(MONDAY) == 1.0
+    assert not histogram.busy(MONDAY)
+
+
+def test_recent_weeks_count_most():
+    histogram = occupancy.OccupancyHistogram()
+    for week in range(10):
+        histogram.record(MONDAY + week * WEEK, 1)
+    for week in range(10, 20):
+        histogram.record(MONDAY + week * WEEK, 0)
+    assert histogram.occupancy(MONDAY) < 0.3
+    assert not histogram.busy(MONDAY)
+
+
+def test_prewarm_and_hold_look_ahead():
+    histogram = occupancy.OccupancyHistogram()
+    evening = MONDAY + 19 * HOUR
+    for week in range(3):
+        histogram.record(evening + week * WEEK, 1)
+    now = evening - occupancy.LOOKAHEAD
+    assert histogram.should_prewarm(now)
+    assert not histogram.should_prewarm(now - HOUR)
+    assert histogram.should_hold(now)
+    assert histogram.should_hold(evening + 1800)
+    assert not histogram.should_hold(evening + 2 * HOUR)
+
+
+def test_round_trip_through_the_store():
+    store = state_store.MemoryStore()
+    assert occupancy.load_histogram(store, 'i-1').samples == [0.0] * occupancy.HOURS_PER_WEEK
+
+    histogram = occupancy.OccupancyHistogram()
+    histogram.record(MONDAY + 19 * HOUR, 1)
+    histogram.record(MONDAY + 19 * HOUR + WEEK, 0)
+    occupancy.save_histogram(store, 'i-1', histogram)
+
+    loaded = occupancy.load_histogram(store, 'i-1')
+    assert loaded.samples[19] == 1.8
+    assert loaded.occupied[19] == 0.8
+    assert len(store.get('occupancy#i-1')['histogram']) < 2048
+
+    # A later run in the same hour still counts once
+    loaded.record(MONDAY + 19 * HOUR + WEEK + 600, 2)
+    assert loaded.samples[19] == 1.8
+    assert loaded.occupied[19] == 1.8
+
+
+def test_loads_histograms_saved_without_the_latest_hour():
+    histogram = occupancy.OccupancyHistogram.decode('[[1.0,0.0],[0.5,0.0]]')
+    assert histogram.occupied[0] == 0.5
+    assert histogram.last_hour is None
+
+
+def test_each_hour_counts_once_however_often_it_was_checked():
+    histogram = occupancy.OccupancyHistogram()
+    evening = MONDAY + 19 * HOUR
+    for week in range(3):
+        # Held idle through 19:00, checked every five minutes, and busy
+        # from 20:00, checked every quarter hour
+        for minute in range(0, 60, 5):
+            histogram.record(evening + week * WEEK + minute * 60, 0)
+        for minute in range(0, 60, 15):
+            histogram.record(evening + week * WEEK + HOUR + minute * 60, 3)
+    assert histogram.samples[19] == histogram.samples[20] == 1 + occupancy.DECAY + occupancy.DECAY ** 2
+    assert histogram.occupancy(evening) == 0.0
+    assert histogram.occupancy(evening + HOUR) == 1.0
+
+    # Players turning up late in an hour make it occupied
+    histogram.record(evening + 3 * WEEK, 0)
+    histogram.record(evening + 3 * WEEK + 50 * 60, 1)
+    assert 0.0 < histogram.occupancy(evening) < occupancy.BUSY_THRESHOLD
+
+
+def test_a_pattern_takes_two_weeks():
+    histogram = occupancy.OccupancyHistogram()
+    evening = MONDAY + 19 * HOUR
+    histogram.record(evening, 2)
+    histogram.record(evening + 1800, 2)
+    assert not histogram.busy(evening)
+    histogram.record(evening + WEEK, 2)
+    assert histogram.busy(evening)
+
+
+def test_next_prewarm():
+    histogram = occupancy.OccupancyHistogram()
+    assert histogram.next_prewarm(MONDAY) is None
+
+    evening = MONDAY + 19 * HOUR
+    for week in range(3):
+        histogram.record(evening + week * WEEK, 1)
+    assert histogram.next_prewarm(MONDAY) == evening - occupancy.LOOKAHEAD
+    assert histogram.should_prewarm(histogram.next_prewarm(MONDAY))
+    assert histogram.next_prewarm(evening - 600) == evening - 600
+    # Past this week's session, the next is a week away
+    assert histogram.next_prewarm(evening + HOUR) == evening + WEEK - occupancy.LOOKAHEAD
@@ -0,0 +1,42 @@
+import pytest
+
+import pycparser
+from pycparser.plyparser import ParseError
+
+
+@pytest.fixture()
+def headers(tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f'h{i}.h'
+        path.write_text(f'typedef struct s{i} {{ int a; }} t{i};\n'
+                        f'int f{i}(t{i} *self, int n);\n')
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_matches_parse_file_in_order(headers, workers):
+    asts = pycparser.parse_files(headers, workers=workers)
+    assert [repr(ast) for ast in asts] == [repr(pycparser.parse_file(path)) for path in headers]
+    assert [ast.ext[1].name for ast in asts] == [f'f{i}' for i in range(6)]
+
+
+def test_each_file_has_its_own_typedefs(headers, tmp_path):
+    # t0 is a typedef only in h0.h, so it is an ordinary identifier here
+    other = tmp_path / 'other.h'
+    other.write_text('int t0;\n')
+    asts = pycparser.parse_files(headers[:1] + [str(other)], workers=1)
+    assert asts[1].ext[0].name == 't0'
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parse_errors_are_raised(headers, tmp_path, workers):
+    broken = tmp_path / 'broken.h'
+    broken.write_text('int broken(;\n')
+    with pytest.raises(ParseError, match='broken.h'):
+        pycparser.parse_files(headers + [str(broken)], workers=workers)
+
+
+def test_no_files():
+    assert pycparser.parse_files([]) == []
@@ -0,0 +1,84 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from alex_bot import state_store
+from stopper import power
+
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+
+class FakeEC2:
+    '''Stands in for an EC2 client: tracks one instance, which can be
+    hibernated if launched with hibernation configured and ready for it.'''
+
+    def __init__(self, configured=True, ready=True):
+        self.configured = configured
+        self.ready = ready
+        self.state = 'running'
+        self.hibernated = False
+        self.calls = []
+
+    def describe_instances(self, InstanceIds):
+        return {'Reservations': [{'Instances': [{
+            'InstanceId': InstanceIds[0],
+            'State': {'Name': self.state},
+            'HibernationOptions': {'Configured': self.configured},
+        }]}]}
+
+    def stop_instances(self, InstanceIds, Hibernate=False):
+        self.calls.append(('stop', Hibernate))
+        if Hibernate and not (self.configured and self.ready):
+            raise ClientError({'Error': {'Code': 'UnsupportedHibernationConfiguration',
+                                         'Message': 'not ready for hibernation'}}, 'StopInstances')
+        previous, self.state = self.state, 'stopping'
+        self.hibernated = Hibernate
+        return {'StoppingInstances': [{'InstanceId': InstanceIds[0],
+                                       'CurrentState': {'Name': self.state},
+                                       'PreviousState': {'Name': previous}}]}
+
+    def start_instances(self, InstanceIds):
+        self.calls.append(('start',))
+        previous, self.state = self.state, 'pending'
+        return {'StartingInstances': [{'InstanceId': InstanceIds[0],
+                                       'CurrentState': {'Name': self.state},
+                                       'PreviousState': {'Name': previous}}]}
+
+
+def instance(ec2):
+    return ec2.describe_instances(InstanceIds=[INSTANCE_ID])['Reservations'][0]['Instances'][0]
+
+
+@pytest.mark.parametrize('configured', [True, False])
+def test_hibernation_configured(configured):
+    assert power.hibernation_configured(instance(FakeEC2(configured))) is configured
+    assert not power.hibernation_configured({'State': {'Name': 'running'}})
+
+
+def test_hibernates_and_resumes():
+    ec2 = FakeEC2()
+    assert power.stop(ec2, INSTANCE_ID, hibernate=True) == ('stopping', power.HIBERNATE)
+    assert ec2.hibernated
+    ec2.state = 'stopped'
+    # StartInstances resumes a hibernated instance
+    ec2.start_instances(InstanceIds=[INSTANCE_ID])
+    assert ec2.calls == [('stop', True), ('start',)]
+
+
+def test_plain_stop():
+    ec2 = FakeEC2()
+    assert power.stop(ec2, INSTANCE_ID, hibernate=False) == ('stopping', power.STOP)
+    assert ec2.calls == [('stop', False)]
+
+
+def test_falls_back_to_a_plain_stop_when_hibernation_is_refused():
+    ec2 = FakeEC2(ready=False)
+    assert power.stop(ec2, INSTANCE_ID, hibernate=True) == ('stopping', power.STOP)
+    assert ec2.calls == [('stop', True), ('stop', False)]
+    assert not ec2.hibernated
+
+
+def test_stop_mode_round_trip():
+    store = state_store.MemoryStore()
+    assert state_store.load_stop_mode(store, INSTANCE_ID) is None
+    state_store.save_stop_mode(store, INSTANCE_ID, power.HIBERNATE, 1700000000.0)
+    assert state_store.load_stop_mode(store, INSTANCE_ID) == power.HIBERNATE
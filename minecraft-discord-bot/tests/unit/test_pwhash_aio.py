@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import nacl.exceptions
+from nacl.pwhash import aio, argon2id, scrypt
+
+OPS = argon2id.OPSLIMIT_MIN
+MEM = argon2id.MEMLIMIT_MIN
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_str_and_verify():
+    with aio.PwhashExecutor(max_workers=2, memlimit=MEM) as hasher:
+        hashed = run(hasher.str(b'hunter2', OPS, MEM))
+        assert hashed.startswith(argon2id.STRPREFIX)
+        assert run(hasher.verify(hashed, b'hunter2'))
+        with pytest.raises(nacl.exceptions.InvalidkeyError):
+            run(hasher.verify(hashed, b'wrong'))
+        assert hasher.memory_in_use == 0
+
+
+def test_kdf_matches_the_blocking_call():
+    salt = b'\x01' * argon2id.SALTBYTES
+    with aio.PwhashExecutor(max_workers=1, memlimit=MEM) as hasher:
+        key = run(hasher.kdf(32, b'hunter2', salt, OPS, MEM))
+    assert key == argon2id.kdf(32, b'hunter2', salt, OPS, MEM)
+
+
+def test_hash_memlimit_reads_the_stored_parameters():
+    assert aio.hash_memlimit(argon2id.str(b'x', OPS, MEM), 1) == MEM
+    scrypt_hash = scrypt.str(b'x', scrypt.OPSLIMIT_MIN, scrypt.MEMLIMIT_MIN)
+    assert 0 < aio.hash_memlimit(scrypt_hash, 1) <= scrypt.MEMLIMIT_MIN
+    assert aio.hash_memlimit(b'$unknown$', 123) == 123
+    assert aio.hash_memlimit(b'$argon2id$v=19$', 123) == 123
+
+
+def test_concurrent_calls_stay_within_the_memory_budget():
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def hash_(cost):
+        with lock:
+            running.append(cost)
+            peak.append(sum(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(cost)
+        return cost
+
+    async def main(hasher):
+        return await asyncio.gather(*(hasher.run(cost, hash_, cost) for cost in [60, 60, 30, 30, 90, 10]))
+
+    with aio.PwhashExecutor(max_workers=6, memlimit=30, memory_budget=100) as hasher:
+        assert run(main(hasher)) == [60, 60, 30, 30, 90, 10]
+        assert hasher.memory_in_use == 0
+    assert max(peak) <= 100
+    assert len(peak) == 6
+
+
+def test_call_larger_than_the_budget_is_refused():
+    with aio.PwhashExecutor(max_workers=1, memlimit=MEM, memory_budget=MEM) as hasher:
+        with pytest.raises(nacl.exceptions.ValueError):
+            run(hasher.str(b'hunter2', OPS, MEM * 2))
+
+
+def test_invalid_configuration():
+    with pytest.raises(nacl.exceptions.ValueError):
+        aio.PwhashExecutor(max_workers=0)
+    with pytest.raises(nacl.exceptions.ValueError):
+        aio.PwhashExecutor(max_workers=1, memlimit=100, memory_budget=50)
+
+
+def test_module_level_coroutines_use_the_default_executor(monkeypatch):
+    monkeypatch.setattr(aio, '_default_executor', None)
+    hasher = aio.PwhashExecutor(max_workers=1, memlimit=MEM)
+    aio.set_default_executor(hasher)
+    try:
+        assert aio.get_default_executor() is hasher
+        hashed = run(aio.str(b'hunter2', OPS, MEM))
+        assert run(aio.verify(hashed, b'hunter2'))
+    finally:
+        hasher.shutdown()
+
+
+def test_calibrate_scales_opslimit_to_the_target(monkeypatch):
+    # A host where a hash takes 10 ms per unit of opslimit per MiB
+    def fake_time(func, opslimit, memlimit):
+        return 0.01 * opslimit * memlimit / (1 << 20)
+    monkeypatch.setattr(aio, '_time_str', fake_time)
+
+    opslimit, memlimit = aio.calibrate(target=0.5, memlimit=1 << 20)
+    assert (opslimit, memlimit) == (50, 1 << 20)
+
+    # Too slow even at the minimal opslimit: memlimit is halved
+    opslimit, memlimit = aio.calibrate(target=0.5, memlimit=1 << 30)
+    assert memlimit < 1 << 30
+    assert fake_time(None, opslimit, memlimit) <= 0.5
+
+    with pytest.raises(nacl.exceptions.ValueError):
+        aio.calibrate(algorithm='md5')
+
+
+@pytest.mark.parametrize('module', [argon2id, scrypt])
+def test_kdf_defaults_fit_the_default_budget(monkeypatch, module):
+    # Records the call instead of spending the sensitive memlimit
+    calls = []
+    monkeypatch.setattr(module, 'kdf', lambda *args: calls.append(args) or b'key')
+    salt = b'\x01' * module.SALTBYTES
+
+    monkeypatch.setattr(aio, '_default_executor', None)
+    hasher = aio.get_default_executor()
+    try:
+        if module is argon2id:
+            assert run(aio.kdf(32, b'hunter2', salt)) == b'key'
+        else:
+            assert run(hasher.scrypt_kdf(32, b'hunter2', salt)) == b'key'
+    finally:
+        hasher.shutdown()
+    with aio.PwhashExecutor(max_workers=1) as single:
+        if module is argon2id:
+            run(single.kdf(32, b'hunter2', salt))
+        else:
+            run(single.scrypt_kdf(32, b'hunter2', salt))
+
+    assert [args[3:5] for args in calls] == [(module.OPSLIMIT_SENSITIVE, module.MEMLIMIT_SENSITIVE)] * 2
@@ -0,0 +1,90 @@
+import marshal
+import os
+
+import pytest
+
+import pycparser
+from pycparser import c_parser
+from pycparser.ply import yacc
+
+SHIPPED = os.path.join(os.path.dirname(pycparser.__file__), 'yacctab.marshal')
+
+SOURCE = '''
+typedef struct { int x; } point_t;
+static int area(point_t *p, int n) { return p->x * n; }
+'''
+
+
+def table_module():
+    lr = yacc.LRTable()
+    signature = lr.read_table('pycparser.yacctab')
+    return lr, signature
+
+
+def test_shipped_marshal_file_matches_yacctab():
+    expected, signature = table_module()
+    lr = yacc.LRTable()
+    assert lr.read_marshal(SHIPPED) == signature
+    assert lr.lr_method == expected.lr_method
+    assert lr.lr_action == expected.lr_action
+    assert lr.lr_goto == expected.lr_goto
+    assert [str(p) for p in lr.lr_productions] == [str(p) for p in expected.lr_productions]
+
+
+def test_marshal_round_trip(tmp_path):
+    expected, signature = table_module()
+    filename = str(tmp_path / 'tables.marshal')
+    expected.marshal_table(filename, signature)
+    lr = yacc.LRTable()
+    assert lr.read_marshal(filename) == signature
+    assert lr.lr_action == expected.lr_action
+    assert [(p.name, p.len, p.func) for p in lr.lr_productions] == \
+        [(p.name, p.len, p.func) for p in expected.lr_productions]
+
+
+def test_missing_or_malformed_files_are_rejected(tmp_path):
+    with pytest.raises(ImportError):
+        yacc.LRTable().read_marshal(str(tmp_path / 'missing.marshal'))
+    malformed = tmp_path / 'malformed.marshal'
+    malformed.write_bytes(marshal.dumps(('not', 'tables')))
+    with pytest.raises(ValueError):
+        yacc.LRTable().read_marshal(str(malformed))
+    stale = tmp_path / 'stale.marshal'
+    stale.write_bytes(marshal.dumps(('0.0', 'LALR', '', {}, {}, ())))
+    with pytest.raises(yacc.VersionError):
+        yacc.LRTable().read_marshal(str(stale))
+
+
+def test_parsers_from_either_table_agree():
+    marshalled = c_parser.CParser(yacc_marshal=True).parse(SOURCE)
+    imported = c_parser.CParser(yacc_marshal=False).parse(SOURCE)
+    assert repr(marshalled) == repr(imported)
+
+
+def test_falls_back_to_yacctab_when_the_file_is_missing(monkeypatch):
+    def missing(self, filename):
+        raise ImportError
+    read = []
+    read_table = yacc.LRTable.read_table
+    monkeypatch.setattr(yacc.LRTable, 'read_marshal', missing)
+    monkeypatch.setattr(yacc.LRTable, 'read_table',
+                        lambda self, module: read.append(module) or read_table(self, module))
+    ast = c_parser.CParser().parse(SOURCE)
+    assert read == ['pycparser.yacctab']
+    assert ast.ext[1].decl.name == 'area'
+
+
+@pytest.mark.parametrize('optimize', [True, False])
+def test_stale_marshal_file_is_skipped(monkeypatch, tmp_path, optimize):
+    # Tables written for another grammar: empty, so using them would fail
+    stale = tmp_path / 'yacctab.marshal'
+    stale.write_bytes(marshal.dumps((yacc.__tabversion__, 'LALR', 'another grammar', {}, {}, ())))
+    read_marshal = yacc.LRTable.read_marshal
+    monkeypatch.setattr(yacc.LRTable, 'read_marshal', lambda self, filename: read_marshal(self, str(stale)))
+    read = []
+    read_table = yacc.LRTable.read_table
+    monkeypatch.setattr(yacc.LRTable, 'read_table',
+                        lambda self, module: read.append(module) or read_table(self, module))
+    ast = c_parser.CParser(yacc_optimize=optimize).parse(SOURCE)
+    assert read == ['pycparser.yacctab']
+    assert ast.ext[1].decl.name == 'area'
@@ -0,0 +1,105 @@
+import threading
+
+from stopper import readiness
+
+
+class FakeCancel(threading.Event):
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def wait(self, timeout=None):
+        self.clock.sleep(timeout)
+        return self.is_set()
+
+
+def run(clock, states, answers_after, budget=600, cancel_after=None):
+    '''Boots through states, one per describe call, after which the server
+    answers probes from answers_after seconds into the wait. Probes are
+    returned as seconds into the wait.'''
+    start = clock.now
+    cancel = FakeCancel(clock)
+    states = list(states)
+    probes = []
+
+    def describe_instance():
+        if cancel_after is not None and clock.now - start >= cancel_after:
+            cancel.set()
+        state = states.pop(0) if len(states) > 1 else states[0]
+        return state, '203.0.113.10' if state == 'running' else None
+
+    def probe(ip, timeout):
+        probes.append(clock.now - start)
+        if clock.now - start < answers_after:
+            raise TimeoutError('timed out')
+        return {'num_players': 0}
+
+    result = readiness.wait_until_ready(describe_instance, probe, budget, cancel, clock)
+    return result, probes
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    delays = readiness.backoff(2, 15)
+    assert [next(delays) for _ in range(6)] == [2, 4, 8, 15, 15, 15]
+
+
+def test_ready_records_both_stages(clock):
+    result, probes = run(clock, ['pending', 'pending', 'running'], answers_after=40)
+    assert result['outcome'] == readiness.READY
+    assert result['public_ip'] == '203.0.113.10'
+    assert result['num_players'] == 0
+    # Two pending polls: 2 + 4 seconds of EC2 boot
+    assert result['stages'][readiness.EC2_BOOT] == 6
+    # Probes at 6, 8, 12, 20, 35, 50
+    assert probes == [6, 8, 12, 20, 35, 50]
+    assert result['stages'][readiness.SERVER_LOAD] == 44
+    assert readiness.message(result) == 'Minecraft Server is up at 203.0.113.10'
+
+
+def test_budget_bounds_the_wait(clock):
+    result, probes = run(clock, ['running'], answers_after=1000, budget=100)
+    assert result['outcome'] == readiness.TIMED_OUT
+    assert result['stages'][readiness.SERVER_LOAD] == 100
+    assert probes[-1] < 100
+    assert 'still loading at 203.0.113.10' in readiness.message(result)
+
+
+def test_budget_runs_out_while_booting(clock):
+    result, _ = run(clock, ['pending'], answers_after=0, budget=30)
+    assert result['outcome'] == readiness.TIMED_OUT
+    assert result['stages'] == {readiness.EC2_BOOT: 30}
+    assert readiness.message(result).startswith('Minecraft Server is still booting')
+
+
+def test_stopping_instance_ends_the_wait(clock):
+    result, probes = run(clock, ['pending', 'stopping'], answers_after=0)
+    assert result['outcome'] == readiness.STOPPED
+    assert probes == []
+    assert readiness.message(result) == 'Minecraft Server stopped before it was ready'
+
+
+def test_cancel_ends_the_wait_quietly(clock):
+    result, probes = run(clock, ['pending'], answers_after=0, cancel_after=10)
+    assert result['outcome'] == readiness.CANCELLED
+    assert probes == []
+    assert readiness.message(result) is None
+
+
+def test_metric_log():
+    result = {'outcome': readiness.READY, 'public_ip': '203.0.113.10',
+              'stages': {readiness.EC2_BOOT: 31.25, readiness.SERVER_LOAD: 48.5}}
+    log = readiness.metric_log('i-1', result, 1700000000.5)
+    assert log['_aws']['Timestamp'] == 1700000000500
+    assert log['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['outcome']]
+    assert [m['Name'] for m in log['_aws']['CloudWatchMetrics'][0]['Metrics']] == [
+        readiness.EC2_BOOT, readiness.SERVER_LOAD, 'total']
+    assert (log['outcome'], log['ec2_boot'], log['server_load'], log['total']) == (
+        readiness.READY, 31.25, 48.5, 79.75)
+
+
+def test_metric_log_by_start_kind():
+    result = {'outcome': readiness.READY, 'public_ip': '203.0.113.10',
+              'stages': {readiness.EC2_BOOT: 12.0, readiness.SERVER_LOAD: 1.5}}
+    log = readiness.metric_log('i-1', result, 1700000000.0, readiness.RESUME)
+    assert log['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['outcome'], ['outcome', 'start_kind']]
+    assert log['start_kind'] == readiness.RESUME
@@ -0,0 +1,85 @@
+import pytest
+
+from alex_bot import request_checks
+from alex_bot.request_checks import ReplayCache, precheck
+
+NOW = 1700000000
+SIGNATURE = 'ab' * 64
+
+
+@pytest.fixture()
+def headers():
+    """ Headers of a well formed Discord interaction"""
+
+    return {
+        'x-signature-ed25519': SIGNATURE,
+        'x-signature-timestamp': str(NOW),
+    }
+
+
+def test_precheck_accepts_well_formed_request(headers):
+    assert precheck(headers, '{"type": 1}', now=NOW) is None
+
+
+def test_normalize_headers_lowercases_names():
+    event = {'headers': {'X-Signature-Ed25519': SIGNATURE}}
+    assert request_checks.normalize_headers(event) == {'x-signature-ed25519': SIGNATURE}
+    assert request_checks.normalize_headers({'headers': None}) == {}
+
+
+@pytest.mark.parametrize('missing', ['x-signature-ed25519', 'x-signature-timestamp'])
+def test_precheck_rejects_missing_header(headers, missing):
+    del headers[missing]
+    assert precheck(headers, '{}', now=NOW) == 'missing signature headers'
+
+
+@pytest.mark.parametrize('signature', ['ab' * 63, 'zz' * 64, ''])
+def test_precheck_rejects_malformed_signature(headers, signature):
+    headers['x-signature-ed25519'] = signature
+    assert precheck(headers, '{}', now=NOW) == 'malformed signature'
+
+
+def test_precheck_rejects_large_body(headers):
+    body = 'x' * (request_checks.MAX_BODY_LENGTH + 1)
+    assert precheck(headers, body, now=NOW) == 'body too large'
+    assert precheck(headers, None, now=NOW) == 'missing body'
+
+
+@pytest.mark.parametrize('timestamp, reason', [
+    ('-5', 'malformed timestamp'),
+    ('12ab', 'malformed timestamp'),
+    ('17²', 'malformed timestamp'),
+    ('١٧٠٠٠٠٠٠٠٠', 'malformed timestamp'),
+    ('1' * 5000, 'malformed timestamp'),
+    ('0' * 13, 'malformed timestamp'),
+    (str(NOW - request_checks.TIMESTAMP_WINDOW - 1), 'stale timestamp'),
+    (str(NOW + request_checks.TIMESTAMP_WINDOW + 1), 'stale timestamp'),
+])
+def test_precheck_rejects_bad_timestamp(headers, timestamp, reason):
+    headers['x-signature-timestamp'] = timestamp
+    assert precheck(headers, '{}', now=NOW) == reason
+
+
+def test_replay_cache_detects_replay():
+    cache = ReplayCache()
+    assert not cache.seen(str(NOW), SIGNATURE, now=NOW)
+    cache.add(str(NOW), SIGNATURE, now=NOW)
+    assert cache.seen(str(NOW), SIGNATURE.upper(), now=NOW + 1)
+    assert not cache.seen(str(NOW + 1), SIGNATURE, now=NOW + 1)
+
+
+def test_replay_cache_expires_outside_window():
+    cache = ReplayCache(window=10)
+    cache.add(str(NOW), SIGNATURE, now=NOW)
+    assert cache.seen(str(NOW), SIGNATURE, now=NOW + 10)
+    assert not cache.seen(str(NOW), SIGNATURE, now=NOW + 11)
+    assert len(cache) == 0
+
+
+def test_replay_cache_is_bounded():
+    cache = ReplayCache(max_entries=3)
+    for i in range(5):
+        cache.add(str(NOW), '%0128x' % i, now=NOW)
+    assert len(cache) == 3
+    assert not cache.seen(str(NOW), '%0128x' % 0, now=NOW)
+    assert cache.seen(str(NOW), '%0128x' % 4, now=NOW)
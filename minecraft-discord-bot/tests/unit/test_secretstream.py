@@ -0,0 +1,80 @@
+import io
+
+import pytest
+
+import nacl.exceptions
+import nacl.utils
+from nacl.secret import StreamDecryptor, StreamEncryptor
+
+KEY = nacl.utils.random(StreamEncryptor.KEY_SIZE)
+CHUNK = 64
+
+
+def encrypt(plaintext, aad=None):
+    dst = io.BytesIO()
+    StreamEncryptor(KEY, CHUNK).encrypt_file(io.BytesIO(plaintext), dst, aad)
+    return dst.getvalue()
+
+
+def decrypt(stream, aad=None):
+    dst = io.BytesIO()
+    StreamDecryptor(KEY, CHUNK).decrypt_file(io.BytesIO(stream), dst, aad)
+    return dst.getvalue()
+
+
+@pytest.mark.parametrize('size', [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, 5 * CHUNK])
+def test_file_round_trip(size):
+    plaintext = nacl.utils.random(size)
+    stream = encrypt(plaintext, aad=b'backup')
+    chunks = max(1, -(-size // CHUNK))
+    assert len(stream) == StreamEncryptor.HEADER_SIZE + size + chunks * StreamEncryptor.ABYTES
+    assert decrypt(stream, aad=b'backup') == plaintext
+
+
+def test_iter_round_trip_with_uneven_pieces():
+    plaintext = nacl.utils.random(3 * CHUNK + 10)
+    pieces = [plaintext[i:i + 7] for i in range(0, len(plaintext), 7)]
+    stream = b''.join(StreamEncryptor(KEY, CHUNK).encrypt_iter(pieces))
+    split = [stream[i:i + 13] for i in range(0, len(stream), 13)]
+    assert b''.join(StreamDecryptor(KEY, CHUNK).decrypt_iter(split)) == plaintext
+
+
+def test_each_stream_has_a_fresh_header():
+    assert encrypt(b'same')[:StreamEncryptor.HEADER_SIZE] != encrypt(b'same')[:StreamEncryptor.HEADER_SIZE]
+
+
+@pytest.mark.parametrize('cut', [
+    # Whole chunks dropped from the end, so no chunk is tagged FINAL
+    StreamEncryptor.HEADER_SIZE + CHUNK + StreamEncryptor.ABYTES,
+    # In the middle of a chunk
+    StreamEncryptor.HEADER_SIZE + CHUNK,
+    # In the header
+    StreamEncryptor.HEADER_SIZE - 1,
+])
+def test_truncation_is_detected(cut):
+    stream = encrypt(nacl.utils.random(3 * CHUNK))
+    with pytest.raises(nacl.exceptions.CryptoError):
+        decrypt(stream[:cut])
+
+
+def test_trailing_data_is_detected():
+    with pytest.raises(nacl.exceptions.CryptoError):
+        decrypt(encrypt(b'plaintext') + b'x')
+
+
+def test_tampering_and_wrong_aad_are_detected():
+    stream = bytearray(encrypt(nacl.utils.random(2 * CHUNK)))
+    with pytest.raises(nacl.exceptions.CryptoError):
+        decrypt(bytes(stream), aad=b'other')
+    stream[StreamEncryptor.HEADER_SIZE + 3] ^= 1
+    with pytest.raises(nacl.exceptions.CryptoError):
+        decrypt(bytes(stream))
+
+
+def test_invalid_arguments():
+    with pytest.raises(nacl.exceptions.ValueError):
+        StreamEncryptor(KEY[:-1])
+    with pytest.raises(nacl.exceptions.ValueError):
+        StreamEncryptor(KEY, chunk_size=0)
+    with pytest.raises(nacl.exceptions.TypeError):
+        StreamDecryptor('not bytes' * 4)
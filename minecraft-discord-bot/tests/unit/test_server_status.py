@@ -0,0 +1,49 @@
+import pytest
+
+from alex_bot import server_status, state_store
+
+NOW = 1700000000.0
+
+
+@pytest.fixture()
+def store():
+    return state_store.MemoryStore()
+
+
+def test_status_round_trip(store):
+    state_store.save_status(store, 'i-1', 'running', '203.0.113.10', 3, NOW)
+    snapshot = state_store.load_status(store, 'i-1')
+    assert snapshot == {'state': 'running', 'public_ip': '203.0.113.10', 'num_players': 3,
+                        'sampled_at': NOW, 'expires_at': NOW + state_store.STATUS_RETENTION}
+    assert state_store.load_status(store, 'i-2') is None
+
+
+def test_unknown_fields_are_left_out(store):
+    state_store.save_status(store, 'i-1', 'pending', None, None, NOW)
+    assert set(state_store.load_status(store, 'i-1')) == {'state', 'sampled_at', 'expires_at'}
+
+
+@pytest.mark.parametrize('snapshot, message', [
+    (None, "Minecraft Server status hasn't been checked yet, try again in a minute"),
+    ({'state': 'running', 'public_ip': '203.0.113.10', 'num_players': 1, 'sampled_at': NOW - 30},
+     'Minecraft Server is running at 203.0.113.10 with 1 player online (checked just now)'),
+    ({'state': 'running', 'public_ip': '203.0.113.10', 'num_players': 0, 'sampled_at': NOW - 600},
+     'Minecraft Server is running at 203.0.113.10 with 0 players online (checked 10 minutes ago)'),
+    ({'state': 'running', 'public_ip': '203.0.113.10', 'sampled_at': NOW - 7200},
+     'Minecraft Server is running at 203.0.113.10 but not answering (checked 2 hours ago)'),
+    ({'state': 'stopped', 'sampled_at': NOW}, 'Minecraft Server is stopped (checked just now)'),
+])
+def test_describe(snapshot, message):
+    assert server_status.describe(snapshot, NOW) == message
+
+
+def test_needs_refresh():
+    assert server_status.needs_refresh(None, NOW)
+    assert not server_status.needs_refresh({'sampled_at': NOW - server_status.REVALIDATE_AFTER}, NOW)
+    assert server_status.needs_refresh({'sampled_at': NOW - server_status.REVALIDATE_AFTER - 1}, NOW)
+
+
+def test_one_refresh_per_cooldown(store):
+    assert server_status.claim_refresh(store, 'i-1', NOW)
+    assert not server_status.claim_refresh(store, 'i-1', NOW + 1)
+    assert server_status.claim_refresh(store, 'i-1', NOW + server_status.REFRESH_COOLDOWN + 1)
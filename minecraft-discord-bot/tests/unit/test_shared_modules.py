@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+# Each Lambda package holds its own copy of the modules both functions use,
+# as the functions are deployed from separate code directories. Edit one
+# and copy it over the other
+SHARED_MODULES = ['breaker.py', 'state_store.py']
+
+
+@pytest.mark.parametrize('name', SHARED_MODULES)
+def test_copies_match(name):
+    with open(os.path.join(ROOT, 'alex_bot', name), 'rb') as bot_copy, \
+            open(os.path.join(ROOT, 'stopper', name), 'rb') as stopper_copy:
+        assert bot_copy.read() == stopper_copy.read(), f'alex_bot/{name} and stopper/{name} differ'
@@ -0,0 +1,499 @@
+import datetime
+import functools
+import json
+
+import pytest
+
+from tests.unit.test_flush import FakeRconClient, FakeServer
+
+INSTANCE_ID = 'i-0123456789abcdef0'
+HOST = '203.0.113.7'
+
+
+class FakeEC2:
+    '''Stands in for the EC2 client, for an instance in state.'''
+
+    def __init__(self, state='running', launched_minutes_ago=60, hibernation=False):
+        self.state = state
+        self.launch_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=launched_minutes_ago)
+        self.hibernation = hibernation
+        self.calls = []
+
+    def describe_instances(self, InstanceIds):
+        self.calls.append('describe_instances')
+        instance = {
+            'InstanceId': InstanceIds[0],
+            'State': {'Name': self.state},
+            'LaunchTime': self.launch_time,
+            'HibernationOptions': {'Configured': self.hibernation},
+        }
+        if self.state == 'running':
+            instance['PublicIpAddress'] = HOST
+        return {'Reservations': [{'Instances': [instance]}]}
+
+    def start_instances(self, InstanceIds):
+        self.calls.append('start_instances')
+        self.state = 'pending'
+        return {'StartingInstances': [{'CurrentState': {'Name': 'pending'}}]}
+
+    def stop_instances(self, InstanceIds, Hibernate=False):
+        self.calls.append(('stop_instances', Hibernate))
+        self.state = 'stopping'
+        return {'StoppingInstances': [{'CurrentState': {'Name': 'stopping'}}]}
+
+
+class FakeSSM:
+    def get_parameter(self, Name, WithDecryption=False):
+        return {'Parameter': {'Name': Name, 'Value': 'secret'}}
+
+
+class FakeBoto3:
+    '''Stands in for the boto3 module, handing out the fake clients.'''
+
+    def __init__(self, ec2):
+        self.ec2 = ec2
+        self.ssm = FakeSSM()
+
+    def client(self, name, config=None):
+        return getattr(self, name)
+
+
+class FakeQueryServer:
+    '''The Minecraft server behind the fake Query clients: answers with
+    num_players, or fails to answer when num_players is None.'''
+
+    def __init__(self, num_players=0):
+        self.num_players = num_players
+        self.queries = 0
+
+    def client(self, host, port, timeout=None):
+        server = self
+
+        class Client:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def stats(self):
+                server.queries += 1
+                if server.num_players is None:
+                    raise TimeoutError('timed out')
+                return {'num_players': server.num_players}
+
+        return Client()
+
+
+@pytest.fixture()
+def stopper(load_app, monkeypatch):
+    for name in ('STATE_TABLE', 'NEXT_CHECK_SCHEDULE', 'RCON_PASSWORD_PARAMETER', 'UNRESPONSIVE_ACTION',
+                 'STOP_MODE', 'PREDICTED_SESSIONS'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('MC_INSTANCE_ID', INSTANCE_ID)
+    app = load_app('stopper')
+    app.boto3 = FakeBoto3(FakeEC2())
+    app.query_server = FakeQueryServer()
+    app.Client = app.query_server.client
+    return app
+
+
+def check(stopper, refresh_only=False):
+    observed = {}
+    response = stopper.check_server(INSTANCE_ID, refresh_only, observed, stopper.Deadline(30))
+    return response, observed
+
+
+@pytest.fixture()
+def predicted(stopper, monkeypatch):
+    '''Makes the occupancy histogram predict a session right now.'''
+    monkeypatch.setattr(stopper.occupancy.OccupancyHistogram, 'should_prewarm', lambda self, now: True)
+    monkeypatch.setattr(stopper.occupancy.OccupancyHistogram, 'should_hold', lambda self, now: True)
+    monkeypatch.setattr(stopper.occupancy.OccupancyHistogram, 'next_prewarm', lambda self, now: now + 600)
+
+
+@pytest.mark.parametrize('setting', [None, 'hold'])
+def test_predicted_sessions_dont_start_the_server_unless_enabled(stopper, predicted, monkeypatch, setting):
+    if setting is not None:
+        monkeypatch.setenv('PREDICTED_SESSIONS', setting)
+    stopper.boto3.ec2.state = 'stopped'
+    response, observed = check(stopper)
+    assert response['body'] == 'Server is not running'
+    assert 'start_instances' not in stopper.boto3.ec2.calls
+
+    # Nor is a check scheduled for the pre-warm
+    stopper.schedule_next_check(None, observed)
+    assert stopper.get_scheduler(None).next_at is None
+
+
+def test_predicted_session_starts_the_server(stopper, predicted, monkeypatch):
+    monkeypatch.setenv('PREDICTED_SESSIONS', 'prewarm')
+    stopper.boto3.ec2.state = 'stopped'
+    response, observed = check(stopper)
+    assert response['body'] == 'Server pre-warming'
+    assert observed['state'] == 'pending'
+    assert 'start_instances' in stopper.boto3.ec2.calls
+
+
+def test_idle_server_stops_through_a_predicted_session_unless_enabled(stopper, predicted):
+    response, _ = check(stopper)
+    assert response['body'] == 'Server Stopping'
+
+
+@pytest.mark.parametrize('setting', ['hold', 'prewarm'])
+def test_idle_server_is_held_through_a_predicted_session(stopper, predicted, monkeypatch, setting):
+    monkeypatch.setenv('PREDICTED_SESSIONS', setting)
+    response, _ = check(stopper)
+    assert response['body'] == 'Session predicted'
+    assert stopper.boto3.ec2.state == 'running'
+
+
+def status(stopper):
+    return stopper.state_store.load_status(stopper.get_state_store(), INSTANCE_ID)
+
+
+def test_server_with_players_keeps_running(stopper):
+    stopper.query_server.num_players = 3
+    response, observed = check(stopper)
+    assert response == {'statusCode': 200, 'body': 'Players online'}
+    assert observed['num_players'] == 3
+    assert status(stopper)['num_players'] == 3
+    assert stopper.boto3.ec2.state == 'running'
+
+
+def test_refresh_only_saves_the_status_without_stopping(stopper):
+    response, _ = check(stopper, refresh_only=True)
+    assert response['body'] == 'Status refreshed'
+    snapshot = status(stopper)
+    assert (snapshot['state'], snapshot['public_ip'], snapshot['num_players']) == ('running', HOST, 0)
+    assert stopper.boto3.ec2.state == 'running'
+
+
+def test_empty_server_gets_a_start_grace(stopper):
+    stopper.boto3.ec2 = FakeEC2(launched_minutes_ago=5)
+    response, _ = check(stopper)
+    assert response['body'] == 'Server just started'
+    assert stopper.boto3.ec2.state == 'running'
+
+
+def test_stopped_instance_is_only_recorded(stopper):
+    stopper.boto3.ec2.state = 'stopped'
+    response, observed = check(stopper)
+    assert response['body'] == 'Server is not running'
+    assert observed['state'] == 'stopped'
+    assert status(stopper)['state'] == 'stopped'
+    assert stopper.query_server.queries == 0
+
+
+def test_unresponsive_server(stopper):
+    stopper.query_server.num_players = None
+    response, _ = check(stopper)
+    assert response == {'statusCode': 400, 'body': 'Minecraft Server Unresponsive'}
+    assert 'num_players' not in status(stopper)
+    assert stopper.boto3.ec2.state == 'running'
+
+
+def test_ec2_error(stopper):
+    def fail(InstanceIds):
+        raise RuntimeError('RequestLimitExceeded')
+    stopper.boto3.ec2.describe_instances = fail
+    response, observed = check(stopper)
+    assert response == {'statusCode': 400, 'body': 'Error'}
+    assert observed == {}
+
+
+def test_out_of_time(stopper):
+    response = stopper.check_server(INSTANCE_ID, False, {}, stopper.Deadline(0))
+    assert response == {'statusCode': 504, 'body': 'Out of time'}
+    assert stopper.boto3.ec2.calls == []
+
+
+def test_query_timeout_comes_from_the_deadline(stopper, monkeypatch):
+    timeouts = []
+    client = stopper.Client
+    monkeypatch.setattr(stopper, 'Client', lambda host, port, timeout: timeouts.append(timeout) or client(host, port))
+    stopper.check_server(INSTANCE_ID, True, {}, stopper.Deadline(4))
+    # Half of what is left for the query, split between its two requests
+    timeout, = timeouts
+    assert 0.9 < timeout <= 1
+
+
+def test_open_breaker_skips_the_query(stopper):
+    stopper.query_server.num_players = None
+    for _ in range(stopper.breaker.THRESHOLD):
+        check(stopper)
+    assert stopper.query_server.queries == stopper.breaker.THRESHOLD
+
+    response, _ = check(stopper)
+    assert response['body'] == 'Minecraft Server Unresponsive'
+    assert stopper.query_server.queries == stopper.breaker.THRESHOLD
+    assert stopper.boto3.ec2.state == 'running'
+
+
+def test_unresponsive_server_is_stopped_once_its_breaker_opens(stopper, monkeypatch):
+    monkeypatch.setenv('UNRESPONSIVE_ACTION', 'stop')
+    stopper.query_server.num_players = None
+    for _ in range(stopper.breaker.THRESHOLD - 1):
+        assert check(stopper)[0]['body'] == 'Minecraft Server Unresponsive'
+    assert check(stopper)[0]['body'] == 'Server Stopping'
+    assert stopper.boto3.ec2.calls[-1] == ('stop_instances', False)
+
+
+def test_unresponsive_server_is_not_stopped_in_its_start_grace(stopper, monkeypatch):
+    monkeypatch.setenv('UNRESPONSIVE_ACTION', 'stop')
+    stopper.boto3.ec2 = FakeEC2(launched_minutes_ago=5)
+    stopper.query_server.num_players = None
+    for _ in range(stopper.breaker.THRESHOLD + 1):
+        check(stopper)
+    assert stopper.boto3.ec2.state == 'running'
+
+
+def test_answering_server_closes_its_breaker(stopper):
+    stopper.query_server.num_players = None
+    for _ in range(stopper.breaker.THRESHOLD - 1):
+        check(stopper)
+    stopper.query_server.num_players = 2
+    check(stopper)
+    assert stopper.breaker.CircuitBreaker(stopper.get_state_store(), HOST).state() == stopper.breaker.CLOSED
+
+
+def breaker_state(stopper):
+    return stopper.breaker.CircuitBreaker(stopper.get_state_store(), HOST).state()
+
+
+def test_failures_while_booting_dont_open_the_breaker(stopper, rcon, monkeypatch):
+    monkeypatch.setenv('UNRESPONSIVE_ACTION', 'stop')
+    stopper.boto3.ec2 = FakeEC2(launched_minutes_ago=2)
+    stopper.query_server.num_players = None
+    for _ in range(stopper.breaker.THRESHOLD):
+        check(stopper, refresh_only=True)
+    check(stopper)
+    assert breaker_state(stopper) == stopper.breaker.CLOSED
+
+    # The first scheduled check after the start grace finds it healthy
+    stopper.boto3.ec2.launch_time -= datetime.timedelta(minutes=30)
+    stopper.query_server.num_players = 4
+    response, _ = check(stopper)
+    assert response['body'] == 'Players online'
+    assert stopper.boto3.ec2.state == 'running'
+    assert rcon.commands == []
+
+
+def test_server_that_recovered_is_not_stopped_with_its_breaker_open(stopper, monkeypatch):
+    monkeypatch.setenv('UNRESPONSIVE_ACTION', 'stop')
+    circuit = stopper.breaker.CircuitBreaker(stopper.get_state_store(), HOST)
+    for _ in range(stopper.breaker.THRESHOLD):
+        circuit.record_failure()
+    stopper.query_server.num_players = 4
+    response, observed = check(stopper)
+    assert response['body'] == 'Players online'
+    assert observed['num_players'] == 4
+    assert stopper.query_server.queries == 1
+    assert stopper.boto3.ec2.state == 'running'
+    assert breaker_state(stopper) == stopper.breaker.CLOSED
+
+
+def test_open_breaker_is_probed_once_before_the_stop(stopper, monkeypatch):
+    monkeypatch.setenv('UNRESPONSIVE_ACTION', 'stop')
+    circuit = stopper.breaker.CircuitBreaker(stopper.get_state_store(), HOST)
+    for _ in range(stopper.breaker.THRESHOLD):
+        circuit.record_failure()
+    stopper.query_server.num_players = None
+    assert check(stopper)[0]['body'] == 'Server Stopping'
+    assert stopper.query_server.queries == 1
+    assert circuit.failures() == stopper.breaker.THRESHOLD + 1
+
+
+def test_readiness_closes_the_breaker(stopper, discord):
+    circuit = stopper.breaker.CircuitBreaker(stopper.get_state_store(), HOST)
+    for _ in range(stopper.breaker.THRESHOLD):
+        circuit.record_failure()
+    stopper.readiness_handler(INTERACTION, None)
+    assert breaker_state(stopper) == stopper.breaker.CLOSED
+
+
+@pytest.fixture()
+def rcon(stopper, clock, monkeypatch):
+    '''The RCON side of the Minecraft server, reached with the password
+    from the RCON_PASSWORD_PARAMETER parameter.'''
+    monkeypatch.setenv('RCON_PASSWORD_PARAMETER', 'minecraft_rcon_password')
+    server = FakeServer(clock)
+    stopper._RCON_POOL = stopper.flush.RconPool(lambda *args, **kw: FakeRconClient(server, *args, **kw))
+    monkeypatch.setattr(stopper.flush, 'pre_stop', functools.partial(
+        stopper.flush.pre_stop, is_open=server.is_open, clock=clock, sleep=clock.sleep))
+    return server
+
+
+def metric_logs(output):
+    return [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+
+
+def test_world_is_saved_and_the_server_shut_down_before_the_stop(stopper, rcon, capsys):
+    response, observed = check(stopper)
+    assert response == {'statusCode': 200, 'body': 'Server Stopping'}
+    assert rcon.commands == [('save-all', True), 'stop']
+    assert stopper.boto3.ec2.calls[-1] == ('stop_instances', False)
+    assert observed['state'] == 'stopping'
+    assert status(stopper)['state'] == 'stopping'
+    assert stopper.load_stop_mode(INSTANCE_ID) == stopper.power.STOP
+
+    log, = metric_logs(capsys.readouterr().out)
+    assert log['stop_outcome'] == stopper.flush.FLUSHED
+    assert {'stop_save', 'stop_shutdown', 'stop_ec2_stop'} <= set(log)
+
+
+def test_hibernated_server_is_only_saved(stopper, rcon, monkeypatch):
+    monkeypatch.setenv('STOP_MODE', 'hibernate')
+    stopper.boto3.ec2.hibernation = True
+    assert check(stopper)[0]['body'] == 'Server Stopping'
+    assert rcon.commands == [('save-all', True)]
+    assert stopper.boto3.ec2.calls[-1] == ('stop_instances', True)
+    assert stopper.load_stop_mode(INSTANCE_ID) == stopper.power.HIBERNATE
+
+
+def test_hibernation_needs_an_instance_launched_for_it(stopper, rcon, monkeypatch):
+    monkeypatch.setenv('STOP_MODE', 'hibernate')
+    check(stopper)
+    assert rcon.commands == [('save-all', True), 'stop']
+    assert stopper.boto3.ec2.calls[-1] == ('stop_instances', False)
+
+
+def test_instance_is_stopped_when_rcon_fails(stopper, rcon, capsys):
+    rcon.reachable = False
+    assert check(stopper)[0]['body'] == 'Server Stopping'
+    assert stopper.boto3.ec2.calls[-1] == ('stop_instances', False)
+    log, = metric_logs(capsys.readouterr().out)
+    assert log['stop_outcome'] == stopper.flush.FAILED
+
+
+def test_instance_is_stopped_without_rcon(stopper):
+    assert check(stopper)[0]['body'] == 'Server Stopping'
+    assert stopper.get_rcon_password() is None
+
+
+class FakeDiscord:
+    '''Stands in for urllib.request.urlopen, recording the follow-ups
+    posted to interaction webhooks.'''
+
+    def __init__(self, error=None):
+        self.error = error
+        self.posts = []
+
+    def urlopen(self, request, timeout=None):
+        if self.error is not None:
+            raise self.error
+        self.posts.append((request.full_url, json.loads(request.data), timeout))
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def read(self):
+        return b'{}'
+
+
+INTERACTION = {'application_id': 'app', 'token': 'token'}
+
+
+@pytest.fixture()
+def discord(stopper, monkeypatch):
+    fake = FakeDiscord()
+    monkeypatch.setattr(stopper.urllib.request, 'urlopen', fake.urlopen)
+    return fake
+
+
+def test_readiness_follow_up_once_joinable(stopper, discord, capsys):
+    stopper.query_server.num_players = 1
+    response = stopper.readiness_handler(INTERACTION, None)
+    assert response == {'statusCode': 200, 'body': stopper.readiness.READY}
+
+    (url, body, timeout), = discord.posts
+    assert url == 'https://discord.com/api/v10/webhooks/app/token'
+    assert body == {'content': f'Minecraft Server is up at {HOST}'}
+    assert 0 < timeout <= 10
+    assert status(stopper)['num_players'] == 1
+
+    # The first check of the started server is scheduled from here
+    assert stopper.get_scheduler(None).next_at is not None
+
+    log, = metric_logs(capsys.readouterr().out)
+    assert log['outcome'] == stopper.readiness.READY
+    assert log['start_kind'] == stopper.readiness.COLD
+
+
+def test_readiness_tells_a_resume_from_a_cold_boot(stopper, discord, capsys):
+    stopper.save_stop_mode(INSTANCE_ID, stopper.power.HIBERNATE)
+    stopper.readiness_handler(INTERACTION, None)
+    log, = metric_logs(capsys.readouterr().out)
+    assert log['start_kind'] == stopper.readiness.RESUME
+
+
+def test_readiness_of_an_instance_that_stopped(stopper, discord):
+    stopper.boto3.ec2.state = 'stopping'
+    response = stopper.readiness_handler(INTERACTION, None)
+    assert response['body'] == stopper.readiness.STOPPED
+    (_, body, _), = discord.posts
+    assert body == {'content': 'Minecraft Server stopped before it was ready'}
+    assert stopper.get_scheduler(None).next_at is None
+    assert stopper.query_server.queries == 0
+
+
+def test_readiness_survives_a_failed_follow_up(stopper, discord):
+    discord.error = OSError('connection reset')
+    assert stopper.readiness_handler(INTERACTION, None)['body'] == stopper.readiness.READY
+
+
+def next_check_in(stopper, observed):
+    before = stopper.time.time()
+    stopper.schedule_next_check(None, observed)
+    next_at = stopper.get_scheduler(None).next_at
+    return None if next_at is None else round(next_at - before)
+
+
+def test_next_check_follows_what_was_seen(stopper):
+    cadence = stopper.cadence
+    assert next_check_in(stopper, {'state': 'running', 'num_players': 5}) == cadence.BUSY_INTERVAL
+    assert next_check_in(stopper, {'state': 'running', 'num_players': 5, 'previous_players': 6}) == cadence.DROPPING_INTERVAL
+    assert next_check_in(stopper, {'state': 'running', 'num_players': 0}) == cadence.IDLE_INTERVAL
+    assert next_check_in(stopper, {'state': 'stopped'}) is None
+    # A run that couldn't see the instance tries again shortly
+    assert next_check_in(stopper, {}) == cadence.IDLE_INTERVAL
+
+
+def test_next_check_after_a_run(stopper):
+    stopper.query_server.num_players = 4
+    stopper.lambda_handler({}, None)
+    assert stopper.get_scheduler(None).history
+
+    # A status refresh leaves the schedule alone
+    stopper.get_scheduler(None).history.clear()
+    stopper.lambda_handler({'action': 'refresh_status'}, None)
+    assert stopper.get_scheduler(None).history == []
+
+
+def test_next_check_is_skipped_without_time_left(stopper):
+    stopper.schedule_next_check(None, {'state': 'running', 'num_players': 5}, stopper.Deadline(1))
+    assert stopper.get_scheduler(None).history == []
+
+
+def test_scheduling_failure_is_only_logged(stopper, monkeypatch, capsys):
+    def fail(at):
+        raise RuntimeError('ThrottlingException')
+    monkeypatch.setattr(stopper.get_scheduler(None), 'schedule', fail)
+    stopper.schedule_next_check(None, {'state': 'running', 'num_players': 5})
+    output = capsys.readouterr().out
+    assert 'ERROR Could not schedule the next check: ThrottlingException' in output
+    log, = metric_logs(output)
+    assert log['schedule_failures'] == 1
+    assert log['error'] == 'ThrottlingException'
+    assert log['_aws']['CloudWatchMetrics'][0]['Metrics'] == [{'Name': 'schedule_failures', 'Unit': 'Count'}]
+
+
+def test_next_check_uses_the_eventbridge_schedule(stopper, monkeypatch):
+    monkeypatch.setenv('NEXT_CHECK_SCHEDULE', 'next-check')
+    monkeypatch.setenv('SCHEDULER_ROLE_ARN', 'arn:aws:iam::123456789012:role/scheduler')
+    stopper.boto3.scheduler = object()
+    assert isinstance(stopper.get_scheduler('arn:aws:lambda:stopper'), stopper.scheduler.EventBridgeScheduler)
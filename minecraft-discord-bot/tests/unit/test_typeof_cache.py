@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from cffi import FFI
+
+
+@pytest.fixture()
+def ffi():
+    ffi = FFI()
+    ffi.cdef('typedef struct { int a; } small_t;')
+    return ffi
+
+
+def test_default_cache_is_unbounded_and_uncounted(ffi):
+    for n in range(50):
+        ffi.new('char[%d]' % (n + 1))
+    info = ffi.typeof_cache_info()
+    assert info['maxsize'] is None
+    assert (info['hits'], info['misses']) == (0, 0)
+    assert info['currsize'] >= 50
+
+
+def test_stats_count_hits_and_misses(ffi):
+    ffi.set_typeof_cache(stats=True)
+    ffi.sizeof('small_t')
+    ffi.sizeof('small_t')
+    ffi.new('small_t *')
+    info = ffi.typeof_cache_info()
+    assert (info['hits'], info['misses']) == (1, 2)
+
+
+def test_lru_evicts_the_least_recently_used(ffi):
+    ffi.set_typeof_cache(maxsize=3, stats=False)
+    for cdecl in ('char[1]', 'char[2]', 'char[3]'):
+        ffi.typeof(cdecl)
+    # Using char[1] again makes char[2] the least recently used
+    ffi.typeof('char[1]')
+    ffi.typeof('char[4]')
+    assert ffi.typeof_cache_info()['currsize'] == 3
+    assert 'char[2]' not in ffi._parsed_types
+    assert {'char[1]', 'char[3]', 'char[4]'} <= set(ffi._parsed_types)
+    # An evicted type parses again, to the same ctype
+    assert ffi.typeof('char[2]') is ffi.typeof('char[2]')
+
+
+def test_bounding_an_existing_cache_trims_it(ffi):
+    for n in range(10):
+        ffi.typeof('char[%d]' % (n + 1))
+    ffi.set_typeof_cache(maxsize=4)
+    assert ffi.typeof_cache_info() == {'hits': 0, 'misses': 0, 'currsize': 4, 'maxsize': 4}
+    ffi.set_typeof_cache()
+    assert ffi.typeof_cache_info()['maxsize'] is None
+
+
+def test_invalid_maxsize(ffi):
+    with pytest.raises(ValueError):
+        ffi.set_typeof_cache(maxsize=0)
+
+
+def test_bounded_cache_under_threads(ffi):
+    ffi.set_typeof_cache(maxsize=8)
+    errors = []
+
+    def worker(offset):
+        try:
+            for n in range(200):
+                size = (n + offset) % 20 + 1
+                assert ffi.sizeof('char[%d]' % size) == size
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert ffi.typeof_cache_info()['currsize'] <= 8